@@ -1,5 +1,7 @@
 from crewai import Agent, Task, Crew, Process
-from app.core.llm import get_llm # Uses your Perplexity/Sonar config
+from app.core.llm import get_llm, GENERATION_MODE # Uses your Perplexity/Sonar config
+from app.core.cache import cached_kickoff
+from app.models.schemas import AssessmentOutput
 
 class AssessmentCrew:
     def __init__(self, llm=None):
@@ -7,7 +9,11 @@ class AssessmentCrew:
         # Otherwise, fall back to the default (Admin Perplexity/Gemini).
         self.llm = llm if llm else get_llm()
 
-    def create_assessment(self, topic: str, assessment_type: str, user_context: str):
+    def create_assessment(self, topic: str, assessment_type: str, user_context: str, use_semantic_cache: bool = True,
+                          mode: str = None):
+        if (mode or GENERATION_MODE) == "fast":
+            return self.create_assessment_fast(topic, assessment_type, user_context, use_semantic_cache)
+
         # --- AGENT 1: The Professor ---
         # Responsible for creativity and pedagogical value
         professor = Agent(
@@ -67,7 +73,8 @@ class AssessmentCrew:
             """,
             agent=examiner,
             expected_output="Valid JSON string.",
-            context=[draft_task] # Depends on the draft
+            context=[draft_task], # Depends on the draft
+            response_model=AssessmentOutput
         )
 
         # --- CREW ---
@@ -78,5 +85,57 @@ class AssessmentCrew:
             verbose=True
         )
 
-        result = crew.kickoff()
-        return result
+        return cached_kickoff(
+            "assessment", crew, self.llm,
+            semantic_query=topic,
+            semantic_filters={"assessment_type": assessment_type, "user_context": user_context},
+            use_semantic_cache=use_semantic_cache,
+            output_model=AssessmentOutput
+        )
+
+    def create_assessment_fast(self, topic: str, assessment_type: str, user_context: str, use_semantic_cache: bool = True):
+        """
+        Fast mode: the professor drafts and self-checks the questions in one
+        schema-constrained call; no separate examiner pass.
+        """
+        professor = Agent(
+            role='Senior Curriculum Developer',
+            goal=f'Create a high-quality {assessment_type} that tests deep understanding, not just rote memory.',
+            backstory="You are a professor known for creating assessments that perfectly match a student's skill level. You avoid ambiguous questions.",
+            verbose=True,
+            allow_delegation=False,
+            llm=self.llm
+        )
+
+        assessment_task = Task(
+            description=f"""
+            Write 5 questions for a '{assessment_type}' on the topic: '{topic}'.
+            
+            USER CONTEXT: {user_context}
+            
+            Requirements:
+            1. If it's a 'Quiz' or 'Test', provide 4 "options" and the correct "answer" (one of the options).
+            2. If it's an 'Assignment', provide a coding scenario as "q" and the expected outcome as "answer"; omit "options".
+            3. Ensure difficulty matches the user context. Double-check every answer before returning.
+            
+            Return a JSON object with a creative "title" and a "questions" list.
+            """,
+            agent=professor,
+            expected_output="Valid JSON string.",
+            response_model=AssessmentOutput
+        )
+
+        crew = Crew(
+            agents=[professor],
+            tasks=[assessment_task],
+            process=Process.sequential,
+            verbose=True
+        )
+
+        return cached_kickoff(
+            "assessment_fast", crew, self.llm,
+            semantic_query=topic,
+            semantic_filters={"assessment_type": assessment_type, "user_context": user_context},
+            use_semantic_cache=use_semantic_cache,
+            output_model=AssessmentOutput
+        )
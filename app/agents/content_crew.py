@@ -1,5 +1,6 @@
 from crewai import Agent, Task, Crew, Process
 from app.core.llm import get_llm
+from app.core.cache import cached_kickoff
 
 class ContentCrew:
     def __init__(self, llm=None):
@@ -7,7 +8,7 @@ class ContentCrew:
         # Otherwise, fall back to the default (Admin Perplexity/Gemini).
         self.llm = llm if llm else get_llm()
 
-    def create_chapter(self, topic: str, subtopics: list[str], detail_level: str):
+    def create_chapter(self, topic: str, subtopics: list[str], detail_level: str, use_semantic_cache: bool = True):
         # 1. Define Agent: The Professor
         professor = Agent(
             role='Technical Educator',
@@ -47,4 +48,9 @@ class ContentCrew:
             process=Process.sequential
         )
 
-        return crew.kickoff()
+        return cached_kickoff(
+            "chapter", crew, self.llm,
+            semantic_query=f"{topic}: {', '.join(subtopics)}",
+            semantic_filters={"detail_level": detail_level},
+            use_semantic_cache=use_semantic_cache
+        )
@@ -1,5 +1,6 @@
 from crewai import Agent, Task, Crew, Process
 from app.core.llm import get_llm
+from app.core.cache import cached_kickoff
 
 class DebugCrew:
     def __init__(self, llm=None):
@@ -44,4 +45,4 @@ class DebugCrew:
             process=Process.sequential
         )
 
-        return crew.kickoff()
+        return cached_kickoff("debug", crew, self.llm)
@@ -1,6 +1,22 @@
 from crewai import Agent, Task, Crew, Process
-from app.core.llm import get_llm
-import json
+from app.core.llm import get_llm, RequestCancelled
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dotenv import load_dotenv
+from app.core.structured import parse_model
+from app.core.checkpoint import run_stage, kickoff_stages
+from app.models.schemas import ProjectDesign
+import os
+import re
+import contextvars
+
+load_dotenv()
+
+# Fan-out mode: the architect's file list drives one coding task per file,
+# PROJECT_FILE_CONCURRENCY at a time, so a build takes about as long as its
+# largest file and one bad file doesn't sink the others.
+PROJECT_FILE_CONCURRENCY = int(os.getenv("PROJECT_FILE_CONCURRENCY", "4"))
+PROJECT_FILE_RETRIES = int(os.getenv("PROJECT_FILE_RETRIES", "2"))
+PROJECT_MAX_FILES = int(os.getenv("PROJECT_MAX_FILES", "25"))
 
 class ProjectCrew:
     def __init__(self, llm=None):
@@ -8,9 +24,8 @@ class ProjectCrew:
         # Otherwise, fall back to the default (Admin Perplexity/Gemini).
         self.llm = llm if llm else get_llm()
 
-    def generate_project(self, description: str, technology: str, difficulty: str):
-        # 1. Define Agents
-        architect = Agent(
+    def _architect(self, technology: str):
+        return Agent(
             role='Systems Architect',
             goal=f'Design a practical, portfolio-worthy project using {technology}',
             backstory="You are a senior software architect who designs clean, modular, and impressive projects for students to showcase on GitHub.",
@@ -18,7 +33,8 @@ class ProjectCrew:
             llm=self.llm
         )
 
-        developer = Agent(
+    def _developer(self):
+        return Agent(
             role='Lead Developer',
             goal='Write the actual code files for the project',
             backstory="You are an expert coder. You write clean, commented, and error-free code. You provide the FULL content of files.",
@@ -26,8 +42,8 @@ class ProjectCrew:
             llm=self.llm
         )
 
-        # 2. Define Tasks
-        design_task = Task(
+    def _design_task(self, description: str, technology: str, difficulty: str, architect):
+        return Task(
             description=f"""
             Analyze this project request: "{description}"
             Tech Stack: {technology}
@@ -43,9 +59,23 @@ class ProjectCrew:
             }}
             """,
             expected_output="JSON structure of the project.",
-            agent=architect
+            agent=architect,
+            response_model=ProjectDesign
         )
 
+    def generate_project(self, description: str, technology: str, difficulty: str,
+                         run_id: str = None, rerun_last: bool = False):
+        """
+        Single-shot mode: one developer task returns every file in one JSON object.
+        With a run_id, each stage is checkpointed (see kickoff_stages). Returns the raw output.
+        """
+        # 1. Define Agents
+        architect = self._architect(technology)
+        developer = self._developer()
+
+        # 2. Define Tasks
+        design_task = self._design_task(description, technology, difficulty, architect)
+
         # 3. Update Coding Task
         coding_task = Task(
             description="""
@@ -72,4 +102,113 @@ class ProjectCrew:
             process=Process.sequential
         )
 
-        return crew.kickoff()
+        return kickoff_stages(crew, run_id, "project", rerun_last=rerun_last)
+
+    # --- FAN-OUT MODE ---
+
+    def design_project(self, description: str, technology: str, difficulty: str, run_id: str = None):
+        """
+        Runs only the architect. Returns {"project_name": str, "files": [str, ...]}.
+        """
+        def architect_stage():
+            architect = self._architect(technology)
+            crew = Crew(
+                agents=[architect],
+                tasks=[self._design_task(description, technology, difficulty, architect)],
+                process=Process.sequential
+            )
+            result = crew.kickoff()
+            return result.raw if hasattr(result, 'raw') else str(result)
+
+        raw = run_stage(run_id, "project", "design", architect_stage)
+        design = parse_model(raw, ProjectDesign, "project_design")
+
+        files = []
+        for name in design.files:
+            if name.strip() and name.strip() not in files:
+                files.append(name.strip())
+        return {"project_name": design.project_name, "files": files[:PROJECT_MAX_FILES]}
+
+    def generate_file(self, filename: str, design: dict, description: str, technology: str, difficulty: str):
+        """
+        Writes the full content of one file of the design.
+        """
+        developer = self._developer()
+        file_list = "\n".join(f"- {f}" for f in design["files"])
+        coding_task = Task(
+            description=f"""
+            Project request: "{description}"
+            Tech Stack: {technology}
+            Difficulty: {difficulty}
+            
+            The architect designed project "{design['project_name']}" with these files:
+            {file_list}
+            
+            Write the FULL content of the file `{filename}` only.
+            Make it consistent with the other files (imports, function names, dependencies).
+            
+            Return ONLY the raw file content. No explanations, no JSON, no Markdown fences.
+            """,
+            expected_output=f"The complete content of {filename}.",
+            agent=developer
+        )
+        crew = Crew(agents=[developer], tasks=[coding_task], process=Process.sequential)
+        result = crew.kickoff()
+        return _strip_code_fence(result.raw if hasattr(result, 'raw') else str(result))
+
+    def generate_project_files(self, design: dict, description: str, technology: str, difficulty: str,
+                               on_file=None, max_workers: int = PROJECT_FILE_CONCURRENCY,
+                               retries: int = PROJECT_FILE_RETRIES, run_id: str = None):
+        """
+        Generates every file in design["files"] concurrently. on_file(filename, content, done, total)
+        is called from the calling thread as each file completes; exceptions it raises
+        (e.g. job cancellation) stop the build. With a run_id, finished files are
+        checkpointed and not regenerated on retry.
+        Returns {"files": {name: content}, "failed": {name: error}}.
+        """
+        files, failed = {}, {}
+        total = len(design["files"])
+
+        def write(filename):
+            last_error = None
+            for _ in range(retries + 1):
+                try:
+                    content = self.generate_file(filename, design, description, technology, difficulty)
+                    if content.strip():
+                        return content
+                    last_error = ValueError("Empty file content")
+                except RequestCancelled:
+                    raise
+                except Exception as e:
+                    last_error = e
+            raise last_error
+
+        def build(filename):
+            return run_stage(run_id, "project", f"file:{filename}", lambda: write(filename))
+
+        pool = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="project-file")
+        try:
+            # Each file call runs in the job's context (fair-share caller, stream sink)
+            futures = {pool.submit(contextvars.copy_context().run, build, filename): filename
+                       for filename in design["files"]}
+            for future in as_completed(futures):
+                filename = futures[future]
+                try:
+                    files[filename] = future.result()
+                except Exception as e:
+                    failed[filename] = str(e)
+                    continue
+                if on_file:
+                    on_file(filename, files[filename], len(files) + len(failed), total)
+        finally:
+            # Don't start files that are still queued if we're bailing out
+            pool.shutdown(wait=True, cancel_futures=True)
+
+        return {"files": files, "failed": failed}
+
+
+def _strip_code_fence(text: str) -> str:
+    """Removes a Markdown code fence wrapped around the whole file, if present."""
+    match = re.match(r"^\s*```[\w.+-]*[ \t]*\n(.*?)\n?```\s*$", text, re.DOTALL)
+    content = match.group(1) if match else text
+    return content.strip("\n") + "\n"
@@ -1,15 +1,25 @@
 from crewai import Agent, Task, Crew, Process
-from app.core.llm import get_llm
+from app.core.llm import get_llm, GENERATION_MODE
+from app.core.cache import cached_kickoff
+from app.models.schemas import RoadmapPlan
 
 class RoadmapCrew:
     def __init__(self , llm=None):
         self.llm = llm if llm else get_llm()
 
-    def create_roadmap(self, topic: str, duration: str, level: str):
+    def create_roadmap(self, topic: str, duration: str, level: str, use_semantic_cache: bool = True,
+                       mode: str = None, user_context: str = ""):
+        if (mode or GENERATION_MODE) == "fast":
+            return self.create_roadmap_fast(topic, duration, level, use_semantic_cache, user_context)
+
+        # Prompts get the personal context; similarity is judged on the topic
+        # alone and the context has to match exactly
+        subject = f"{topic}{user_context}"
+
         # 1. Define Agents
         counselor = Agent(
             role='Senior Academic Counselor',
-            goal=f'Analyze the learning requirements for {topic}',
+            goal=f'Analyze the learning requirements for {subject}',
             backstory="You are an expert at understanding student needs and breaking down complex subjects into manageable learning phases.",
             verbose=True,
             allow_delegation=False,
@@ -18,7 +28,7 @@ class RoadmapCrew:
 
         architect = Agent(
             role='Curriculum Architect',
-            goal=f'Design a detailed {duration} roadmap for {topic}',
+            goal=f'Design a detailed {duration} roadmap for {subject}',
             backstory="You are a curriculum expert who creates structured, week-by-week learning plans with clear outcomes and resource recommendations.",
             verbose=True,
             allow_delegation=False,
@@ -28,7 +38,7 @@ class RoadmapCrew:
         # 2. Define Tasks
         analysis_task = Task(
             description=f"""
-            Analyze the request: Learn {topic} in {duration} at a {level} level.
+            Analyze the request: Learn {subject} in {duration} at a {level} level.
             Identify key concepts that MUST be covered.
             List prerequisites and potential pitfalls for beginners.
             """,
@@ -58,7 +68,8 @@ class RoadmapCrew:
             """,
             expected_output="A structured JSON object containing the roadmap.",
             agent=architect,
-            context=[analysis_task]
+            context=[analysis_task],
+            response_model=RoadmapPlan
         )
 
         # 3. Create Crew
@@ -68,4 +79,55 @@ class RoadmapCrew:
             process=Process.sequential
         )
 
-        return crew.kickoff()
+        return cached_kickoff(
+            "roadmap", crew, self.llm,
+            semantic_query=topic,
+            semantic_filters={"duration": duration, "level": level, "user_context": user_context},
+            use_semantic_cache=use_semantic_cache,
+            output_model=RoadmapPlan
+        )
+
+    def create_roadmap_fast(self, topic: str, duration: str, level: str, use_semantic_cache: bool = True,
+                            user_context: str = ""):
+        """
+        Fast mode: one agent, one schema-constrained call (analysis and
+        curriculum design in a single prompt).
+        """
+        subject = f"{topic}{user_context}"
+        architect = Agent(
+            role='Curriculum Architect',
+            goal=f'Design a detailed {duration} roadmap for {subject}',
+            backstory="You are a curriculum expert who creates structured, week-by-week learning plans with clear outcomes and resource recommendations.",
+            verbose=True,
+            allow_delegation=False,
+            llm=self.llm
+        )
+
+        roadmap_task = Task(
+            description=f"""
+            Create a week-by-week roadmap to learn {subject} in {duration} at a {level} level.
+            First decide which key concepts MUST be covered, their prerequisites and the
+            common pitfalls for this level, then spread them across the weeks.
+            
+            Return a JSON object with a "roadmap" list. Each week has: "week" (number),
+            "title", "description" (brief summary), "topics" (list of strings) and
+            "project" (description of the mini-project).
+            """,
+            expected_output="A structured JSON object containing the roadmap.",
+            agent=architect,
+            response_model=RoadmapPlan
+        )
+
+        crew = Crew(
+            agents=[architect],
+            tasks=[roadmap_task],
+            process=Process.sequential
+        )
+
+        return cached_kickoff(
+            "roadmap_fast", crew, self.llm,
+            semantic_query=topic,
+            semantic_filters={"duration": duration, "level": level, "user_context": user_context},
+            use_semantic_cache=use_semantic_cache,
+            output_model=RoadmapPlan
+        )
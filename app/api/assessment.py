@@ -1,14 +1,19 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
 from pydantic import BaseModel
+from typing import Optional, Literal
 from sqlmodel import Session, select
-from app.db.database import get_session
+from sqlalchemy import func
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.db.database import get_session, get_async_session
 from app.models.user import User, Quiz
 from app.agents.assessment_crew import AssessmentCrew
-from app.core.llm import get_llm
+from app.services.user_context import user_contexts
+from app.services.auth import get_current_user, authorize, create_token_pair, TokenUser
+from app.core.structured import StructuredOutputError
+from app.core.executor import run_llm, PoolFull
+from app.core.llm import RequestCancelled
 import json
-import re
-from fastapi.responses import StreamingResponse
-from app.services.pdf_generator import PDFGenerator
+from app.services.pdf_cache import pdf_response
 
 router = APIRouter()
 
@@ -30,65 +35,60 @@ class QuizRequest(BaseModel):
     user_id: int
     topic: str
     type: str 
+    use_semantic_cache: bool = True
+    mode: Optional[Literal["quality", "fast"]] = None # None = server default (GENERATION_MODE)
 
 class ScoreUpdate(BaseModel):
     quiz_id: int
     score: int
 
 @router.post("/save-survey")
-def save_survey(data: SurveyData, session: Session = Depends(get_session)):
+def save_survey(data: SurveyData, session: Session = Depends(get_session), current_user: Optional[TokenUser] = Depends(get_current_user)):
+    authorize(current_user, data.user_id)
     statement = select(User).where(User.id == data.user_id)
     user = session.exec(statement).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     user.profile_data = data.dict()
+    # Incremented in SQL: concurrent updates must each get their own version
+    user.profile_version = func.coalesce(User.profile_version, 0) + 1
     session.add(user)
     session.commit()
-    return {"status": "success", "message": "Profile personalized!"}
+    session.refresh(user)
+    user_contexts.invalidate(data.user_id)
+    # New tokens carry the new profile version to every worker
+    return {"status": "success", "message": "Profile personalized!", **create_token_pair(user)}
 
 @router.post("/generate-assessment")
-def generate_assessment(req: QuizRequest, session: Session = Depends(get_session)):
+async def generate_assessment(req: QuizRequest, session: AsyncSession = Depends(get_async_session),
+                              current_user: Optional[TokenUser] = Depends(get_current_user)):
+    authorize(current_user, req.user_id)
     try:
-        # 1. Fetch User
-        statement = select(User).where(User.id == req.user_id)
-        user = session.exec(statement).first()
+        # 1. Fetch User (cached model/key/profile)
+        user = await user_contexts.get_async(req.user_id, version=current_user.profile_version if current_user else None)
         if not user: raise HTTPException(status_code=404, detail="User not found")
         
         # 2. Get LLM
         try:
-            crew_llm = get_llm(user.preferred_model, user.gemini_api_key)
+            crew_llm = user.llm()
         except ValueError as e:
             raise HTTPException(status_code=400, detail=str(e))
 
-        # 3. Context Logic
-        profile_context = "General Learner"
-        if user and user.profile_data:
-            p = user.profile_data
-            if isinstance(p, str): 
-                try: p = json.loads(p)
-                except: pass
-            if isinstance(p, dict):
-                profile_context = f"Skill Level: {p.get('current_skill')}. Learning Style: {p.get('learning_style')}."
-
-        # 4. Instantiate Crew
+        # 3. Instantiate Crew
         assessment_crew = AssessmentCrew(llm=crew_llm)
         
-        # 5. Kickoff
-        crew_output = assessment_crew.create_assessment(
+        # 4. Kickoff (off the event loop)
+        crew_output = await run_llm(
+            assessment_crew.create_assessment,
             topic=req.topic,
             assessment_type=req.type,
-            user_context=profile_context
+            user_context=user.assessment_context,
+            use_semantic_cache=req.use_semantic_cache,
+            mode=req.mode
         )
         
-        raw_output = str(crew_output)
-        json_match = re.search(r"(\{.*\})", raw_output, re.DOTALL)
-        
-        if json_match:
-            clean_json = json_match.group(1)
-        else:
-            clean_json = raw_output.replace("```json", "").replace("```", "").strip()
-
-        quiz_data = json.loads(clean_json)
+        # Already validated against AssessmentOutput by the crew
+        quiz_data = json.loads(crew_output)
         
         # Save to DB
         new_quiz = Quiz(
@@ -98,8 +98,8 @@ def generate_assessment(req: QuizRequest, session: Session = Depends(get_session
             questions=quiz_data
         )
         session.add(new_quiz)
-        session.commit()
-        session.refresh(new_quiz)
+        await session.commit()
+        await session.refresh(new_quiz)
         
         return {
             "id": new_quiz.id,
@@ -107,8 +107,10 @@ def generate_assessment(req: QuizRequest, session: Session = Depends(get_session
             "questions": quiz_data.get('questions', [])
         }
         
-    except json.JSONDecodeError:
+    except StructuredOutputError:
         raise HTTPException(status_code=500, detail="AI failed to format correctly. Try again.")
+    except (PoolFull, RequestCancelled):
+        raise
     except Exception as e:
         if "429" in str(e) or "ResourceExhausted" in str(e):
              raise HTTPException(status_code=429, detail="Gemini Limit Reached. Wait 60s.")
@@ -118,28 +120,50 @@ def generate_assessment(req: QuizRequest, session: Session = Depends(get_session
 
 # ... (submit_score, get_user_scores, download_pdf remain SAME as your code) ...
 @router.post("/submit-score")
-def submit_score(data: ScoreUpdate, session: Session = Depends(get_session)):
+def submit_score(data: ScoreUpdate, session: Session = Depends(get_session), current_user: Optional[TokenUser] = Depends(get_current_user)):
     quiz = session.get(Quiz, data.quiz_id)
     if not quiz:
         raise HTTPException(status_code=404, detail="Quiz not found")
+    authorize(current_user, quiz.user_id)
     quiz.score = data.score
     session.add(quiz)
     session.commit()
     return {"status": "success"}
 
 @router.get("/user-scores/{user_id}")
-def get_user_scores(user_id: int, session: Session = Depends(get_session)):
+def get_user_scores(user_id: int, session: Session = Depends(get_session), current_user: Optional[TokenUser] = Depends(get_current_user)):
+    authorize(current_user, user_id)
     statement = select(Quiz).where(Quiz.user_id == user_id, Quiz.score != None).order_by(Quiz.id.desc())
     results = session.exec(statement).all()
     return [{"topic": q.topic, "difficulty": q.difficulty, "score": q.score} for q in results]
 
-@router.post("/assessment/download-pdf")
-async def download_assessment_pdf(req: AssessmentPDFRequest):
-    pdf_gen = PDFGenerator()
+@router.get("/assessment/{quiz_id}/pdf")
+async def assessment_pdf(quiz_id: int, request: Request, include_results: bool = False,
+                         score: Optional[int] = None, session: AsyncSession = Depends(get_async_session),
+                         current_user: Optional[TokenUser] = Depends(get_current_user)):
+    """
+    PDF of a stored quiz. With include_results, the score is the one passed in
+    or, if omitted, the one saved via /submit-score.
+    """
+    quiz = await session.get(Quiz, quiz_id)
+    if not quiz:
+        raise HTTPException(status_code=404, detail="Quiz not found")
+    authorize(current_user, quiz.user_id)
+    data = quiz.questions or {}
+    title = data.get('title', quiz.topic)
+    questions = data.get('questions', [])
+    results = None
+    if include_results:
+        results = {"score": score if score is not None else (quiz.score or 0), "total": len(questions)}
+    params = {"title": title, "questions": questions, "results": results}
+    return await pdf_response(request, "assessment", params, "generate_assessment_pdf",
+                              (title, questions, results), "assessment.pdf")
+
+
+@router.post("/assessment/download-pdf", dependencies=[Depends(get_current_user)])
+async def download_assessment_pdf(req: AssessmentPDFRequest, request: Request):
+    # Prefer GET /assessment/{quiz_id}/pdf, which doesn't re-upload the questions
     results = {"score": req.score, "total": req.total} if req.include_results else None
-    pdf_buffer = pdf_gen.generate_assessment_pdf(req.title, req.questions, results)
-    return StreamingResponse(
-        pdf_buffer, 
-        media_type="application/pdf", 
-        headers={"Content-Disposition": "attachment; filename=assessment.pdf"}
-    )
+    params = {"title": req.title, "questions": req.questions, "results": results}
+    return await pdf_response(request, "assessment", params, "generate_assessment_pdf",
+                              (req.title, req.questions, results), "assessment.pdf")
@@ -1,8 +1,11 @@
 from fastapi import APIRouter, HTTPException, Depends
 from sqlmodel import Session, select
-from app.db.database import get_session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.db.database import get_session, get_async_session
 from app.models.user import User
-from app.services.auth import get_password_hash, verify_password
+from app.services.auth import (
+    get_password_hash_async, verify_password_async, create_token_pair, decode_token, deny_list, get_current_user, TokenUser
+)
 from pydantic import BaseModel
 from typing import Optional
 
@@ -19,14 +22,18 @@ class UserLogin(BaseModel):
     email: str
     password: str
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
 @router.post("/signup")
-def signup(user: UserCreate, session: Session = Depends(get_session)):
+async def signup(user: UserCreate, session: AsyncSession = Depends(get_async_session)):
     statement = select(User).where(User.email == user.email)
-    existing_user = session.exec(statement).first()
+    existing_user = (await session.exec(statement)).first()
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    hashed_pwd = get_password_hash(user.password)
+    # Argon2 runs in the "auth" worker processes, not on the request threads
+    hashed_pwd = await get_password_hash_async(user.password)
     
     # Determine model preference
     # If they provide a key, default to Gemini. Otherwise default to Perplexity (or whatever you prefer)
@@ -42,18 +49,18 @@ def signup(user: UserCreate, session: Session = Depends(get_session)):
     )
     
     session.add(new_user)
-    session.commit()
-    session.refresh(new_user)
+    await session.commit()
+    await session.refresh(new_user)
     
     return {"status": "success", "user_id": new_user.id, "name": new_user.full_name}
 
 
 @router.post("/login")
-def login(user_data: UserLogin, session: Session = Depends(get_session)):
+async def login(user_data: UserLogin, session: AsyncSession = Depends(get_async_session)):
     statement = select(User).where(User.email == user_data.email)
-    user = session.exec(statement).first()
+    user = (await session.exec(statement)).first()
     
-    if not user or not verify_password(user_data.password, user.hashed_password):
+    if not user or not await verify_password_async(user_data.password, user.hashed_password):
         raise HTTPException(status_code=401, detail="Invalid credentials")
         
     return {
@@ -63,5 +70,32 @@ def login(user_data: UserLogin, session: Session = Depends(get_session)):
         "email": user.email,
         "profile_data": user.profile_data,
         # Helpful to return this so frontend knows if they need to add a key
-        "has_api_key": bool(user.gemini_api_key) 
+        "has_api_key": bool(user.gemini_api_key),
+        # Send the access token as "Authorization: Bearer ..." on every call
+        **create_token_pair(user)
     }
+
+
+@router.post("/token/refresh")
+def refresh_token(req: RefreshRequest, session: Session = Depends(get_session)):
+    """
+    Trades a refresh token for a new token pair (with up-to-date model and
+    profile version). The old refresh token is revoked: each one works once.
+    """
+    claims = decode_token(req.refresh_token, "refresh")
+    user = session.get(User, int(claims["sub"]))
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    deny_list.revoke(claims["jti"], claims["exp"])
+    return create_token_pair(user)
+
+
+@router.post("/logout")
+def logout(req: RefreshRequest, current: Optional[TokenUser] = Depends(get_current_user)):
+    claims = decode_token(req.refresh_token, "refresh")
+    if current is not None:
+        if current.user_id != int(claims["sub"]):
+            raise HTTPException(status_code=403, detail="Not allowed for this user")
+        deny_list.revoke(current.jti, current.expires_at)
+    deny_list.revoke(claims["jti"], claims["exp"])
+    return {"status": "success"}
@@ -1,14 +1,16 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Request, Depends
 from pydantic import BaseModel
-from typing import List
-from sqlmodel import Session
-from app.db.database import get_session
-from app.models.user import User
+from typing import List, Optional
 from app.agents.content_crew import ContentCrew
-from app.core.llm import get_llm # <--- NEW IMPORT
+from app.services.user_context import user_contexts
+from app.services.auth import get_current_user, authorize, TokenUser
 import json
-from fastapi.responses import StreamingResponse
-from app.services.pdf_generator import PDFGenerator
+from app.core.executor import run_llm, PoolFull
+from app.core.llm import RequestCancelled
+from app.services.artifacts import save_artifact_async, get_artifact_async
+from app.services.pdf_cache import pdf_response
+from app.core.streaming import stream_crew
+from sse_starlette.sse import EventSourceResponse
 
 router = APIRouter()
 
@@ -17,65 +19,103 @@ class ChapterRequest(BaseModel):
     topic: str
     subtopics: List[str]
     detail_level: str
+    use_semantic_cache: bool = True
 
 class ChapterPDFRequest(BaseModel):
     topic: str
     content: str
 
+async def _prepare_chapter(req: ChapterRequest, current_user: Optional[TokenUser] = None, stream: bool = False):
+    """
+    Builds the crew and kickoff arguments for a chapter request.
+    """
+    # 1. Fetch User (cached model/key/profile)
+    user = await user_contexts.get_async(
+        req.user_id, version=current_user.profile_version if current_user else None
+    )
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    # 2. Initialize Dynamic LLM (The Fix)
+    try:
+        crew_llm = user.llm(stream=stream)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # 3. Instantiate Crew with LLM
+    content_crew = ContentCrew(llm=crew_llm)
+    
+    # Personalization
+    enhanced_level = f"{req.detail_level}{user.style_note}"
+    
+    return content_crew, {
+        "topic": req.topic,
+        "subtopics": req.subtopics,
+        "detail_level": enhanced_level,
+        "use_semantic_cache": req.use_semantic_cache
+    }
+
+
 @router.post("/generate-chapter")
-async def generate_chapter(req: ChapterRequest, session: Session = Depends(get_session)):
+async def generate_chapter(req: ChapterRequest, current_user: Optional[TokenUser] = Depends(get_current_user)):
+    authorize(current_user, req.user_id)
     try:
-        # 1. Fetch User
-        user = session.get(User, req.user_id)
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-
-        # 2. Personalization Logic (Keep existing)
-        style_note = ""
-        if user.profile_data:
-            p = user.profile_data
-            if isinstance(p, str): 
-                try: p = json.loads(p)
-                except: pass
-            if isinstance(p, dict):
-                 style_note = f" (User prefers {p.get('learning_style')})"
-
-        # 3. Initialize Dynamic LLM (The Fix)
-        try:
-            crew_llm = get_llm(user.preferred_model, user.gemini_api_key)
-        except ValueError as e:
-            raise HTTPException(status_code=400, detail=str(e))
-
-        # 4. Instantiate Crew with LLM
-        content_crew = ContentCrew(llm=crew_llm)
-        
-        enhanced_level = f"{req.detail_level}{style_note}"
+        content_crew, kwargs = await _prepare_chapter(req, current_user)
         
-        # 5. Kickoff
-        result = content_crew.create_chapter(
-            topic=req.topic,
-            subtopics=req.subtopics,
-            detail_level=enhanced_level
-        )
+        # 5. Kickoff (off the event loop)
+        final_output = await run_llm(content_crew.create_chapter, **kwargs)
         
-        # Handle Output
-        final_output = result.raw if hasattr(result, 'raw') else str(result)
+        # Keep it server-side so the PDF can be requested by ID
+        artifact_id = await save_artifact_async(req.user_id, "chapter", req.topic, {"topic": req.topic, "content": final_output})
         
-        return {"status": "success", "content": final_output}
+        return {"status": "success", "content": final_output, "artifact_id": artifact_id}
 
+    except (PoolFull, RequestCancelled):
+        raise
     except Exception as e:
         if "429" in str(e) or "ResourceExhausted" in str(e):
              raise HTTPException(status_code=429, detail="Gemini Free Tier Limit Reached. Please wait a minute.")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/chapter/download-pdf")
-async def download_chapter_pdf(req: ChapterPDFRequest):
-    pdf_gen = PDFGenerator()
-    pdf_buffer = pdf_gen.generate_chapter_pdf(req.topic, req.content)
-    
-    return StreamingResponse(
-        pdf_buffer, 
-        media_type="application/pdf", 
-        headers={"Content-Disposition": "attachment; filename=chapter.pdf"}
-    )
+@router.post("/generate-chapter/stream")
+async def generate_chapter_stream(req: ChapterRequest, current_user: Optional[TokenUser] = Depends(get_current_user)):
+    """
+    Same as /generate-chapter, but pushes the chapter over SSE as it is written:
+    "token" events carry text deltas, "done" carries the full Markdown document.
+    """
+    authorize(current_user, req.user_id)
+    content_crew, kwargs = await _prepare_chapter(req, current_user, stream=True)
+
+    async def events():
+        async for kind, payload in stream_crew(content_crew.create_chapter, **kwargs):
+            if kind == "token":
+                yield {"event": "token", "data": json.dumps(payload)}
+            elif kind == "done":
+                artifact_id = await save_artifact_async(req.user_id, "chapter", req.topic, {"topic": req.topic, "content": payload})
+                yield {"event": "done", "data": json.dumps({"content": payload, "artifact_id": artifact_id})}
+            else:
+                detail = str(payload)
+                if "429" in detail or "ResourceExhausted" in detail:
+                    detail = "Gemini Free Tier Limit Reached. Please wait a minute."
+                yield {"event": "error", "data": json.dumps({"detail": detail})}
+
+    return EventSourceResponse(events())
+
+
+@router.get("/chapter/{artifact_id}/pdf")
+async def chapter_pdf(artifact_id: int, request: Request, current_user: Optional[TokenUser] = Depends(get_current_user)):
+    artifact = await get_artifact_async(artifact_id, kind="chapter")
+    if not artifact:
+        raise HTTPException(status_code=404, detail="Chapter not found")
+    authorize(current_user, artifact["user_id"])
+    data = artifact["data"]
+    return await pdf_response(request, "chapter", data, "generate_chapter_pdf",
+                              (data["topic"], data["content"]), "chapter.pdf")
+
+
+@router.post("/chapter/download-pdf", dependencies=[Depends(get_current_user)])
+async def download_chapter_pdf(req: ChapterPDFRequest, request: Request):
+    # Prefer GET /chapter/{artifact_id}/pdf, which doesn't re-upload the chapter
+    return await pdf_response(request, "chapter", {"topic": req.topic, "content": req.content},
+                              "generate_chapter_pdf", (req.topic, req.content), "chapter.pdf")
@@ -1,13 +1,16 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Request, Depends
+from typing import Optional
 from pydantic import BaseModel
-from sqlmodel import Session
-from app.db.database import get_session
-from app.models.user import User
 from app.agents.debug_crew import DebugCrew
-from app.core.llm import get_llm # <--- NEW IMPORT
+from app.services.user_context import user_contexts
+from app.services.auth import get_current_user, authorize, TokenUser
 import json
-from fastapi.responses import StreamingResponse
-from app.services.pdf_generator import PDFGenerator
+from app.core.executor import run_llm, PoolFull
+from app.core.llm import RequestCancelled
+from app.services.artifacts import save_artifact_async, get_artifact_async
+from app.services.pdf_cache import pdf_response
+from app.core.streaming import stream_crew
+from sse_starlette.sse import EventSourceResponse
 
 router = APIRouter()
 
@@ -21,59 +24,101 @@ class DebugPDFRequest(BaseModel):
     error: str
     solution: str
 
+async def _prepare_debug(req: DebugRequest, current_user: Optional[TokenUser] = None, stream: bool = False):
+    """
+    Builds the crew and kickoff arguments for a debug request.
+    """
+    # 1. Fetch User (cached model/key/profile)
+    user = await user_contexts.get_async(
+        req.user_id, version=current_user.profile_version if current_user else None
+    )
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    # 2. Personalization
+    context_msg = f"{req.error_message}\n(Explain solution for a {user.expertise} level developer)"
+
+    # 3. Initialize Dynamic LLM (The Fix)
+    try:
+        crew_llm = user.llm(stream=stream)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # 4. Instantiate Crew with LLM
+    debug_crew = DebugCrew(llm=crew_llm)
+
+    return debug_crew, {
+        "code_snippet": req.code_snippet,
+        "error_message": context_msg
+    }
+
+
+async def _save_report(req: DebugRequest, solution: str):
+    data = {"code": req.code_snippet, "error": req.error_message, "solution": solution}
+    return await save_artifact_async(req.user_id, "debug", "Debug Report", data)
+
+
 @router.post("/debug")
-async def debug_code(req: DebugRequest, session: Session = Depends(get_session)):
+async def debug_code(req: DebugRequest, current_user: Optional[TokenUser] = Depends(get_current_user)):
+    authorize(current_user, req.user_id)
     try:
-        # 1. Fetch User
-        user = session.get(User, req.user_id)
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-
-        # 2. Personalization Logic
-        expertise = "Intermediate"
-        if user.profile_data:
-            p = user.profile_data
-            if isinstance(p, str): 
-                try: p = json.loads(p)
-                except: pass
-            if isinstance(p, dict):
-                 expertise = p.get('current_skill', 'Intermediate')
-
-        context_msg = f"{req.error_message}\n(Explain solution for a {expertise} level developer)"
-
-        # 3. Initialize Dynamic LLM (The Fix)
-        try:
-            crew_llm = get_llm(user.preferred_model, user.gemini_api_key)
-        except ValueError as e:
-            raise HTTPException(status_code=400, detail=str(e))
-
-        # 4. Instantiate Crew with LLM
-        debug_crew = DebugCrew(llm=crew_llm)
+        debug_crew, kwargs = await _prepare_debug(req, current_user)
         
-        # 5. Kickoff
-        result = debug_crew.debug_code(
-            code_snippet=req.code_snippet,
-            error_message=context_msg
-        )
-        
-        # Handle Output
-        final_output = result.raw if hasattr(result, 'raw') else str(result)
+        # 5. Kickoff (off the event loop)
+        final_output = await run_llm(debug_crew.debug_code, **kwargs)
+
+        # Keep it server-side so the PDF can be requested by ID
+        artifact_id = await _save_report(req, final_output)
 
-        return {"status": "success", "solution": final_output}
+        return {"status": "success", "solution": final_output, "artifact_id": artifact_id}
 
+    except (PoolFull, RequestCancelled):
+        raise
     except Exception as e:
         if "429" in str(e) or "ResourceExhausted" in str(e):
              raise HTTPException(status_code=429, detail="Gemini Free Tier Limit Reached. Please wait a minute.")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/debug/download-pdf")
-async def download_debug_pdf(req: DebugPDFRequest):
-    pdf_gen = PDFGenerator()
-    pdf_buffer = pdf_gen.generate_debug_report(req.code, req.error, req.solution)
-    
-    return StreamingResponse(
-        pdf_buffer, 
-        media_type="application/pdf", 
-        headers={"Content-Disposition": "attachment; filename=debug_report.pdf"}
-    )
+@router.post("/debug/stream")
+async def debug_code_stream(req: DebugRequest, current_user: Optional[TokenUser] = Depends(get_current_user)):
+    """
+    Same as /debug, but pushes the report over SSE as it is written:
+    "token" events carry text deltas, "done" carries the full report.
+    """
+    authorize(current_user, req.user_id)
+    debug_crew, kwargs = await _prepare_debug(req, current_user, stream=True)
+
+    async def events():
+        async for kind, payload in stream_crew(debug_crew.debug_code, **kwargs):
+            if kind == "token":
+                yield {"event": "token", "data": json.dumps(payload)}
+            elif kind == "done":
+                artifact_id = await _save_report(req, payload)
+                yield {"event": "done", "data": json.dumps({"solution": payload, "artifact_id": artifact_id})}
+            else:
+                detail = str(payload)
+                if "429" in detail or "ResourceExhausted" in detail:
+                    detail = "Gemini Free Tier Limit Reached. Please wait a minute."
+                yield {"event": "error", "data": json.dumps({"detail": detail})}
+
+    return EventSourceResponse(events())
+
+
+@router.get("/debug/{artifact_id}/pdf")
+async def debug_pdf(artifact_id: int, request: Request, current_user: Optional[TokenUser] = Depends(get_current_user)):
+    artifact = await get_artifact_async(artifact_id, kind="debug")
+    if not artifact:
+        raise HTTPException(status_code=404, detail="Debug report not found")
+    authorize(current_user, artifact["user_id"])
+    data = artifact["data"]
+    return await pdf_response(request, "debug", data, "generate_debug_report",
+                              (data["code"], data["error"], data["solution"]), "debug_report.pdf")
+
+
+@router.post("/debug/download-pdf", dependencies=[Depends(get_current_user)])
+async def download_debug_pdf(req: DebugPDFRequest, request: Request):
+    # Prefer GET /debug/{artifact_id}/pdf, which doesn't re-upload the report
+    data = {"code": req.code, "error": req.error, "solution": req.solution}
+    return await pdf_response(request, "debug", data, "generate_debug_report",
+                              (req.code, req.error, req.solution), "debug_report.pdf")
@@ -0,0 +1,73 @@
+from fastapi import APIRouter, HTTPException, Request, Depends
+from typing import Optional
+from sse_starlette.sse import EventSourceResponse
+from app.services.task_manager import get_job, get_job_async, get_job_owner, list_jobs, cancel_job, job_events, FINAL_STATES
+from app.services.auth import get_current_user, authorize, TokenUser
+import asyncio
+import json
+import os
+
+router = APIRouter()
+
+# Progress events are pushed in-process as soon as update_task() runs. Jobs
+# executed by another uvicorn process are picked up by re-reading the row
+# this often while the stream is idle.
+JOB_EVENTS_DB_POLL_SECONDS = float(os.getenv("JOB_EVENTS_DB_POLL_SECONDS", "5"))
+
+@router.get("/jobs/{job_id}")
+def job_status(job_id: int, current_user: Optional[TokenUser] = Depends(get_current_user)):
+    job = get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    authorize(current_user, job["user_id"])
+    return job
+
+@router.get("/jobs/{job_id}/events")
+async def job_status_events(job_id: int, request: Request, current_user: Optional[TokenUser] = Depends(get_current_user)):
+    """
+    Server-Sent Events stream of job updates ("progress" events), ending after
+    the job reaches a final state.
+    """
+    job = await get_job_async(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    authorize(current_user, job["user_id"])
+
+    async def events():
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        job_events.subscribe(job_id, loop, queue)
+        try:
+            # Subscribe first, then send the current state, so nothing is missed
+            job = await get_job_async(job_id)
+            last_sent = None
+            while True:
+                if job != last_sent:
+                    yield {"event": "progress", "data": json.dumps(job)}
+                    last_sent = job
+                if job["status"] in FINAL_STATES or await request.is_disconnected():
+                    break
+                try:
+                    job = await asyncio.wait_for(queue.get(), timeout=JOB_EVENTS_DB_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    job = await get_job_async(job_id)
+        finally:
+            job_events.unsubscribe(job_id, loop, queue)
+
+    return EventSourceResponse(events())
+
+@router.get("/jobs")
+def user_jobs(user_id: int, limit: int = 20, current_user: Optional[TokenUser] = Depends(get_current_user)):
+    authorize(current_user, user_id)
+    return list_jobs(user_id, limit)
+
+@router.post("/jobs/{job_id}/cancel")
+def cancel(job_id: int, current_user: Optional[TokenUser] = Depends(get_current_user)):
+    owner = get_job_owner(job_id)
+    if owner is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    authorize(current_user, owner)
+    job = cancel_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
@@ -1,8 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import RedirectResponse
-from sqlmodel import Session, select
-from app.db.database import get_session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.db.database import get_async_session
 from app.models.user import User
+from app.services.auth import get_current_user, authorize, create_oauth_state, verify_oauth_state, TokenUser
+from typing import Optional
 import os
 import httpx
 
@@ -21,21 +23,20 @@ LI_SECRET = os.getenv("LINKEDIN_CLIENT_SECRET")
 
 # --- 1. GITHUB OAUTH ---
 
-@router.get("/github/login")
-def github_login(user_id: int):
-    """Redirects user to GitHub for approval"""
+@router.get("/github/authorize-url")
+def github_authorize_url(user_id: int, current_user: Optional[TokenUser] = Depends(get_current_user)):
+    """GitHub approval URL for the logged-in user; the browser is sent there"""
+    authorize(current_user, user_id)
     scope = "repo" # Permission to write to repos
-    # Pass user_id in 'state' to track who is authenticating
-    url = f"https://github.com/login/oauth/authorize?client_id={GH_CLIENT_ID}&scope={scope}&state={str(user_id)}"
-    return RedirectResponse(url)
+    # Signed, short-lived state naming the user, checked in the callback
+    state = create_oauth_state(user_id, "github")
+    url = f"https://github.com/login/oauth/authorize?client_id={GH_CLIENT_ID}&scope={scope}&state={state}"
+    return {"url": url}
 
 @router.get("/github/callback")
-async def github_callback(code: str, state: str, session: Session = Depends(get_session)):
+async def github_callback(code: str, state: str, session: AsyncSession = Depends(get_async_session)):
     """Handles the code returned by GitHub"""
-    try:
-        user_id = int(state)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid state parameter")
+    user_id = verify_oauth_state(state, "github")
     
     # Exchange Code for Token
     async with httpx.AsyncClient() as client:
@@ -55,11 +56,11 @@ async def github_callback(code: str, state: str, session: Session = Depends(get_
         raise HTTPException(status_code=400, detail="Failed to get GitHub token")
 
     # Save to DB
-    user = session.get(User, user_id)
+    user = await session.get(User, user_id)
     if user:
         user.github_token = access_token
         session.add(user)
-        session.commit()
+        await session.commit()
     
     # Redirect back to Frontend Settings
     # Added user_id param so frontend can verify session
@@ -68,8 +69,9 @@ async def github_callback(code: str, state: str, session: Session = Depends(get_
 
 # --- 2. LINKEDIN OAUTH ---
 
-@router.get("/linkedin/login")
-def linkedin_login(user_id: int):
+@router.get("/linkedin/authorize-url")
+def linkedin_authorize_url(user_id: int, current_user: Optional[TokenUser] = Depends(get_current_user)):
+    authorize(current_user, user_id)
     if not LI_CLIENT_ID:
         raise HTTPException(status_code=500, detail="LinkedIn Client ID not configured")
 
@@ -84,17 +86,14 @@ def linkedin_login(user_id: int):
         f"?response_type=code"
         f"&client_id={LI_CLIENT_ID}"
         f"&redirect_uri={redirect_uri}"
-        f"&state={str(user_id)}"
+        f"&state={create_oauth_state(user_id, 'linkedin')}"
         f"&scope={scope}"
     )
-    return RedirectResponse(url)
+    return {"url": url}
 
 @router.get("/linkedin/callback")
-async def linkedin_callback(code: str, state: str, session: Session = Depends(get_session)):
-    try:
-        user_id = int(state)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid state parameter")
+async def linkedin_callback(code: str, state: str, session: AsyncSession = Depends(get_async_session)):
+    user_id = verify_oauth_state(state, "linkedin")
 
     redirect_uri = "http://localhost:8000/api/oauth/linkedin/callback"
 
@@ -115,10 +114,10 @@ async def linkedin_callback(code: str, state: str, session: Session = Depends(ge
     if not access_token:
         raise HTTPException(status_code=400, detail=f"Failed to get LinkedIn token: {data}")
 
-    user = session.get(User, user_id)
+    user = await session.get(User, user_id)
     if user:
         user.linkedin_token = access_token
         session.add(user)
-        session.commit()
+        await session.commit()
     
     return RedirectResponse(f"{FRONTEND_URL}/?page=Settings&status=success_li&user_id={user_id}")
@@ -1,139 +1,181 @@
-from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends
+from typing import Optional
 from pydantic import BaseModel
-from sqlmodel import Session
-from app.db.database import get_session
-from app.models.user import User
 from app.agents.project_crew import ProjectCrew
-from app.core.llm import get_llm # <--- NEW IMPORT
-from app.services.file_manager import save_project_files
-from app.services.task_manager import update_task, get_task
+from app.core.llm import get_llm
+from app.services.user_context import user_contexts
+from app.services.auth import get_current_user, authorize, TokenUser
+from app.services.file_manager import save_project_files, save_project_file
+from app.services.task_manager import update_task, create_job_async, list_jobs, register_job_handler, job_workers, JobFailed
+from app.core.structured import parse_model, record_regeneration, StructuredOutputError
+from app.core.checkpoint import clear_stages
+from app.models.schemas import ProjectFiles
 import json
 import os
-import re
 
 router = APIRouter()
 
+# "fanout" generates files one by one in parallel; "single" asks for all files in one JSON blob
+PROJECT_GENERATION_MODE = os.getenv("PROJECT_GENERATION_MODE", "fanout")
+
 class ProjectRequest(BaseModel):
     user_id: int
     description: str
     technology: str
     difficulty: str
 
-# --- UPDATED FUNCTION SIGNATURE ---
 def generate_and_save(
+    job_id: int,
     user_id: int, 
     description: str, 
     technology: str, 
     difficulty: str, 
     user_context: str,
-    api_key: str,      # Passed from route
-    model_pref: str    # Passed from route
+    **legacy           # api_key/model_pref of jobs queued by older versions; not used
 ):
+    """
+    Job handler for "project" jobs; runs on a job worker thread.
+    """
+    # Step 0: Initialize Dynamic LLM (key and model are looked up here, so
+    # the key is never written into the job table)
+    user = user_contexts.get(user_id)
+    if not user:
+        raise JobFailed("User not found")
     try:
-        # Step 0: Initialize Dynamic LLM
-        try:
-            crew_llm = get_llm(model_pref, api_key)
-        except ValueError as e:
-             update_task(user_id, "error", f"❌ Config Error: {str(e)}", 0)
-             return
-
-        # Step 1: Architecting
-        update_task(user_id, "processing", "🤖 Architect Designing Structure...", 20)
-        
-        # Instantiate Crew with LLM
-        crew = ProjectCrew(llm=crew_llm)
-        
-        enhanced_desc = f"{description}\n\nUser Context: {user_context}"
-        
-        # Step 2: Coding
-        update_task(user_id, "processing", "👨‍💻 Agents Writing Code...", 50)
-        
-        # Run Crew
+        crew_llm = get_llm(user.preferred_model, user.gemini_api_key)
+    except ValueError as e:
+        # Retrying won't fix a missing key
+        raise JobFailed(f"Config Error: {str(e)}")
+
+    # Instantiate Crew with LLM
+    crew = ProjectCrew(llm=crew_llm)
+    
+    enhanced_desc = f"{description}\n\nUser Context: {user_context}"
+    
+    project_name = description.split()[0:3]
+    project_name = "_".join(project_name).replace(" ", "")
+
+    # Stage checkpoints are keyed by job, so a retried attempt resumes where the last one failed
+    run_id = f"job-{job_id}"
+
+    if PROJECT_GENERATION_MODE == "single":
+        saved_count, failed = _build_single(job_id, run_id, crew, user_id, project_name, enhanced_desc, technology, difficulty), {}
+    else:
+        saved_count, failed = _build_fanout(job_id, run_id, crew, user_id, project_name, enhanced_desc, technology, difficulty)
+    clear_stages(run_id)
+    
+    # Save Metadata
+    base_dir = os.path.join(os.getcwd(), "generated_projects", f"user_{user_id}", project_name)
+    metadata = {
+        "original_description": description,
+        "tech_stack": technology,
+        "difficulty": difficulty
+    }
+    
+    if os.path.exists(base_dir):
+        with open(os.path.join(base_dir, "project_info.json"), "w") as f:
+            json.dump(metadata, f, indent=4)
+
+    update_task(job_id, "processing", "✅ Project Built Successfully!", 100)
+    return {"project_name": project_name, "files": saved_count, "failed_files": failed}
+
+
+def _build_single(job_id, run_id, crew, user_id, project_name, description, technology, difficulty):
+    """
+    Legacy mode: one crew run returns every file in a single JSON blob.
+    """
+    # Step 1: Architecting
+    update_task(job_id, "processing", "🤖 Architect Designing Structure...", 20)
+    
+    # Step 2: Coding
+    update_task(job_id, "processing", "👨‍💻 Agents Writing Code...", 50)
+    
+    # Run Crew
+    raw_output = crew.generate_project(description, technology, difficulty, run_id=run_id)
+    
+    # Handle Output (tolerant parse + repair, then one more developer pass;
+    # the architect's design is reused from its checkpoint)
+    try:
+        project_files = parse_model(raw_output, ProjectFiles, "project")
+    except StructuredOutputError:
+        record_regeneration("project")
+        raw_output = crew.generate_project(description, technology, difficulty, run_id=run_id, rerun_last=True)
+        project_files = parse_model(raw_output, ProjectFiles, "project")
+    final_code_str = json.dumps(project_files.root)
+
+    # Step 3: Saving
+    update_task(job_id, "processing", "💾 Saving Files...", 80)
+    
+    saved = save_project_files(str(user_id), project_name, final_code_str)
+    if saved.get("status") == "error":
+        raise Exception(f"Could not save files: {saved.get('message')}")
+    return len(saved.get("files", []))
+
+
+def _build_fanout(job_id, run_id, crew, user_id, project_name, description, technology, difficulty):
+    """
+    Fan-out mode: the architect's file list is generated file by file in
+    parallel, and each file is saved as soon as it is ready.
+    """
+    # Step 1: Architecting
+    update_task(job_id, "processing", "🤖 Architect Designing Structure...", 10)
+    design = crew.design_project(description, technology, difficulty, run_id=run_id)
+    if not design["files"]:
+        raise Exception("Architect returned an empty file list.")
+
+    # Step 2: Coding (20% -> 90% as files complete)
+    total = len(design["files"])
+    update_task(job_id, "processing", f"👨‍💻 Agents Writing Code (0/{total} files)...", 20)
+
+    save_errors = {}
+
+    def on_file(filename, content, done, total):
         try:
-            crew_result = crew.generate_project(enhanced_desc, technology, difficulty)
+            save_project_file(str(user_id), project_name, filename, content)
         except Exception as e:
-            if "429" in str(e):
-                update_task(user_id, "error", "❌ Rate Limit Reached. Please try later.", 0)
-                return
-            raise e
-        
-        # Handle Output
-        if hasattr(crew_result, 'raw'):
-            final_code_str = crew_result.raw
-        else:
-            final_code_str = str(crew_result)
-
-        # Cleanup Markdown
-        json_match = re.search(r"(\{.*\})", final_code_str, re.DOTALL)
-        if json_match:
-            final_code_str = json_match.group(1)
-        else:
-            final_code_str = final_code_str.replace("``````", "").strip()
-
-        # Step 3: Saving
-        update_task(user_id, "processing", "💾 Saving Files...", 80)
-        
-        project_name = description.split()[0:3]
-        project_name = "_".join(project_name).replace(" ", "")
-        
-        save_project_files(str(user_id), project_name, final_code_str)
-        
-        # Save Metadata
-        base_dir = os.path.join(os.getcwd(), "generated_projects", f"user_{user_id}", project_name)
-        metadata = {
-            "original_description": description,
-            "tech_stack": technology,
-            "difficulty": difficulty
-        }
-        
-        if os.path.exists(base_dir):
-            with open(os.path.join(base_dir, "project_info.json"), "w") as f:
-                json.dump(metadata, f, indent=4)
-
-        update_task(user_id, "completed", "✅ Project Built Successfully!", 100)
-        
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        update_task(user_id, "error", f"❌ Error: {str(e)}", 0)
+            save_errors[filename] = str(e)
+        # Also the cancellation checkpoint between files
+        update_task(job_id, "processing", f"👨‍💻 Agents Writing Code ({done}/{total} files)...", 20 + int(70 * done / total))
+
+    built = crew.generate_project_files(design, description, technology, difficulty, on_file=on_file, run_id=run_id)
+
+    failed = {**built["failed"], **save_errors}
+    saved_count = len(built["files"]) - len(save_errors)
+    if saved_count == 0:
+        raise Exception(f"Could not generate any files: {failed}")
+    return saved_count, failed
+
+
+register_job_handler("project", generate_and_save)
 
 
 @router.post("/generate-project")
-async def generate_project(req: ProjectRequest, background_tasks: BackgroundTasks, session: Session = Depends(get_session)):
-    # 1. Fetch User
-    user = session.get(User, req.user_id)
+async def generate_project(req: ProjectRequest, current_user: Optional[TokenUser] = Depends(get_current_user)):
+    authorize(current_user, req.user_id)
+    # 1. Fetch User (cached model/key/profile)
+    user = await user_contexts.get_async(req.user_id, version=current_user.profile_version if current_user else None)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    user_context = ""
-    if user.profile_data:
-        p = user.profile_data
-        if isinstance(p, str): 
-            try: p = json.loads(p)
-            except: pass
-        if isinstance(p, dict):
-             user_context = f"User Skill: {p.get('current_skill')}. Style: {p.get('learning_style')}."
-
-    # 2. Extract Key & Pref to pass to background task
-    # We pass these as strings so the background thread doesn't need a DB session
-    api_key = user.gemini_api_key
-    model_pref = user.preferred_model
-
-    # 3. Schedule Task
-    background_tasks.add_task(
-        generate_and_save, 
-        req.user_id, 
-        req.description, 
-        req.technology, 
-        req.difficulty, 
-        user_context,
-        api_key,     # Pass Key
-        model_pref   # Pass Model
-    )
+    # 2. Job payload (persisted, so no API key; the worker resolves it from user_id)
+    payload = {
+        "user_id": req.user_id,
+        "description": req.description,
+        "technology": req.technology,
+        "difficulty": req.difficulty,
+        "user_context": user.project_context
+    }
+
+    # 3. Queue Job (picked up by the job worker pool)
+    job = await create_job_async(req.user_id, "project", payload)
+    job_workers.notify()
     
-    return {"status": "started"}
+    return {"status": "started", "job_id": job["id"]}
 
 
 @router.get("/project-status/{user_id}")
-def check_status(user_id: int):
-    return get_task(user_id)
+def check_status(user_id: int, current_user: Optional[TokenUser] = Depends(get_current_user)):
+    authorize(current_user, user_id)
+    # Deprecated: use /jobs/{job_id}. Reports the user's latest project job.
+    jobs = list_jobs(user_id, limit=1, kind="project")
+    return jobs[0] if jobs else {"status": "idle", "progress": 0}
@@ -1,13 +1,20 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
 from pydantic import BaseModel
+from typing import Optional, Literal
 from sqlmodel import Session
-from app.db.database import get_session
-from app.models.user import User
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.db.database import get_session, get_async_session
 from app.agents.roadmap_crew import RoadmapCrew
-from app.core.llm import get_llm # <--- NEW IMPORT
+from app.services.user_context import user_contexts
+from app.services.auth import get_current_user, authorize, TokenUser
 import json
-from fastapi.responses import StreamingResponse
-from app.services.pdf_generator import PDFGenerator
+from app.core.executor import run_llm, PoolFull
+from app.core.llm import RequestCancelled
+from app.services.pdf_cache import pdf_response, pdf_path, cached_file_response
+from app.services.roadmap_store import save_roadmap, list_roadmaps, get_roadmap, get_roadmap_async
+from app.services.task_manager import create_job, get_job, job_workers
+from app.services import book_export  # registers the "book" job handler
+import os
 
 router = APIRouter()
 
@@ -16,57 +23,66 @@ class PDFRequest(BaseModel):
     duration: str
     data: dict
 
+class BookRequest(BaseModel):
+    user_id: int
+    include_quizzes: bool = True
+
 class RoadmapRequest(BaseModel):
     user_id: int 
     topic: str
     duration: str
     level: str
+    use_semantic_cache: bool = True
+    mode: Optional[Literal["quality", "fast"]] = None # None = server default (GENERATION_MODE)
 
 @router.post("/generate-roadmap")
-async def generate_roadmap(req: RoadmapRequest, session: Session = Depends(get_session)):
+async def generate_roadmap(req: RoadmapRequest, session: AsyncSession = Depends(get_async_session),
+                           current_user: Optional[TokenUser] = Depends(get_current_user)):
+    authorize(current_user, req.user_id)
     try:
-        # 1. Fetch User
-        user = session.get(User, req.user_id)
+        # 1. Fetch User (cached model/key/profile)
+        user = await user_contexts.get_async(req.user_id, version=current_user.profile_version if current_user else None)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
-        # 2. Build Personal Context (Keep existing logic)
-        personal_context = ""
-        if user.profile_data:
-            p = user.profile_data
-            if isinstance(p, str): 
-                try: p = json.loads(p)
-                except: pass
-            if isinstance(p, dict):
-                personal_context = (
-                    f" (Context: User has {p.get('daily_time')} daily. "
-                    f"Goal: {p.get('career_goal')}. Style: {p.get('learning_style')})"
-                )
-
-        # 3. Initialize Dynamic LLM (The Fix)
+        # 2. Initialize Dynamic LLM (The Fix)
         try:
-            crew_llm = get_llm(user.preferred_model, user.gemini_api_key)
+            crew_llm = user.llm()
         except ValueError as e:
             raise HTTPException(status_code=400, detail=str(e))
 
-        # 4. Instantiate Crew with LLM
+        # 3. Instantiate Crew with LLM
         roadmap_crew = RoadmapCrew(llm=crew_llm)
         
-        # 5. Append context
-        enhanced_topic = f"{req.topic}{personal_context}"
+        # 4. Append personal context
+        enhanced_topic = f"{req.topic}{user.roadmap_context}"
         
-        # 6. Execute Crew
-        result = roadmap_crew.create_roadmap(
-            topic=enhanced_topic,
+        # 5. Execute Crew (off the event loop)
+        final_output = await run_llm(
+            roadmap_crew.create_roadmap,
+            topic=req.topic,
             duration=req.duration,
-            level=req.level
+            level=req.level,
+            use_semantic_cache=req.use_semantic_cache,
+            mode=req.mode,
+            user_context=user.roadmap_context
         )
         
-        # CrewAI returns CrewOutput, handle string conversion
-        final_output = result.raw if hasattr(result, 'raw') else str(result)
+        # 6. Persist so it can be re-opened without another LLM run
+        saved = await save_roadmap(
+            session,
+            user_id=req.user_id,
+            topic=req.topic,
+            goal_description=enhanced_topic,
+            duration=req.duration,
+            level=req.level,
+            data=json.loads(final_output)  # Canonical JSON (validated against RoadmapPlan)
+        )
         
-        return {"status": "success", "roadmap": final_output}
+        return {"status": "success", "roadmap": final_output, "roadmap_id": saved.id}
 
+    except (PoolFull, RequestCancelled):
+        raise
     except Exception as e:
         # Handle Rate Limits specifically for better UX
         if "429" in str(e) or "ResourceExhausted" in str(e):
@@ -74,13 +90,80 @@ async def generate_roadmap(req: RoadmapRequest, session: Session = Depends(get_s
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/download-pdf")
-async def download_roadmap_pdf(req: PDFRequest):
-    pdf_gen = PDFGenerator()
-    pdf_buffer = pdf_gen.generate_roadmap_pdf(req.topic, req.duration, req.data)
-    
-    return StreamingResponse(
-        pdf_buffer, 
-        media_type="application/pdf", 
-        headers={"Content-Disposition": f"attachment; filename=roadmap_{req.topic}.pdf"}
-    )
+@router.get("/roadmaps")
+def user_roadmaps(user_id: int, limit: int = Query(20, ge=1, le=100), offset: int = Query(0, ge=0),
+                  session: Session = Depends(get_session), current_user: Optional[TokenUser] = Depends(get_current_user)):
+    """Saved roadmaps of a user, newest first (without the weeks)."""
+    authorize(current_user, user_id)
+    return list_roadmaps(session, user_id, limit, offset)
+
+
+@router.get("/roadmaps/{roadmap_id}")
+def roadmap_detail(roadmap_id: int, session: Session = Depends(get_session), current_user: Optional[TokenUser] = Depends(get_current_user)):
+    roadmap = get_roadmap(session, roadmap_id)
+    if not roadmap:
+        raise HTTPException(status_code=404, detail="Roadmap not found")
+    authorize(current_user, roadmap["user_id"])
+    return roadmap
+
+
+@router.get("/roadmaps/{roadmap_id}/pdf")
+async def roadmap_pdf(roadmap_id: int, request: Request, session: AsyncSession = Depends(get_async_session),
+                      current_user: Optional[TokenUser] = Depends(get_current_user)):
+    roadmap = await get_roadmap_async(session, roadmap_id)
+    if not roadmap:
+        raise HTTPException(status_code=404, detail="Roadmap not found")
+    authorize(current_user, roadmap["user_id"])
+    params = {"topic": roadmap["title"], "duration": roadmap["duration"], "data": roadmap["data"]}
+    return await pdf_response(request, "roadmap", params, "generate_roadmap_pdf",
+                              (roadmap["title"], roadmap["duration"], roadmap["data"]), f"roadmap_{roadmap['title']}.pdf")
+
+
+@router.post("/roadmaps/{roadmap_id}/book")
+def export_book(roadmap_id: int, req: BookRequest, session: Session = Depends(get_session),
+                current_user: Optional[TokenUser] = Depends(get_current_user)):
+    """
+    Queues a course book export (roadmap + every week's chapter and quiz in
+    one PDF). Follow it via /jobs/{job_id}; download from /books/{job_id}/pdf.
+    """
+    authorize(current_user, req.user_id)
+    roadmap = get_roadmap(session, roadmap_id)
+    if not roadmap or roadmap["user_id"] != req.user_id:
+        raise HTTPException(status_code=404, detail="Roadmap not found")
+    user = user_contexts.get(req.user_id, version=current_user.profile_version if current_user else None)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    payload = {
+        "user_id": req.user_id,
+        "roadmap_id": roadmap_id,
+        "include_quizzes": req.include_quizzes,
+        "user_context": user.assessment_context
+    }
+    job = create_job(req.user_id, "book", payload)
+    job_workers.notify()
+    return {"status": "started", "job_id": job["id"]}
+
+
+@router.get("/books/{job_id}/pdf")
+def book_pdf(job_id: int, request: Request, current_user: Optional[TokenUser] = Depends(get_current_user)):
+    job = get_job(job_id)
+    if not job or job["kind"] != "book":
+        raise HTTPException(status_code=404, detail="Book export not found")
+    authorize(current_user, job["user_id"])
+    if job["status"] != "completed":
+        raise HTTPException(status_code=409, detail=f"Book export is {job['status']}")
+    key = job["result"]["pdf_key"]
+    if f'"{key}"' in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers={"ETag": f'"{key}"'})
+    if not os.path.exists(pdf_path(key)):
+        raise HTTPException(status_code=410, detail="Book expired from the cache. Export it again.")
+    return cached_file_response(key, f"book_job_{job_id}.pdf")
+
+
+@router.post("/download-pdf", dependencies=[Depends(get_current_user)])
+async def download_roadmap_pdf(req: PDFRequest, request: Request):
+    # Prefer GET /roadmaps/{roadmap_id}/pdf, which doesn't re-upload the roadmap
+    params = {"topic": req.topic, "duration": req.duration, "data": req.data}
+    return await pdf_response(request, "roadmap", params, "generate_roadmap_pdf",
+                              (req.topic, req.duration, req.data), f"roadmap_{req.topic}.pdf")
@@ -1,12 +1,13 @@
 from fastapi import APIRouter, HTTPException, Depends
+from typing import Optional
 from pydantic import BaseModel
 import os
-from sqlmodel import Session
-from app.db.database import get_session
-from app.models.user import User
-from app.core.llm import get_llm # <--- NEW IMPORT
+from app.services.user_context import user_contexts
+from app.services.auth import get_current_user, authorize, TokenUser
 from app.services.github_manager import push_to_github
 from app.services.linkedin_manager import generate_linkedin_post, post_to_linkedin 
+from app.core.executor import run_llm, run_http, PoolFull
+from app.core.llm import RequestCancelled
 
 router = APIRouter()
 
@@ -31,15 +32,16 @@ class GitHubPushRequest(BaseModel):
     is_private: bool
 
 @router.post("/generate-social")
-async def generate_social(request: SocialRequest, session: Session = Depends(get_session)):
-    # 1. Fetch User
-    user = session.get(User, request.user_id)
+async def generate_social(request: SocialRequest, current_user: Optional[TokenUser] = Depends(get_current_user)):
+    authorize(current_user, request.user_id)
+    # 1. Fetch User (cached model/key)
+    user = await user_contexts.get_async(request.user_id, version=current_user.profile_version if current_user else None)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
         
     # 2. Get LLM
     try:
-        crew_llm = get_llm(user.preferred_model, user.gemini_api_key)
+        crew_llm = user.llm()
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -47,7 +49,8 @@ async def generate_social(request: SocialRequest, session: Session = Depends(get
     try:
         # We pass the LLM object to the service function
         # You need to update app/services/linkedin_manager.py to accept 'llm'
-        content = generate_linkedin_post(
+        content = await run_llm(
+            generate_linkedin_post,
             request.project_name, 
             request.description, 
             request.tech_stack, 
@@ -55,15 +58,17 @@ async def generate_social(request: SocialRequest, session: Session = Depends(get
             llm=crew_llm # <--- PASSING LLM
         )
         return {"content": content}
+    except (PoolFull, RequestCancelled):
+        raise
     except Exception as e:
         if "429" in str(e):
              raise HTTPException(status_code=429, detail="Gemini Rate Limit. Wait 60s.")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/linkedin/post")
+@router.post("/linkedin/post", dependencies=[Depends(get_current_user)])
 async def post_linkedin(request: LinkedInPostRequest):
-    result = post_to_linkedin(request.token, request.content)
+    result = await run_http(post_to_linkedin, request.token, request.content)
     
     if result.get("status") == "error":
         raise HTTPException(status_code=400, detail=result.get("message"))
@@ -72,7 +77,8 @@ async def post_linkedin(request: LinkedInPostRequest):
 
 
 @router.post("/github/push")
-async def github_push(request: GitHubPushRequest):
+async def github_push(request: GitHubPushRequest, current_user: Optional[TokenUser] = Depends(get_current_user)):
+    authorize(current_user, request.user_id)
     user_folder = f"user_{request.user_id}"
     project_path = os.path.join(BASE_PROJECT_DIR, user_folder, request.project_name)
     
@@ -91,7 +97,8 @@ async def github_push(request: GitHubPushRequest):
         else:
              return {"status": "error", "message": f"User folder not found: {user_folder}"}
 
-    result = push_to_github(
+    result = await run_http(
+        push_to_github,
         request.token, 
         request.project_name, 
         request.description, 
@@ -1,7 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlmodel import Session
+from sqlalchemy import func
 from app.db.database import get_session
 from app.models.user import User
+from app.services.user_context import user_contexts
+from app.services.auth import get_current_user, authorize, create_token_pair, TokenUser
 from pydantic import BaseModel
 from typing import Optional
 
@@ -16,7 +19,8 @@ class KeyUpdate(BaseModel):
     preferred_model: Optional[str] = None
 
 @router.post("/user/update-keys")
-def update_keys(data: KeyUpdate, session: Session = Depends(get_session)):
+def update_keys(data: KeyUpdate, session: Session = Depends(get_session), current_user: Optional[TokenUser] = Depends(get_current_user)):
+    authorize(current_user, data.user_id)
     user = session.get(User, data.user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -32,15 +36,20 @@ def update_keys(data: KeyUpdate, session: Session = Depends(get_session)):
         user.gemini_api_key = data.gemini_api_key
     if data.preferred_model is not None:
         user.preferred_model = data.preferred_model
+    # Incremented in SQL: concurrent updates must each get their own version
+    user.profile_version = func.coalesce(User.profile_version, 0) + 1
         
     session.add(user)
     session.commit()
     session.refresh(user)
-    return {"status": "success", "message": "Configuration updated successfully"}
+    user_contexts.invalidate(data.user_id)
+    # New tokens carry the new model and profile version to every worker
+    return {"status": "success", "message": "Configuration updated successfully", **create_token_pair(user)}
 
 
 @router.get("/user/{user_id}/keys")
-def get_keys(user_id: int, session: Session = Depends(get_session)):
+def get_keys(user_id: int, session: Session = Depends(get_session), current_user: Optional[TokenUser] = Depends(get_current_user)):
+    authorize(current_user, user_id)
     user = session.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -0,0 +1,173 @@
+import os
+import re
+import json
+import hashlib
+import threading
+import diskcache
+from cachetools import TTLCache
+from dotenv import load_dotenv
+from app.core.semantic_cache import semantic_cache, SEMANTIC_CACHE_ENABLED
+from app.core.singleflight import crew_flights, SINGLEFLIGHT_CREWS
+from app.core.structured import parse_model, record_regeneration, StructuredOutputError
+from app.core.checkpoint import kickoff_stages, clear_stages, CHECKPOINTS_ENABLED
+
+load_dotenv()
+
+# Bump whenever a crew's task templates change so stale outputs are never served
+PROMPT_VERSION = "2"
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(os.getcwd(), ".cache"))
+
+# Tier 1: in-process LRU
+MEMORY_CACHE_ITEMS = int(os.getenv("RESPONSE_CACHE_MEMORY_ITEMS", "512"))
+MEMORY_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_MEMORY_TTL", "3600"))
+
+# Tier 2: persistent diskcache (shared by every worker on the host)
+DISK_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_DISK_TTL", str(7 * 24 * 3600)))
+DISK_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_DISK_BYTES", str(512 * 1024 * 1024)))
+
+# Full crew re-runs allowed when a structured output can't be parsed or repaired
+STRUCTURED_OUTPUT_RETRIES = int(os.getenv("STRUCTURED_OUTPUT_RETRIES", "1"))
+
+
+class ResponseCache:
+    """
+    Two-tier (memory -> disk) content-addressed cache for crew outputs.
+    """
+
+    def __init__(self, directory=CACHE_DIR, memory_items=MEMORY_CACHE_ITEMS, memory_ttl=MEMORY_CACHE_TTL,
+                 disk_ttl=DISK_CACHE_TTL, disk_size=DISK_CACHE_SIZE):
+        self.directory = os.path.join(directory, "responses")
+        self.disk_ttl = disk_ttl
+        self.disk_size = disk_size
+        self._memory = TTLCache(maxsize=memory_items, ttl=memory_ttl)
+        self._disk = None
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0}
+
+    @property
+    def disk(self):
+        # Opened lazily so importing the module doesn't touch the filesystem
+        if self._disk is None:
+            self._disk = diskcache.Cache(self.directory, size_limit=self.disk_size)
+        return self._disk
+
+    @staticmethod
+    def make_key(crew_type: str, prompts: list, model: str) -> str:
+        payload = json.dumps([crew_type, PROMPT_VERSION, model, prompts], sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _count(self, stat):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def get(self, key: str):
+        with self._lock:
+            value = self._memory.get(key)
+        if value is not None:
+            self._count("memory_hits")
+            return value
+
+        value = self.disk.get(key)
+        if value is not None:
+            # Promote to the memory tier
+            with self._lock:
+                self._memory[key] = value
+            self._count("disk_hits")
+            return value
+
+        self._count("misses")
+        return None
+
+    def set(self, key: str, value: str):
+        with self._lock:
+            self._memory[key] = value
+        self.disk.set(key, value, expire=self.disk_ttl)
+        self._count("writes")
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["memory_items"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 3) if lookups else 0.0
+        return stats
+
+
+response_cache = ResponseCache()
+
+
+def cached_kickoff(crew_type: str, crew, llm, semantic_query: str = None, semantic_filters: dict = None,
+                   use_semantic_cache: bool = True, output_model=None) -> str:
+    """
+    Runs crew.kickoff() unless an identical crew (same rendered task prompts,
+    same model, same prompt version) already produced an output. When a
+    semantic_query is given, near-duplicate past requests are reused as well.
+    With an output_model, the output is validated (and repaired if needed)
+    before caching, and the crew re-runs if it can't be parsed; the returned
+    string is then the model's canonical JSON. Always returns a string.
+    """
+    prompts = [[task.description, task.expected_output] for task in crew.tasks]
+    model = getattr(llm, "model", "default")
+    key = response_cache.make_key(crew_type, prompts, model)
+
+    use_semantic = RESPONSE_CACHE_ENABLED and SEMANTIC_CACHE_ENABLED and use_semantic_cache and semantic_query
+    semantic_filters = dict(semantic_filters or {}, model=model, prompt_version=PROMPT_VERSION)
+
+    if RESPONSE_CACHE_ENABLED:
+        cached = response_cache.get(key)
+        if cached is not None:
+            return cached
+
+    if use_semantic:
+        similar_key = semantic_cache.lookup(crew_type, semantic_query, semantic_filters)
+        cached = response_cache.get(similar_key) if similar_key else None
+        if cached is not None:
+            return cached
+
+    staged = CHECKPOINTS_ENABLED and len(crew.tasks) > 1
+
+    def execute():
+        for attempt in range(STRUCTURED_OUTPUT_RETRIES + 1):
+            if staged:
+                # The cache key doubles as the run ID: a retry of the same request
+                # resumes after the last stage that succeeded, and a parse failure
+                # re-runs only the final (formatting) stage.
+                raw_output = kickoff_stages(crew, key, crew_type, rerun_last=attempt > 0)
+            else:
+                result = crew.kickoff()
+                raw_output = result.raw if hasattr(result, 'raw') else str(result)
+            if output_model is None:
+                break
+            try:
+                raw_output = parse_model(raw_output, output_model, crew_type).model_dump_json(exclude_none=True)
+                break
+            except StructuredOutputError:
+                if attempt == STRUCTURED_OUTPUT_RETRIES:
+                    if staged:
+                        # Keep the earlier stages, drop the unusable final one
+                        clear_stages(key, [str(len(crew.tasks) - 1)])
+                    raise
+                record_regeneration(crew_type)
+
+        if staged:
+            clear_stages(key)
+
+        if RESPONSE_CACHE_ENABLED and raw_output:
+            response_cache.set(key, raw_output)
+            if use_semantic:
+                semantic_cache.add(crew_type, semantic_query, key, semantic_filters)
+        return raw_output
+
+    if crew_type not in SINGLEFLIGHT_CREWS:
+        return execute()
+
+    # Identical requests in flight right now share one execution
+    normalized = [[_normalize(part) for part in task] for task in prompts]
+    flight_key = response_cache.make_key(crew_type, normalized, model)
+    return crew_flights.do(flight_key, execute)
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", (text or "")).strip().lower()
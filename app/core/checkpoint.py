@@ -0,0 +1,114 @@
+import os
+import threading
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from sqlalchemy import delete
+from sqlmodel import Session, select
+from app.db.database import engine, upsert
+from app.models.user import CrewCheckpoint
+
+load_dotenv()
+
+# Sequential crews (counselor -> architect, professor -> examiner, ...) persist
+# each stage's output under a run ID. Re-running the same run skips the stages
+# that already succeeded, e.g. only the cheap formatting stage is redone when
+# its JSON can't be parsed.
+CHECKPOINTS_ENABLED = os.getenv("CREW_CHECKPOINTS_ENABLED", "true").lower() == "true"
+CHECKPOINT_TTL_HOURS = int(os.getenv("CREW_CHECKPOINT_TTL_HOURS", "24"))
+
+DIVIDERS = "\n\n----------\n\n"
+
+_stats = {"stages_executed": 0, "stages_resumed": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(name: str):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def load_stage(run_id: str, stage: str):
+    with Session(engine) as session:
+        checkpoint = session.exec(
+            select(CrewCheckpoint).where(CrewCheckpoint.run_id == run_id, CrewCheckpoint.stage == stage)
+        ).first()
+        return checkpoint.output if checkpoint else None
+
+
+def save_stage(run_id: str, crew_type: str, stage: str, output: str):
+    # Fan-out threads and a retried job can save the same stage at once
+    values = {"run_id": run_id, "crew_type": crew_type, "stage": stage, "output": output,
+              "created_at": datetime.utcnow()}
+    with Session(engine) as session:
+        session.execute(upsert(engine.dialect.name, CrewCheckpoint, values,
+                               index_elements=["run_id", "stage"], update=["output", "created_at"]))
+        session.commit()
+
+
+def clear_stages(run_id: str, stages=None):
+    """Deletes the given stages of a run (all of them if stages is None)."""
+    with Session(engine) as session:
+        statement = delete(CrewCheckpoint).where(CrewCheckpoint.run_id == run_id)
+        if stages is not None:
+            statement = statement.where(CrewCheckpoint.stage.in_(list(stages)))
+        session.execute(statement)
+        session.commit()
+
+
+def purge_stale_checkpoints():
+    """Drops checkpoints of runs abandoned more than CHECKPOINT_TTL_HOURS ago."""
+    cutoff = datetime.utcnow() - timedelta(hours=CHECKPOINT_TTL_HOURS)
+    with Session(engine) as session:
+        session.execute(delete(CrewCheckpoint).where(CrewCheckpoint.created_at < cutoff))
+        session.commit()
+
+
+def run_stage(run_id: str, crew_type: str, stage: str, func):
+    """
+    Returns the checkpointed output of a stage, or runs func() -> str and saves it.
+    """
+    if run_id and CHECKPOINTS_ENABLED:
+        output = load_stage(run_id, stage)
+        if output is not None:
+            _count("stages_resumed")
+            return output
+    output = func()
+    _count("stages_executed")
+    if run_id and CHECKPOINTS_ENABLED and output:
+        save_stage(run_id, crew_type, stage, output)
+    return output
+
+
+def kickoff_stages(crew, run_id: str, crew_type: str, rerun_last: bool = False) -> str:
+    """
+    Runs a sequential crew task by task, checkpointing each task's raw output.
+    Context is passed the way Crew does it: a task's explicit `context` tasks,
+    otherwise every earlier output. With rerun_last, the final stage's
+    checkpoint is discarded first so only that stage runs again.
+    Returns the last task's raw output.
+    """
+    tasks = crew.tasks
+    last_stage = str(len(tasks) - 1)
+    if rerun_last and run_id and CHECKPOINTS_ENABLED:
+        clear_stages(run_id, [last_stage])
+
+    outputs = {}
+    for index, task in enumerate(tasks):
+        if isinstance(task.context, list):
+            context = DIVIDERS.join(
+                outputs[i] for i, earlier in enumerate(tasks[:index]) if any(earlier is t for t in task.context)
+            )
+        else:
+            context = DIVIDERS.join(outputs[i] for i in range(index))
+
+        def execute(task=task, context=context):
+            return task.execute_sync(agent=task.agent, context=context or None).raw
+
+        outputs[index] = run_stage(run_id, crew_type, str(index), execute)
+
+    return outputs[len(tasks) - 1]
+
+
+def get_checkpoint_stats():
+    with _stats_lock:
+        return dict(_stats)
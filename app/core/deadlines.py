@@ -0,0 +1,84 @@
+import re
+import asyncio
+from typing import Optional
+from app.core.llm import begin_llm_caller, finish_llm_caller, REQUEST_DEADLINE_SECONDS
+
+# Clients can ask for a shorter budget than REQUEST_DEADLINE_SECONDS (never a
+# longer one). A client that simply times out doesn't need it: its disconnect
+# already stops the crew.
+DEADLINE_HEADER = b"x-request-timeout"
+
+# Long-lived streams that outlive any generation (job progress, which book
+# exports report through too) and make no LLM calls of their own: no budget
+UNBUDGETED_PATHS = re.compile(r"^/api/v1/jobs/\d+/events$")
+
+
+def _budget(scope) -> Optional[float]:
+    if UNBUDGETED_PATHS.match(scope.get("path", "")):
+        return None
+    for name, value in scope.get("headers", []):
+        if name == DEADLINE_HEADER:
+            try:
+                return max(0.0, min(float(value), REQUEST_DEADLINE_SECONDS))
+            except ValueError:
+                break
+    return REQUEST_DEADLINE_SECONDS
+
+
+class RequestDeadlineMiddleware:
+    """
+    Gives each HTTP request an LLMCaller (see app.core.llm) with its time
+    budget, cancels it when the client disconnects, and reports the LLM
+    queue wait in an X-LLM-Queue-Wait-Ms response header.
+
+    Cancelling stops the request's crews at their next LLM call. A provider
+    call already in flight is not aborted; it runs to completion and its
+    tokens are booked as wasted.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        caller = begin_llm_caller(budget=_budget(scope))
+        messages = asyncio.Queue()
+        responded = gone = False
+
+        async def pump():
+            # Sole reader of the server's receive(), so a disconnect is seen
+            # even while the route is busy (or never reads the body at all)
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect" and not responded:
+                    caller.cancel("disconnected")
+                messages.put_nowait(message)
+                if message["type"] == "http.disconnect":
+                    return
+
+        async def wrapped_receive():
+            nonlocal gone
+            if gone:
+                return {"type": "http.disconnect"}
+            message = await messages.get()
+            gone = message["type"] == "http.disconnect"
+            return message
+
+        async def wrapped_send(message):
+            nonlocal responded
+            if message["type"] == "http.response.body" and not message.get("more_body"):
+                responded = True
+            if message["type"] == "http.response.start" and caller.calls:
+                headers = list(message.get("headers", []))
+                headers.append((b"x-llm-queue-wait-ms", str(round(caller.queue_wait * 1000)).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        reader = asyncio.ensure_future(pump())
+        try:
+            await self.app(scope, wrapped_receive, wrapped_send)
+        finally:
+            reader.cancel()
+            finish_llm_caller(caller)
@@ -0,0 +1,200 @@
+import os
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from contextlib import contextmanager
+from anyio import CapacityLimiter, to_thread
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Blocking work (crew.kickoff, llm.call, ReportLab doc.build) must never run
+# on the event loop thread, otherwise one slow Gemini call freezes every
+# other request served by the worker (logins, /project-status polls, ...).
+# Each workload class gets its own bounded pool so they can't starve each other.
+LLM_WORKERS = int(os.getenv("LLM_WORKERS", "16"))
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", "4"))
+# Outbound API calls (GitHub uploads, LinkedIn posts) wait on the network,
+# not the CPU, but can take seconds each
+HTTP_WORKERS = int(os.getenv("HTTP_WORKERS", "8"))
+# CPU-bound work (ReportLab layout) holds the GIL, so threads don't help it;
+# it runs in a pool of worker processes instead. 0 = use the render threads.
+CPU_PROCESSES = int(os.getenv("CPU_PROCESSES", str(min(4, os.cpu_count() or 1))))
+# Argon2 password hashing gets its own processes so a burst of PDF renders
+# can't delay logins (and the other way round). 0 = use the render threads.
+AUTH_PROCESSES = int(os.getenv("AUTH_PROCESSES", "2"))
+
+# Requests that may wait for a busy pool, beyond the ones it is running.
+# Past that the request is turned away with 503 + Retry-After instead of
+# piling up on the event loop.
+_queue_limits = {
+    "llm": int(os.getenv("LLM_QUEUE_LIMIT", "64")),
+    "render": int(os.getenv("RENDER_QUEUE_LIMIT", "32")),
+    "http": int(os.getenv("HTTP_QUEUE_LIMIT", "32")),
+    "cpu": int(os.getenv("CPU_QUEUE_LIMIT", "32")),
+    "auth": int(os.getenv("AUTH_QUEUE_LIMIT", "64")),
+}
+EXECUTOR_RETRY_AFTER_SECONDS = int(os.getenv("EXECUTOR_RETRY_AFTER_SECONDS", "5"))
+
+_limiters = {}
+_sizes = {
+    "llm": LLM_WORKERS,
+    "render": RENDER_WORKERS,
+    "http": HTTP_WORKERS,
+    "cpu": CPU_PROCESSES,
+    "auth": AUTH_PROCESSES,
+}
+
+
+class PoolFull(Exception):
+    """A pool's queue is full. Routes answer 503 with Retry-After (see app.main)."""
+
+    def __init__(self, pool: str, retry_after: int = EXECUTOR_RETRY_AFTER_SECONDS):
+        super().__init__(f"Server busy ({pool} pool is full). Retry in {retry_after}s.")
+        self.pool = pool
+        self.retry_after = retry_after
+
+
+class _Bulkhead:
+    """In-flight/queued accounting and admission for one pool."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.workers = max(_sizes[name], 0)
+        self.max_queue = _queue_limits[name]
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.stats = {"completed": 0, "rejected": 0, "peak_queued": 0}
+
+    def _queued(self):
+        return max(0, self.in_flight - self.workers)
+
+    @contextmanager
+    def admit(self, reject: bool = True):
+        # Job worker threads pass reject=False: they are already queued
+        # work, so they wait for a slot instead of failing
+        with self._lock:
+            if reject and self.in_flight >= self.workers + self.max_queue:
+                self.stats["rejected"] += 1
+                raise PoolFull(self.name)
+            self.in_flight += 1
+            self.stats["peak_queued"] = max(self.stats["peak_queued"], self._queued())
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                self.stats["completed"] += 1
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "running": min(self.in_flight, self.workers),
+                "queued": self._queued(),
+                "queue_limit": self.max_queue,
+                **self.stats,
+            }
+
+
+_bulkheads = {name: _Bulkhead(name) for name in _sizes}
+
+def get_executor_stats():
+    return {name: bulkhead.get_stats() for name, bulkhead in _bulkheads.items()}
+
+def _get_limiter(pool: str) -> CapacityLimiter:
+    # Created lazily so the limiter binds to the running event loop
+    if pool not in _limiters:
+        _limiters[pool] = CapacityLimiter(_sizes[pool])
+    return _limiters[pool]
+
+async def run_blocking(pool: str, func, *args, **kwargs):
+    """
+    Runs a blocking callable in a worker thread of the given pool ("llm",
+    "render" or "http"). Raises PoolFull when the pool's queue is full.
+    """
+    with _bulkheads[pool].admit():
+        return await to_thread.run_sync(partial(func, *args, **kwargs), limiter=_get_limiter(pool))
+
+async def run_llm(func, *args, **kwargs):
+    """Offloads a crew kickoff / LLM call."""
+    return await run_blocking("llm", func, *args, **kwargs)
+
+async def run_render(func, *args, **kwargs):
+    """Offloads a PDF build."""
+    return await run_blocking("render", func, *args, **kwargs)
+
+async def run_http(func, *args, **kwargs):
+    """Offloads a blocking outbound API call (requests, PyGithub)."""
+    return await run_blocking("http", func, *args, **kwargs)
+
+_process_pools = {}
+_process_pool_lock = threading.Lock()
+
+def _get_process_pool(pool: str = "cpu"):
+    with _process_pool_lock:
+        if pool not in _process_pools:
+            # "spawn": forking a process that runs crew/HTTP threads is unsafe
+            _process_pools[pool] = ProcessPoolExecutor(max_workers=_sizes[pool], mp_context=multiprocessing.get_context("spawn"))
+        return _process_pools[pool]
+
+def _reset_process_pool(pool: str):
+    # A worker died (e.g. OOM); start a fresh pool for the next call
+    with _process_pool_lock:
+        executor = _process_pools.pop(pool, None)
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+async def run_process(pool: str, func, *args):
+    """
+    Runs a CPU-bound function in a worker process pool ("cpu" or "auth").
+    func and args must be picklable (a module-level function). Raises
+    PoolFull when the pool's queue is full.
+    """
+    if _sizes[pool] <= 0:
+        return await run_render(func, *args)
+    loop = asyncio.get_running_loop()
+    with _bulkheads[pool].admit():
+        try:
+            return await loop.run_in_executor(_get_process_pool(pool), partial(func, *args))
+        except BrokenProcessPool:
+            _reset_process_pool(pool)
+            raise
+
+async def run_cpu(func, *args):
+    """Runs a CPU-bound function (PDF layout) in the worker process pool."""
+    return await run_process("cpu", func, *args)
+
+def run_cpu_sync(func, *args):
+    """
+    Blocking variant of run_cpu for code that is already off the event loop
+    (job worker threads).
+    """
+    if CPU_PROCESSES <= 0:
+        return func(*args)
+    with _bulkheads["cpu"].admit(reject=False):
+        try:
+            return _get_process_pool("cpu").submit(func, *args).result()
+        except BrokenProcessPool:
+            _reset_process_pool("cpu")
+            raise
+
+def warm_up_process_pool():
+    """Starts the worker processes ahead of the first render (spawn start-up is slow)."""
+    futures = []
+    for pool in ("cpu", "auth"):
+        if _sizes[pool] > 0:
+            executor = _get_process_pool(pool)
+            futures += [executor.submit(os.getpid) for _ in range(_sizes[pool])]
+    for future in futures:
+        future.result()
+
+def shutdown_process_pool():
+    with _process_pool_lock:
+        pools = list(_process_pools.values())
+        _process_pools.clear()
+    for executor in pools:
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -1,5 +1,15 @@
 import os
+import re
+import time
+import hashlib
+import threading
+import contextvars
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Optional
+import httpx
 from crewai import LLM
+from crewai.llms.base_llm import BaseLLM
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -8,38 +18,645 @@ load_dotenv()
 ADMIN_PERPLEXITY_KEY = os.getenv("PERPLEXITY_API_KEY")
 ADMIN_GEMINI_KEY = os.getenv("GEMINI_API_KEY")
 
-def get_llm(user_preference="gemini", user_api_key=None):
+PERPLEXITY_MODEL = "sonar-pro"
+PERPLEXITY_BASE_URL = "https://api.perplexity.ai"
+# Prefix 'gemini/' tells CrewAI/LiteLLM to use the Google provider
+GEMINI_MODEL = "gemini/gemini-2.0-flash-exp"
+
+# Default execution mode for roadmap/assessment crews (requests may override):
+# "quality" runs the multi-agent pipeline, "fast" one schema-constrained call.
+GENERATION_MODE = os.getenv("GENERATION_MODE", "quality")
+
+# --- ADAPTIVE CONCURRENCY (AIMD) ---
+# Free-tier keys answer bursts with 429s. Instead of surfacing those to the
+# student, calls queue per (provider, key), concurrency halves on every 429
+# and creeps back up on success, and the call waits up to a deadline.
+LLM_CONCURRENCY_INITIAL = int(os.getenv("LLM_CONCURRENCY_INITIAL", "4"))
+LLM_CONCURRENCY_MIN = int(os.getenv("LLM_CONCURRENCY_MIN", "1"))
+LLM_CONCURRENCY_MAX = int(os.getenv("LLM_CONCURRENCY_MAX", "16"))
+LLM_QUEUE_DEADLINE_SECONDS = float(os.getenv("LLM_QUEUE_DEADLINE_SECONDS", "90"))
+LLM_DEFAULT_BACKOFF_SECONDS = float(os.getenv("LLM_DEFAULT_BACKOFF_SECONDS", "5"))
+
+
+class RateLimitTimeout(Exception):
+    """Raised when a call could not get through a throttled key before its deadline."""
+
+
+# --- FAIR SHARE (ADMIN KEYS) ---
+# Users without their own key all share the admin keys. On those keys the
+# waiting calls are served in weighted fair order (the user who has used
+# the least, weighted by priority class, goes next) instead of first come
+# first served, so one student's project build can't starve the class.
+# Each user is also capped in concurrent calls and in tokens per hour.
+LLM_USER_MAX_IN_FLIGHT = int(os.getenv("LLM_USER_MAX_IN_FLIGHT", "2"))
+LLM_USER_TOKENS_PER_HOUR = int(os.getenv("LLM_USER_TOKENS_PER_HOUR", "200000"))  # 0 = no cap
+LLM_PRIORITY_WEIGHTS = {
+    "interactive": float(os.getenv("LLM_WEIGHT_INTERACTIVE", "4")),  # a user waiting on the page
+    "background": float(os.getenv("LLM_WEIGHT_BACKGROUND", "1")),    # project builds, book exports
+}
+
+
+class AdminKeyQuotaExceeded(RateLimitTimeout):
+    """Raised when a user has used up their hourly share of an admin key."""
+
+
+# --- DEADLINES & CANCELLATION ---
+# Every request and job has a time budget. Crews check it (and whether the
+# client is still there) before each LLM call, so abandoned work stops at
+# the next call instead of running to the end for nobody. A call already
+# sent to the provider can't be recalled; its tokens count as wasted.
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "180"))
+JOB_DEADLINE_SECONDS = float(os.getenv("JOB_DEADLINE_SECONDS", "1800"))
+
+
+class RequestCancelled(Exception):
+    """The request or job the LLM call is for was abandoned (client gone, job cancelled)."""
+
+
+class DeadlineExceeded(RequestCancelled):
+    """The request or job ran out of its time budget."""
+
+
+_abandon_stats = {"disconnected": 0, "cancelled": 0, "deadline": 0, "calls_skipped": 0, "wasted_tokens": 0}
+_abandon_lock = threading.Lock()
+
+
+@dataclass
+class LLMCaller:
     """
-    Returns a crewai.LLM instance based on user preference.
+    Who the LLM calls of the current request/job are made for, and until
+    when they are wanted. Mutable, so worker threads (which get a copy of
+    the context) report wait time and tokens back, and see cancellation.
     """
-    
+    user_id: Optional[int] = None
+    priority: str = "interactive"
+    calls: int = 0
+    queue_wait: float = 0.0
+    tokens: int = 0
+    deadline: Optional[float] = None    # time.monotonic()
+    cancelled: Optional[str] = None     # "disconnected", "cancelled" or "deadline"
+    # Callables saying someone else still wants this work (single-flight waiters)
+    shields: list = field(default_factory=list, repr=False)
+
+    def cancel(self, reason: str = "cancelled"):
+        if self.cancelled is None:
+            self.cancelled = reason
+
+    def remaining(self) -> Optional[float]:
+        return None if self.deadline is None else self.deadline - time.monotonic()
+
+    def check(self):
+        """Raises RequestCancelled/DeadlineExceeded if this work is no longer wanted."""
+        if any(shield() for shield in self.shields):
+            return
+        if self.cancelled is None and self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancel("deadline")
+        if self.cancelled is None:
+            return
+        with _abandon_lock:
+            _abandon_stats["calls_skipped"] += 1
+        if self.cancelled == "deadline":
+            raise DeadlineExceeded("Request deadline exceeded; generation stopped.")
+        raise RequestCancelled(f"Generation stopped ({self.cancelled}).")
+
+
+_llm_caller = contextvars.ContextVar("llm_caller", default=None)
+
+
+def current_llm_caller() -> Optional[LLMCaller]:
+    return _llm_caller.get()
+
+
+def begin_llm_caller(user_id: Optional[int] = None, priority: str = "interactive",
+                     budget: Optional[float] = None) -> LLMCaller:
+    """Starts a fresh LLMCaller for this context (a request or a job) with a budget in seconds."""
+    caller = LLMCaller(user_id, priority)
+    if budget is not None:
+        caller.deadline = time.monotonic() + budget
+    _llm_caller.set(caller)
+    return caller
+
+
+def finish_llm_caller(caller: LLMCaller):
+    """Books the tokens of abandoned work as wasted. Call once the request/job is over."""
+    if caller.cancelled is None:
+        return
+    with _abandon_lock:
+        _abandon_stats[caller.cancelled] += 1
+        _abandon_stats["wasted_tokens"] += caller.tokens
+
+
+def get_abandon_stats():
+    with _abandon_lock:
+        return dict(_abandon_stats)
+
+
+def set_llm_caller(user_id: int, priority: str = "interactive") -> LLMCaller:
+    """Attributes this context's LLM calls to user_id (keeps the request's wait totals)."""
+    caller = _llm_caller.get()
+    if caller is None:
+        return begin_llm_caller(user_id, priority)
+    caller.user_id, caller.priority = user_id, priority
+    return caller
+
+
+def _estimate_tokens(value) -> int:
+    # ~4 characters per token; good enough for shares and caps
+    if isinstance(value, str):
+        return len(value) // 4
+    if isinstance(value, dict):
+        return _estimate_tokens(value.get("content") or "")
+    if isinstance(value, (list, tuple)):
+        return sum(_estimate_tokens(v) for v in value)
+    return len(str(value or "")) // 4
+
+
+class _UserShare:
+    def __init__(self):
+        self.in_flight = 0
+        self.vtime = 0.0              # weighted tokens served, the fair-queue key
+        self.window = deque()         # (monotonic time, tokens) over the last hour
+        self.window_tokens = 0
+        self.calls = 0
+        self.queue_wait = 0.0
+
+    def add_tokens(self, now: float, tokens: int):
+        self.window.append((now, tokens))
+        self.window_tokens += tokens
+
+    def tokens_last_hour(self, now: float) -> int:
+        while self.window and now - self.window[0][0] > 3600:
+            self.window_tokens -= self.window.popleft()[1]
+        return self.window_tokens
+
+
+class _Ticket:
+    __slots__ = ("user_id", "weight", "seq")
+
+    def __init__(self, user_id, weight, seq):
+        self.user_id, self.weight, self.seq = user_id, weight, seq
+
+
+class AdaptiveLimiter:
+    """
+    Additive-increase / multiplicative-decrease concurrency limit for one provider key.
+    """
+
+    def __init__(self, initial=LLM_CONCURRENCY_INITIAL, minimum=LLM_CONCURRENCY_MIN, maximum=LLM_CONCURRENCY_MAX,
+                 fair: bool = False):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.in_flight = 0
+        self.waiting = 0
+        self.blocked_until = 0.0
+        self._cond = threading.Condition()
+        self.stats = {"calls": 0, "throttled": 0, "queued": 0, "timeouts": 0}
+        if fair:
+            self.stats["quota_rejected"] = 0
+        # Shared (admin) keys schedule waiters per user; see FAIR SHARE above
+        self.fair = fair
+        self._users = {}
+        self._tickets = []
+        self._seq = 0
+        self._virtual_clock = 0.0
+
+    def _share(self, user_id) -> _UserShare:
+        share = self._users.get(user_id)
+        if share is None:
+            share = self._users[user_id] = _UserShare()
+        return share
+
+    def _capped(self, user_id) -> bool:
+        # Anonymous calls (warm-up, scripts) aren't per-user capped
+        return user_id is not None and self._share(user_id).in_flight >= LLM_USER_MAX_IN_FLIGHT
+
+    def _is_next(self, ticket: _Ticket) -> bool:
+        if self._capped(ticket.user_id):
+            return False
+        best = min(
+            (t for t in self._tickets if not self._capped(t.user_id)),
+            key=lambda t: (self._share(t.user_id).vtime, t.seq),
+        )
+        return best is ticket
+
+    def acquire(self, deadline: float, user_id=None, priority: str = "interactive", tokens: int = 0, abort=None):
+        with self._cond:
+            ticket = None
+            if self.fair:
+                share = self._share(user_id)
+                now = time.monotonic()
+                if user_id is not None and LLM_USER_TOKENS_PER_HOUR and \
+                        share.tokens_last_hour(now) >= LLM_USER_TOKENS_PER_HOUR:
+                    self.stats["quota_rejected"] += 1
+                    raise AdminKeyQuotaExceeded(
+                        "429: Hourly share of the shared API key used up. Add your own key in Settings to continue."
+                    )
+                # A user coming back from idle starts level with the others
+                # instead of cashing in the time they were away
+                share.vtime = max(share.vtime, self._virtual_clock)
+                self._seq += 1
+                ticket = _Ticket(user_id, LLM_PRIORITY_WEIGHTS.get(priority, 1.0), self._seq)
+                self._tickets.append(ticket)
+            try:
+                self._acquire(deadline, ticket, abort)
+            finally:
+                if ticket is not None:
+                    self._tickets.remove(ticket)
+                    self._cond.notify_all()
+            if ticket is not None:
+                share = self._share(user_id)
+                self._virtual_clock = max(self._virtual_clock, share.vtime)
+                share.in_flight += 1
+                share.calls += 1
+                # Charge the prompt now; the completion is charged on release
+                share.vtime += max(tokens, 1) / ticket.weight
+                share.add_tokens(time.monotonic(), tokens)
+
+    def _acquire(self, deadline: float, ticket: Optional[_Ticket], abort=None):
+        queued = False
+        while True:
+            if abort is not None:
+                # Leave the queue as soon as the caller is gone
+                try:
+                    abort()
+                except Exception:
+                    if queued:
+                        self.waiting -= 1
+                    raise
+            now = time.monotonic()
+            if now >= self.blocked_until and self.in_flight < int(self.limit) and \
+                    (ticket is None or self._is_next(ticket)):
+                break
+            if now >= deadline:
+                self.stats["timeouts"] += 1
+                if queued:
+                    self.waiting -= 1
+                raise RateLimitTimeout("429: provider key still rate limited after waiting for the queue deadline.")
+            if not queued:
+                queued = True
+                self.waiting += 1
+                self.stats["queued"] += 1
+            wake_at = deadline
+            if now < self.blocked_until:
+                wake_at = min(wake_at, self.blocked_until)
+            if abort is not None:
+                wake_at = min(wake_at, now + 0.5)
+            self._cond.wait(timeout=max(wake_at - now, 0.01))
+        if queued:
+            self.waiting -= 1
+        self.in_flight += 1
+        self.stats["calls"] += 1
+
+    def release(self, success: bool = True, user_id=None, priority: str = "interactive", tokens: int = 0,
+                queue_wait: float = 0.0):
+        with self._cond:
+            self.in_flight -= 1
+            if self.fair:
+                share = self._share(user_id)
+                share.in_flight -= 1
+                share.queue_wait += queue_wait
+                share.vtime += tokens / LLM_PRIORITY_WEIGHTS.get(priority, 1.0)
+                share.add_tokens(time.monotonic(), tokens)
+            if success:
+                # +1 slot per "window" of successful calls
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+
+    def throttle(self, retry_after: float):
+        with self._cond:
+            self.limit = max(float(self.minimum), self.limit / 2)
+            self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+            self.stats["throttled"] += 1
+            self._cond.notify_all()
+
+    def get_stats(self):
+        with self._cond:
+            stats = dict(self.stats)
+            stats.update(limit=round(self.limit, 2), in_flight=self.in_flight, waiting=self.waiting)
+            if self.fair:
+                now = time.monotonic()
+                stats["users"] = {
+                    str(user_id): {
+                        "in_flight": share.in_flight,
+                        "calls": share.calls,
+                        "tokens_last_hour": share.tokens_last_hour(now),
+                        "avg_queue_wait_ms": round(1000 * share.queue_wait / share.calls) if share.calls else 0,
+                    }
+                    for user_id, share in self._users.items()
+                }
+        return stats
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def _get_limiter(provider: str, key_hash: str) -> AdaptiveLimiter:
+    with _limiters_lock:
+        if (provider, key_hash) not in _limiters:
+            _limiters[(provider, key_hash)] = AdaptiveLimiter(fair=key_hash in _admin_key_hashes())
+        return _limiters[(provider, key_hash)]
+
+
+def is_rate_limit_error(e: Exception) -> bool:
+    if getattr(e, "status_code", None) == 429 or getattr(e, "code", None) == 429:
+        return True
+    msg = str(e)
+    return "429" in msg or "ResourceExhausted" in msg or "RESOURCE_EXHAUSTED" in msg
+
+
+def _retry_after(e: Exception) -> float:
+    # OpenAI-compatible APIs send a Retry-After header, Gemini a RetryInfo retryDelay
+    response = getattr(e, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    match = re.search(r"retry[-_ ]?(?:after|delay)\D{0,5}(\d+(?:\.\d+)?)", str(e), re.IGNORECASE)
+    if match:
+        return float(match.group(1))
+    return LLM_DEFAULT_BACKOFF_SECONDS
+
+
+class ManagedLLM(BaseLLM):
+    """
+    Wraps a provider LLM so every call goes through the key's AdaptiveLimiter.
+    Crews use it like any other crewai LLM.
+    """
+
+    def __init__(self, inner, provider: str, key_hash: str, http_client: httpx.Client = None):
+        # Set before BaseLLM.__init__, which assigns self.stop
+        self._inner = inner
+        self._pool_provider = provider
+        self._http_client = http_client
+        self._in_flight = 0
+        self._retired = False
+        self._state_lock = threading.Lock()
+        self.limiter = _get_limiter(provider, key_hash)
+        super().__init__(
+            model=inner.model,
+            temperature=inner.temperature,
+            api_key=inner.api_key,
+            base_url=getattr(inner, "base_url", None),
+            provider=inner.provider,
+        )
+
+    # The agent executor writes stop words onto the LLM; keep them on the real client
+    @property
+    def stop(self):
+        return self._inner.stop
+
+    @stop.setter
+    def stop(self, value):
+        self._inner.stop = value
+
+    def __getattr__(self, name):
+        # Only reached for attributes the wrapper doesn't define (client, stream, ...)
+        if name in ("_inner", "_pool_provider", "_http_client"):
+            raise AttributeError(name)
+        return getattr(self._inner, name)
+
+    def retire(self):
+        """
+        Called when the pool evicts this client: its HTTP connections are
+        closed as soon as no call is using them.
+        """
+        with self._state_lock:
+            self._retired = True
+            idle = self._in_flight == 0
+        if idle:
+            self._close_http_client()
+
+    def _close_http_client(self):
+        if self._http_client is not None:
+            self._http_client.close()
+
+    def _call_inner(self, messages, **kwargs):
+        with self._state_lock:
+            if self._http_client is not None and self._http_client.is_closed:
+                # Evicted while a crew still held it: reconnect for this call
+                stop = self._inner.stop
+                self._inner, self._http_client = _build_provider_llm(
+                    self._pool_provider, self._inner.model, self._inner.api_key, self._inner.temperature,
+                    getattr(self._inner, "stream", False),
+                )
+                self._inner.stop = stop
+            self._in_flight += 1
+        try:
+            return self._inner.call(messages, **kwargs)
+        finally:
+            with self._state_lock:
+                self._in_flight -= 1
+                close = self._retired and self._in_flight == 0
+            if close:
+                self._close_http_client()
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None):
+        caller = _llm_caller.get()
+        user_id, priority = (caller.user_id, caller.priority) if caller else (None, "interactive")
+        prompt_tokens = _estimate_tokens(messages)
+        deadline = time.monotonic() + LLM_QUEUE_DEADLINE_SECONDS
+        if caller:
+            caller.check()
+        while True:
+            queued_at = time.monotonic()
+            self.limiter.acquire(deadline, user_id, priority, prompt_tokens, abort=caller.check if caller else None)
+            queue_wait = time.monotonic() - queued_at
+            if caller:
+                caller.calls += 1
+                caller.queue_wait += queue_wait
+            try:
+                result = self._call_inner(
+                    messages,
+                    tools=tools,
+                    callbacks=callbacks,
+                    available_functions=available_functions,
+                    from_task=from_task,
+                    from_agent=from_agent,
+                    response_model=response_model,
+                )
+            except Exception as e:
+                self.limiter.release(False, user_id, priority, 0, queue_wait)
+                if not is_rate_limit_error(e):
+                    raise
+                retry_after = _retry_after(e)
+                self.limiter.throttle(retry_after)
+                if time.monotonic() + retry_after >= deadline:
+                    raise
+                continue
+            completion_tokens = _estimate_tokens(result)
+            self.limiter.release(True, user_id, priority, completion_tokens, queue_wait)
+            if caller:
+                caller.tokens += prompt_tokens + completion_tokens
+            return result
+
+    def supports_function_calling(self) -> bool:
+        return self._inner.supports_function_calling()
+
+    def supports_stop_words(self) -> bool:
+        return self._inner.supports_stop_words()
+
+    def get_context_window_size(self) -> int:
+        return self._inner.get_context_window_size()
+
+    def get_token_usage_summary(self):
+        return self._inner.get_token_usage_summary()
+
+
+# --- CLIENT POOL ---
+# Building an LLM creates a new provider SDK client (and a new HTTP connection
+# pool), so clients are pooled per (provider, model, key, temperature) and
+# reused across requests to keep TLS connections to Gemini/Perplexity warm.
+LLM_POOL_MAX_SIZE = int(os.getenv("LLM_POOL_MAX_SIZE", "64"))
+LLM_POOL_IDLE_SECONDS = int(os.getenv("LLM_POOL_IDLE_SECONDS", "900"))
+LLM_KEEPALIVE_SECONDS = int(os.getenv("LLM_KEEPALIVE_SECONDS", "120"))
+LLM_WARMUP = os.getenv("LLM_WARMUP", "true").lower() == "true"
+
+_llm_pool = OrderedDict()  # key -> {"llm": LLM, "last_used": float, "uses": int}
+_pool_lock = threading.Lock()
+_pool_stats = {"created": 0, "reused": 0, "evicted": 0}
+
+
+def _key_hash(api_key: str) -> str:
+    # Never keep raw keys in pool keys / metrics
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+def _admin_key_hashes():
+    return {_key_hash(key) for key in (ADMIN_GEMINI_KEY, ADMIN_PERPLEXITY_KEY) if key}
+
+
+def _evict(key):
+    # Caller holds _pool_lock
+    _llm_pool.pop(key)["llm"].retire()
+    _pool_stats["evicted"] += 1
+
+
+def _evict_idle(now: float):
+    idle = [k for k, entry in _llm_pool.items() if now - entry["last_used"] > LLM_POOL_IDLE_SECONDS]
+    for k in idle:
+        _evict(k)
+
+
+def _build_llm(provider: str, model: str, api_key: str, temperature: float, stream: bool):
+    inner, http_client = _build_provider_llm(provider, model, api_key, temperature, stream)
+    return ManagedLLM(inner, provider, _key_hash(api_key), http_client)
+
+
+def _build_provider_llm(provider: str, model: str, api_key: str, temperature: float, stream: bool):
+    """Returns the crewai LLM and the httpx client it owns (None if the SDK manages its own)."""
+    if provider == "perplexity":
+        # OpenAI-compatible client; give it a keep-alive connection pool
+        http_client = httpx.Client(
+            timeout=httpx.Timeout(120.0, connect=10.0),
+            limits=httpx.Limits(max_keepalive_connections=20, keepalive_expiry=LLM_KEEPALIVE_SECONDS),
+        )
+        return LLM(
+            model=model,
+            base_url=PERPLEXITY_BASE_URL,
+            api_key=api_key,
+            temperature=temperature,
+            stream=stream,
+            client_params={"http_client": http_client}
+        ), http_client
+    return LLM(model=model, api_key=api_key, temperature=temperature, stream=stream), None
+
+
+def _get_pooled_llm(provider: str, model: str, api_key: str, temperature: float, stream: bool = False):
+    key = (provider, model, _key_hash(api_key), temperature, stream)
+    now = time.monotonic()
+
+    with _pool_lock:
+        _evict_idle(now)
+        entry = _llm_pool.get(key)
+        if entry:
+            entry["last_used"] = now
+            entry["uses"] += 1
+            _llm_pool.move_to_end(key)
+            _pool_stats["reused"] += 1
+            return entry["llm"]
+
+    # Build outside the lock; SDK client construction can be slow
+    llm = _build_llm(provider, model, api_key, temperature, stream)
+
+    with _pool_lock:
+        entry = _llm_pool.get(key)
+        if entry:
+            # Another thread won the race, reuse its client
+            entry["uses"] += 1
+            _pool_stats["reused"] += 1
+            llm.retire()
+            return entry["llm"]
+        _llm_pool[key] = {"llm": llm, "last_used": now, "uses": 1}
+        _pool_stats["created"] += 1
+        while len(_llm_pool) > LLM_POOL_MAX_SIZE:
+            _evict(next(iter(_llm_pool)))
+    return llm
+
+
+def get_llm(user_preference="gemini", user_api_key=None, temperature=0.7, stream=False):
+    """
+    Returns a pooled crewai.LLM instance based on user preference.
+    stream=True returns a client that emits token chunks (see app.core.streaming).
+    """
+
     # --- OPTION 1: PERPLEXITY (Your Testing setup) ---
     if user_preference == "perplexity":
         api_key = user_api_key or ADMIN_PERPLEXITY_KEY
-        
+
         if not api_key:
              # Fallback logic if needed, or raise error
             if user_api_key or ADMIN_GEMINI_KEY:
-                 return get_llm("gemini", user_api_key)
+                 return get_llm("gemini", user_api_key, temperature, stream)
             raise ValueError("Perplexity API Key missing.")
 
-        return LLM(
-            model="sonar-pro", 
-            base_url="https://api.perplexity.ai",
-            api_key=api_key,
-            temperature=0.7
-        )
+        return _get_pooled_llm("perplexity", PERPLEXITY_MODEL, api_key, temperature, stream)
 
     # --- OPTION 2: GEMINI (Deployment / User Key) ---
     else:
         api_key = user_api_key or ADMIN_GEMINI_KEY
-        
+
         if not api_key:
             raise ValueError("Gemini API Key missing. Please add it in Settings.")
 
-        return LLM(
-            # Prefix 'gemini/' tells CrewAI/LiteLLM to use the Google provider
-            model="gemini/gemini-2.0-flash-exp", 
-            api_key=api_key,
-            temperature=0.7
-        )
+        return _get_pooled_llm("gemini", GEMINI_MODEL, api_key, temperature, stream)
+
+
+def warm_up_llm_pool():
+    """
+    Builds the admin-key clients and opens their connections ahead of the
+    first student request. Failures are ignored; the pool fills lazily anyway.
+    """
+    for provider, key in (("gemini", ADMIN_GEMINI_KEY), ("perplexity", ADMIN_PERPLEXITY_KEY)):
+        if not key:
+            continue
+        try:
+            llm = get_llm(provider)
+            # Any cheap authenticated request establishes the TLS connection
+            llm.client.models.list()
+            print(f"✅ LLM pool warmed up: {provider}")
+        except Exception as e:
+            print(f"⚠️ LLM warm-up skipped for {provider}: {e}")
+
+
+def get_pool_stats():
+    with _pool_lock:
+        stats = dict(_pool_stats)
+        stats["size"] = len(_llm_pool)
+        stats["clients"] = [
+            {"provider": k[0], "model": k[1], "key": k[2], "temperature": k[3], "stream": k[4], "uses": entry["uses"]}
+            for k, entry in _llm_pool.items()
+        ]
+    requests_served = stats["created"] + stats["reused"]
+    stats["reuse_rate"] = round(stats["reused"] / requests_served, 3) if requests_served else 0.0
+    return stats
+
+
+def get_limiter_stats():
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    return {f"{provider}:{key_hash}": limiter.get_stats() for (provider, key_hash), limiter in limiters.items()}
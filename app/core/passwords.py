@@ -0,0 +1,20 @@
+from passlib.context import CryptContext
+from app.core.executor import run_process
+
+# Kept apart from app.services.auth so the "auth" worker processes only
+# import passlib, not the API/JWT stack.
+# CHANGED: Use 'argon2' instead of 'bcrypt' to fix the 72-byte limit and version errors
+pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+
+def verify_password(plain_password, hashed_password):
+    return pwd_context.verify(plain_password, hashed_password)
+
+def get_password_hash(password):
+    return pwd_context.hash(password)
+
+async def verify_password_async(plain_password, hashed_password):
+    """verify_password() in the "auth" process pool (off the event loop)."""
+    return await run_process("auth", verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    return await run_process("auth", get_password_hash, password)
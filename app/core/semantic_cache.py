@@ -0,0 +1,160 @@
+import os
+import time
+import uuid
+import threading
+from pathlib import Path
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Near-duplicate lookup for generation requests ("Python Lists" vs "Lists in Python").
+# Embeddings come from chromadb's default ONNX model (all-MiniLM-L6-v2) on CPU.
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+SEMANTIC_CACHE_DIR = os.path.join(os.getenv("CACHE_DIR", os.path.join(os.getcwd(), ".cache")), "semantic")
+# After a failure (e.g. the ONNX model can't be downloaded), skip the index
+# for this long instead of paying for the failure on every request
+SEMANTIC_CACHE_RETRY_SECONDS = float(os.getenv("SEMANTIC_CACHE_RETRY_SECONDS", "60"))
+# Where the ONNX model lives (or is downloaded to on first use). Point it at
+# a directory shipped with the deployment to run without network access.
+SEMANTIC_MODEL_DIR = os.getenv("SEMANTIC_MODEL_DIR")
+# Nearest neighbours fetched per lookup. The filters (model, level, user
+# context...) are checked on these instead of in the query: a metadata-filtered
+# chromadb query scans every entry and takes ~0.3-0.5s at 100k entries. If
+# more than this many closer entries belong to other filters, the lookup is a
+# miss, which only costs a normal run.
+SEMANTIC_CANDIDATES = int(os.getenv("SEMANTIC_CANDIDATES", "20"))
+
+# Minimum cosine similarity for a stored result to be reused, per crew
+SEMANTIC_THRESHOLDS = {
+    "roadmap": float(os.getenv("SEMANTIC_THRESHOLD_ROADMAP", "0.92")),
+    "chapter": float(os.getenv("SEMANTIC_THRESHOLD_CHAPTER", "0.90")),
+    "assessment": float(os.getenv("SEMANTIC_THRESHOLD_ASSESSMENT", "0.90")),
+}
+# Fast-mode variants have their own index but the same thresholds
+SEMANTIC_THRESHOLDS["roadmap_fast"] = SEMANTIC_THRESHOLDS["roadmap"]
+SEMANTIC_THRESHOLDS["assessment_fast"] = SEMANTIC_THRESHOLDS["assessment"]
+
+
+class SemanticCache:
+    """
+    Embedding index over past requests. Each entry points at a response_cache
+    key, so the stored output itself lives in (and expires with) the exact-match cache.
+
+    The index is only an optimization: lookup() and add() never raise, a
+    failure is logged and treated as a miss.
+    """
+
+    def __init__(self, directory=SEMANTIC_CACHE_DIR, thresholds=None):
+        self.directory = directory
+        self.thresholds = thresholds or SEMANTIC_THRESHOLDS
+        self._client = None
+        self._embedder = None
+        self._collections = {}
+        self._lock = threading.Lock()
+        self._unavailable_until = 0.0
+        self.stats = {"hits": 0, "misses": 0, "indexed": 0, "errors": 0, "lookup_ms_total": 0.0}
+
+    def _get_collection(self, crew_type: str):
+        with self._lock:
+            if crew_type not in self._collections:
+                # Imported lazily: loading chromadb + the ONNX model is slow
+                import chromadb
+                from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
+
+                if self._client is None:
+                    if SEMANTIC_MODEL_DIR:
+                        from chromadb.utils.embedding_functions.onnx_mini_lm_l6_v2 import ONNXMiniLM_L6_V2
+                        ONNXMiniLM_L6_V2.DOWNLOAD_PATH = Path(SEMANTIC_MODEL_DIR)
+                    self._client = chromadb.PersistentClient(path=self.directory)
+                    self._embedder = DefaultEmbeddingFunction()
+                self._collections[crew_type] = self._client.get_or_create_collection(
+                    name=f"requests_{crew_type}",
+                    embedding_function=self._embedder,
+                    metadata={"hnsw:space": "cosine"},
+                )
+            return self._collections[crew_type]
+
+    def _available(self) -> bool:
+        return time.monotonic() >= self._unavailable_until
+
+    def _failed(self, action: str, error: Exception):
+        print(f"⚠️ Semantic cache {action} failed, skipping it for {SEMANTIC_CACHE_RETRY_SECONDS:.0f}s: {error!r}")
+        with self._lock:
+            self.stats["errors"] += 1
+            self._unavailable_until = time.monotonic() + SEMANTIC_CACHE_RETRY_SECONDS
+
+    def warm_up(self):
+        """
+        Opens the index and loads the embedding model (downloading it on
+        first use) so the first request doesn't pay for it.
+        """
+        try:
+            for crew_type in self.thresholds:
+                self._get_collection(crew_type)
+            self._embedder(["warm-up"])
+            print("✅ Semantic cache ready")
+        except Exception as e:
+            self._failed("warm-up", e)
+
+    def lookup(self, crew_type: str, query: str, filters: dict = None):
+        """
+        Returns the response_cache key of the closest past request, or None
+        if nothing is within the crew's similarity threshold.
+        """
+        if crew_type not in self.thresholds or not self._available():
+            return None
+
+        start = time.perf_counter()
+        try:
+            collection = self._get_collection(crew_type)
+            size = collection.count()
+            result = None
+            if size:
+                result = collection.query(
+                    query_texts=[query],
+                    n_results=min(SEMANTIC_CANDIDATES, size),
+                    include=["metadatas", "distances"],
+                )
+        except Exception as e:
+            self._failed("lookup", e)
+            return None
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        response_key = None
+        if result and result["ids"] and result["ids"][0]:
+            # Closest first; exact-match constraints that similarity must not blur
+            for metadata, distance in zip(result["metadatas"][0], result["distances"][0]):
+                if 1 - distance < self.thresholds[crew_type]:
+                    break
+                if all(metadata.get(k) == v for k, v in (filters or {}).items()):
+                    response_key = metadata["response_key"]
+                    break
+
+        with self._lock:
+            self.stats["lookup_ms_total"] += elapsed_ms
+            self.stats["hits" if response_key else "misses"] += 1
+        return response_key
+
+    def add(self, crew_type: str, query: str, response_key: str, filters: dict = None):
+        if crew_type not in self.thresholds or not self._available():
+            return
+        metadata = dict(filters or {})
+        metadata["response_key"] = response_key
+        try:
+            self._get_collection(crew_type).add(ids=[uuid.uuid4().hex], documents=[query], metadatas=[metadata])
+        except Exception as e:
+            self._failed("add", e)
+            return
+        with self._lock:
+            self.stats["indexed"] += 1
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["avg_lookup_ms"] = round(stats.pop("lookup_ms_total") / lookups, 2) if lookups else 0.0
+        stats["thresholds"] = dict(self.thresholds)
+        return stats
+
+
+semantic_cache = SemanticCache()
@@ -0,0 +1,97 @@
+import os
+import time
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from dotenv import load_dotenv
+from app.core.llm import current_llm_caller
+
+load_dotenv()
+
+# When a class is told to "generate the Week 3 roadmap", dozens of identical
+# requests arrive at once. Only the first one runs the crew; the rest attach
+# to it and receive the same result.
+SINGLEFLIGHT_CREWS = {
+    c.strip() for c in os.getenv("SINGLEFLIGHT_CREWS", "roadmap,roadmap_fast,chapter,assessment,assessment_fast,debug").split(",") if c.strip()
+}
+SINGLEFLIGHT_TIMEOUT_SECONDS = float(os.getenv("SINGLEFLIGHT_TIMEOUT_SECONDS", "180"))
+
+
+class SingleFlightTimeout(Exception):
+    """Raised to a waiter that gave up on an in-flight execution."""
+
+
+class SingleFlight:
+    def __init__(self, timeout=SINGLEFLIGHT_TIMEOUT_SECONDS):
+        self.timeout = timeout
+        self._calls = {}  # key -> Future of the in-flight execution
+        self._waiters = {}  # key -> number of callers attached to it
+        self._lock = threading.Lock()
+        self.stats = {"executions": 0, "coalesced": 0, "waiter_timeouts": 0}
+
+    def do(self, key: str, fn, timeout: float = None):
+        """
+        Runs fn() once per key at a time. Concurrent callers with the same key
+        wait for the leader's result (or exception) instead of running fn again.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+                self.stats["executions"] += 1
+            else:
+                self.stats["coalesced"] += 1
+                self._waiters[key] = self._waiters.get(key, 0) + 1
+
+        caller = current_llm_caller()
+        if leader:
+            # If the leader's client leaves, keep going while others wait for the result
+            shield = lambda: self._waiters.get(key, 0) > 0
+            if caller:
+                caller.shields.append(shield)
+            try:
+                result = fn()
+            except BaseException as e:
+                future.set_exception(e)
+                raise
+            else:
+                future.set_result(result)
+                return result
+            finally:
+                if caller:
+                    caller.shields.remove(shield)
+                with self._lock:
+                    self._calls.pop(key, None)
+
+        give_up_at = time.monotonic() + (timeout or self.timeout)
+        try:
+            while True:
+                # Wait in slices so a waiter whose client left (or whose
+                # deadline passed) detaches promptly
+                if caller:
+                    caller.check()
+                try:
+                    return future.result(timeout=max(0.0, min(0.5, give_up_at - time.monotonic())))
+                except FutureTimeout:
+                    if time.monotonic() < give_up_at:
+                        continue
+                    # Detach: the leader keeps running and still fills the cache
+                    with self._lock:
+                        self.stats["waiter_timeouts"] += 1
+                    raise SingleFlightTimeout("Timed out waiting for an identical in-flight generation.")
+        finally:
+            with self._lock:
+                self._waiters[key] -= 1
+                if not self._waiters[key]:
+                    del self._waiters[key]
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["in_flight"] = len(self._calls)
+        stats["calls_saved"] = stats["coalesced"] - stats["waiter_timeouts"]
+        return stats
+
+
+crew_flights = SingleFlight()
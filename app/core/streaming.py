@@ -0,0 +1,91 @@
+import asyncio
+import contextvars
+from crewai.events import crewai_event_bus
+from crewai.events.types.llm_events import LLMStreamChunkEvent
+from app.core.executor import run_llm
+
+# Where the current thread's LLM stream chunks should go. Stream chunk events
+# are emitted synchronously on the thread making the LLM call, so a context
+# variable set around the crew kickoff routes each request's tokens to its own client.
+_stream_sink = contextvars.ContextVar("stream_sink", default=None)
+
+
+@crewai_event_bus.on(LLMStreamChunkEvent)
+def _forward_chunk(source, event):
+    sink = _stream_sink.get()
+    if sink and event.chunk and not event.tool_call:
+        sink(event.chunk)
+
+
+class _ReActFilter:
+    """
+    Agents answer in "Thought: ... Final Answer: ..." form. Hide the reasoning
+    preamble and pass through only what comes after "Final Answer:".
+    """
+
+    MARKER = "Final Answer:"
+
+    def __init__(self):
+        self.buffer = ""
+        self.passthrough = False
+
+    def feed(self, chunk: str) -> str:
+        if self.passthrough:
+            return chunk
+        self.buffer += chunk
+        if self.MARKER in self.buffer:
+            self.passthrough = True
+            return self.buffer.split(self.MARKER, 1)[1].lstrip()
+        stripped = self.buffer.lstrip()
+        if len(stripped) >= len("Thought") and not stripped.startswith("Thought"):
+            # Plain answer without a ReAct preamble
+            self.passthrough = True
+            return self.buffer
+        return ""
+
+
+async def stream_crew(func, *args, **kwargs):
+    """
+    Runs a blocking crew call (returning the final output string) on the LLM
+    pool and yields ("token", text) as the model produces output, then
+    ("done", final_output) or ("error", exception).
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    react_filter = _ReActFilter()
+
+    def sink(chunk):
+        text = react_filter.feed(chunk)
+        if text:
+            loop.call_soon_threadsafe(queue.put_nowait, text)
+
+    def run():
+        token = _stream_sink.set(sink)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _stream_sink.reset(token)
+
+    job = asyncio.ensure_future(run_llm(run))
+    try:
+        while not job.done():
+            getter = asyncio.ensure_future(queue.get())
+            await asyncio.wait({getter, job}, return_when=asyncio.FIRST_COMPLETED)
+            if getter.done():
+                yield "token", getter.result()
+            else:
+                getter.cancel()
+    finally:
+        if not job.done():
+            # Client went away mid-stream: the crew stops at its next LLM call
+            # (see app.core.deadlines); consume its RequestCancelled quietly
+            job.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+    # Flush tokens that arrived just before the crew finished
+    while not queue.empty():
+        yield "token", queue.get_nowait()
+
+    if job.exception():
+        yield "error", job.exception()
+    else:
+        yield "done", job.result()
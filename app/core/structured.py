@@ -0,0 +1,76 @@
+import re
+import threading
+import json_repair
+from pydantic import BaseModel, ValidationError
+
+# One tolerant parser for every crew that must return JSON. Each attempt is
+# counted per crew so /metrics shows how often outputs need repairing or a
+# full regeneration (which doubles tokens and latency).
+
+_CODE_FENCE = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL)
+
+
+class StructuredOutputError(ValueError):
+    """The output could not be parsed into the expected schema, even after repair."""
+
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def _count(kind: str, outcome: str):
+    with _stats_lock:
+        counts = _stats.setdefault(kind, {"ok": 0, "repaired": 0, "failed": 0, "regenerated": 0})
+        counts[outcome] += 1
+
+
+def _extract(text: str) -> str:
+    """Strips Markdown fences / surrounding prose, keeping the outermost JSON value."""
+    match = _CODE_FENCE.search(text)
+    if match:
+        text = match.group(1)
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if not starts:
+        return text.strip()
+    start = min(starts)
+    end = max(text.rfind("}"), text.rfind("]"))
+    return text[start:end + 1] if end > start else text[start:]
+
+
+def parse_model(text: str, model: type[BaseModel], kind: str):
+    """
+    Parses an LLM output into `model`: strict JSON first, then a json_repair
+    pass (trailing commas, unescaped quotes, truncation, ...). Raises
+    StructuredOutputError if neither validates.
+    """
+    if isinstance(text, model):
+        return text
+    candidate = _extract(text or "")
+    try:
+        parsed = model.model_validate_json(candidate)
+        _count(kind, "ok")
+        return parsed
+    except ValidationError:
+        pass
+
+    try:
+        parsed = model.model_validate(json_repair.loads(candidate))
+        _count(kind, "repaired")
+        return parsed
+    except (ValidationError, ValueError) as e:
+        _count(kind, "failed")
+        raise StructuredOutputError(f"{kind} output did not match {model.__name__}: {e}")
+
+
+def record_regeneration(kind: str):
+    _count(kind, "regenerated")
+
+
+def get_parse_stats():
+    with _stats_lock:
+        stats = {kind: dict(counts) for kind, counts in _stats.items()}
+    for counts in stats.values():
+        attempts = counts["ok"] + counts["repaired"] + counts["failed"]
+        counts["failure_rate"] = round(counts["failed"] / attempts, 4) if attempts else 0.0
+        counts["repair_rate"] = round(counts["repaired"] / attempts, 4) if attempts else 0.0
+    return stats
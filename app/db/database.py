@@ -1,4 +1,11 @@
 from sqlmodel import SQLModel, create_engine, Session
+from sqlalchemy import inspect, text, event, UniqueConstraint
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import StaticPool, AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.schema import CreateColumn
 import os
 from dotenv import load_dotenv
 
@@ -7,12 +14,150 @@ load_dotenv()
 # Use SQLite for simplicity and Windows compatibility
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./student_ai.db")
 
-# check_same_thread=False is needed for SQLite with FastAPI
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+# Connection pool (shared by request handlers, job workers and crews)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+# SQLite tuning, applied to every new connection. WAL lets readers run while
+# one writer commits; the busy timeout makes concurrent writers queue up for
+# the write lock instead of failing with "database is locked".
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL") # safe with WAL; FULL to fsync every commit
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "30000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+def _create_engine(url: str, factory=create_engine, queue_pool=None):
+    pool_args = {"pool_size": DB_POOL_SIZE, "max_overflow": DB_MAX_OVERFLOW, "pool_timeout": DB_POOL_TIMEOUT}
+    if queue_pool is not None:
+        pool_args["poolclass"] = queue_pool
+    if not url.startswith("sqlite"):
+        return factory(url, pool_pre_ping=True, **pool_args)
+
+    # check_same_thread=False is needed for SQLite with FastAPI
+    connect_args = {"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000}
+    database = make_url(url).database
+    if not database or database == ":memory:":
+        # One shared connection, otherwise every connection gets its own empty database
+        sqlite_engine = factory(url, connect_args=connect_args, poolclass=StaticPool)
+    else:
+        sqlite_engine = factory(url, connect_args=connect_args, **pool_args)
+
+    event.listen(getattr(sqlite_engine, "sync_engine", sqlite_engine), "connect", _set_sqlite_pragmas)
+    return sqlite_engine
+
+
+def _async_url(url: str) -> str:
+    # Same database through an asyncio driver
+    drivers = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg", "mysql": "mysql+aiomysql"}
+    parsed = make_url(url)
+    return parsed.set(drivername=drivers.get(parsed.drivername, parsed.drivername)).render_as_string(hide_password=False)
+
+
+# Sync engine: sync routes, job workers, crews and services
+engine = _create_engine(DATABASE_URL)
+
+# Async engine: async routes, so DB I/O never blocks the event loop.
+# (An in-memory SQLite URL gives the two engines separate databases.)
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", _async_url(DATABASE_URL))
+async_engine = _create_engine(ASYNC_DATABASE_URL, factory=create_async_engine, queue_pool=AsyncAdaptedQueuePool)
 
 def get_session():
     with Session(engine) as session:
         yield session
 
+async def get_async_session():
+    """Dependency for async routes."""
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+def get_pool_status():
+    """Connection pool occupancy, for /metrics."""
+    return {"sync": engine.pool.status(), "async": async_engine.pool.status()}
+
+def _dialect_insert(dialect_name: str):
+    if dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect_name in ("mysql", "mariadb"):
+        from sqlalchemy.dialects.mysql import insert as dialect_insert
+    else:
+        raise NotImplementedError(f"No INSERT ... ON CONFLICT support for {dialect_name}")
+    return dialect_insert
+
+def insert_ignore(dialect_name: str, model, values: dict, index_elements: list):
+    """
+    INSERT of one row that does nothing if it clashes with the unique key
+    `index_elements`, spelled the way the database's dialect wants it.
+    """
+    statement = _dialect_insert(dialect_name)(model).values(**values)
+    if dialect_name in ("mysql", "mariadb"):
+        return statement.prefix_with("IGNORE")
+    return statement.on_conflict_do_nothing(index_elements=index_elements)
+
+def upsert(dialect_name: str, model, values: dict, index_elements: list, update: list):
+    """
+    INSERT of one row that, if it clashes with the unique key
+    `index_elements`, overwrites the `update` columns of the existing row.
+    """
+    statement = _dialect_insert(dialect_name)(model).values(**values)
+    if dialect_name in ("mysql", "mariadb"):
+        return statement.on_duplicate_key_update({column: statement.inserted[column] for column in update})
+    return statement.on_conflict_do_update(index_elements=index_elements,
+                                           set_={column: statement.excluded[column] for column in update})
+
 def init_db():
     SQLModel.metadata.create_all(engine)
+    _migrate_existing_tables()
+
+def _migrate_existing_tables():
+    """
+    create_all() only creates missing tables. Bring tables from older
+    databases up to date: add new nullable columns, missing indexes and
+    missing unique constraints (as unique indexes, which SQLite can add later).
+    """
+    inspector = inspect(engine)
+    unique_indexes = []
+    with engine.begin() as conn:
+        for table in SQLModel.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                if not column.nullable:
+                    print(f"⚠️ Cannot add required column {table.name}.{column.name}; recreate the table.")
+                    continue
+                ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN {ddl}'))
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+            existing = {index["name"] for index in inspector.get_indexes(table.name)}
+            existing |= {constraint["name"] for constraint in inspector.get_unique_constraints(table.name)}
+            for constraint in table.constraints:
+                if isinstance(constraint, UniqueConstraint) and constraint.name and constraint.name not in existing:
+                    columns = ", ".join(f'"{column.name}"' for column in constraint.columns)
+                    unique_indexes.append((table.name, constraint.name,
+                                           f'CREATE UNIQUE INDEX "{constraint.name}" ON "{table.name}" ({columns})'))
+    # One transaction each: existing duplicate rows only hold back their own table
+    for table_name, name, ddl in unique_indexes:
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(ddl))
+        except IntegrityError:
+            print(f"⚠️ Cannot add unique constraint {name}; remove the duplicate {table_name} rows.")
+    if unique_indexes:
+        # SQLite checks ON CONFLICT targets against the schema a connection
+        # loaded earlier; reconnect so pooled connections see the new indexes
+        engine.dispose()
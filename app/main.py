@@ -1,7 +1,22 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Depends
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-from app.db.database import init_db
+from app.db.database import init_db, get_pool_status, async_engine
+from app.core.cache import response_cache
+from app.core.semantic_cache import semantic_cache, SEMANTIC_CACHE_ENABLED
+from app.core.singleflight import crew_flights
+from app.core.structured import get_parse_stats
+from app.core.checkpoint import purge_stale_checkpoints, get_checkpoint_stats
+from app.core.llm import (
+    warm_up_llm_pool, get_pool_stats, get_limiter_stats, get_abandon_stats, RequestCancelled, DeadlineExceeded, LLM_WARMUP
+)
+from app.core.deadlines import RequestDeadlineMiddleware
+from app.services.task_manager import job_workers
+from app.services.user_context import user_contexts
+from app.services.pdf_cache import sweep_pdf_cache
+from app.services.auth import require_admin, AUTH_REQUIRED
+from app.core.executor import warm_up_process_pool, shutdown_process_pool, get_executor_stats, PoolFull
 # Ensure these import paths match your actual file structure
 from app.api import (
     roadmap, 
@@ -12,10 +27,12 @@ from app.api import (
     auth, 
     user, 
     assessment, 
-    oauth
+    oauth,
+    jobs
 )
 from dotenv import load_dotenv
 import os
+import threading
 
 load_dotenv()
 
@@ -24,7 +41,24 @@ async def lifespan(app: FastAPI):
     # Initialize Database on Startup
     init_db()
     print("✅ Database Initialized")
+    if not AUTH_REQUIRED:
+        print("⚠️ AUTH_REQUIRED is off: requests without a token are trusted with whatever user_id they name. "
+              "Only run like this locally.")
+    purge_stale_checkpoints()
+    sweep_pdf_cache()
+    # Pre-connect admin-key LLM clients without delaying startup
+    if LLM_WARMUP:
+        threading.Thread(target=warm_up_llm_pool, daemon=True).start()
+    threading.Thread(target=warm_up_process_pool, daemon=True).start()
+    # Load (or download) the embedding model before the first lookup needs it
+    if SEMANTIC_CACHE_ENABLED:
+        threading.Thread(target=semantic_cache.warm_up, daemon=True).start()
+    # Background job workers (project builds, ...)
+    job_workers.start()
     yield
+    job_workers.stop()
+    shutdown_process_pool()
+    await async_engine.dispose()
 
 app = FastAPI(
     title="Student Success GenAI Platform",
@@ -49,6 +83,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(PoolFull)
+async def pool_full_handler(request: Request, exc: PoolFull):
+    # Shed load instead of queueing without bound; clients back off and retry
+    return JSONResponse(status_code=503, content={"detail": str(exc)},
+                        headers={"Retry-After": str(exc.retry_after)})
+
+# Request deadlines, disconnect cancellation and the X-LLM-Queue-Wait-Ms header
+app.add_middleware(RequestDeadlineMiddleware)
+
+@app.exception_handler(RequestCancelled)
+async def request_cancelled_handler(request: Request, exc: RequestCancelled):
+    # 504 when the budget ran out; otherwise the client is gone and won't read it
+    status = 504 if isinstance(exc, DeadlineExceeded) else 499
+    return JSONResponse(status_code=status, content={"detail": str(exc)})
+
 # --- Register Routers ---
 # Prefix groups endpoints cleanly (e.g. /api/v1/generate-roadmap)
 app.include_router(oauth.router, prefix="/api/oauth", tags=["OAuth Integrations"])
@@ -60,6 +109,7 @@ app.include_router(project.router, prefix="/api/v1", tags=["Project Execution"])
 app.include_router(social.router, prefix="/api/v1", tags=["Social Media"])
 app.include_router(debug.router, prefix="/api/v1", tags=["Code Debugger"])
 app.include_router(assessment.router, prefix="/api/v1", tags=["Assessment Center"])
+app.include_router(jobs.router, prefix="/api/v1", tags=["Background Jobs"])
 
 @app.get("/")
 async def root():
@@ -69,6 +119,23 @@ async def root():
         "status": "active"
     }
 
+# Limiter, pool and job internals; admins only (ADMIN_USER_IDS)
+@app.get("/metrics", dependencies=[Depends(require_admin)])
+async def metrics():
+    return {
+        "response_cache": response_cache.get_stats(),
+        "semantic_cache": semantic_cache.get_stats(),
+        "singleflight": crew_flights.get_stats(),
+        "llm_pool": get_pool_stats(),
+        "llm_limiters": get_limiter_stats(),
+        "structured_output": get_parse_stats(),
+        "crew_checkpoints": get_checkpoint_stats(),
+        "db_pool": get_pool_status(),
+        "user_context": user_contexts.get_stats(),
+        "executors": get_executor_stats(),
+        "abandoned_work": get_abandon_stats(),
+    }
+
 if __name__ == "__main__":
     import uvicorn
     # 'app.main:app' assumes this file is named main.py inside an 'app' folder
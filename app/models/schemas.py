@@ -0,0 +1,35 @@
+from typing import List, Dict, Optional
+from pydantic import BaseModel, RootModel, Field
+
+# Response models for crew outputs that the app consumes as JSON. The final
+# task of each crew is given its model as `response_model`, so providers that
+# support it (Gemini JSON mode, OpenAI-style json_schema) generate to the schema.
+
+# --- ROADMAP ---
+class RoadmapWeek(BaseModel):
+    week: int
+    title: str
+    description: str = ""
+    topics: List[str] = Field(default_factory=list)
+    project: str = ""
+
+class RoadmapPlan(BaseModel):
+    roadmap: List[RoadmapWeek]
+
+# --- ASSESSMENT ---
+class AssessmentQuestion(BaseModel):
+    q: str
+    options: Optional[List[str]] = None  # Only for quizzes/tests
+    answer: str
+
+class AssessmentOutput(BaseModel):
+    title: str
+    questions: List[AssessmentQuestion]
+
+# --- PROJECT ---
+class ProjectDesign(BaseModel):
+    project_name: str = ""
+    files: List[str]
+
+class ProjectFiles(RootModel[Dict[str, str]]):
+    """Filename -> file content (single-shot project mode)."""
@@ -1,6 +1,6 @@
 from typing import Optional, List, Dict, Any
 from sqlmodel import Field, SQLModel, Relationship
-from sqlalchemy import Column, JSON
+from sqlalchemy import Column, JSON, UniqueConstraint
 from datetime import datetime
 
 # --- USER MODEL ---
@@ -18,12 +18,23 @@ class User(SQLModel, table=True):
     
     # Profile Data (JSON)
     profile_data: Optional[Dict[str, Any]] = Field(default=None, sa_column=Column(JSON))
+    # Bumped whenever profile/keys change; carried in session tokens so every
+    # worker can tell a cached user context is stale
+    profile_version: Optional[int] = Field(default=0)
     created_at: datetime = Field(default_factory=datetime.utcnow)
     
     # Relationships
     roadmaps: List["Roadmap"] = Relationship(back_populates="user")
     quizzes: List["Quiz"] = Relationship(back_populates="user")
 
+# --- ROADMAP CONTENT MODEL ---
+# Generated week-by-week plans, stored once per distinct content (sha256 of the
+# canonical JSON) no matter how many users/roadmaps point at them.
+class RoadmapContent(SQLModel, table=True):
+    hash: str = Field(primary_key=True)
+    data: Dict[str, Any] = Field(default={}, sa_column=Column(JSON))
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
 # --- ROADMAP MODEL ---
 class Roadmap(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -32,7 +43,12 @@ class Roadmap(SQLModel, table=True):
     status: str = Field(default="active") 
     created_at: datetime = Field(default_factory=datetime.utcnow)
     
-    user_id: Optional[int] = Field(default=None, foreign_key="user.id")
+    # Inputs used to generate it
+    duration: Optional[str] = None
+    level: Optional[str] = None
+    content_hash: Optional[str] = Field(default=None, foreign_key="roadmapcontent.hash", index=True)
+    
+    user_id: Optional[int] = Field(default=None, foreign_key="user.id", index=True)
     user: Optional[User] = Relationship(back_populates="roadmaps")
 
 # --- QUIZ MODEL ---
@@ -45,3 +61,53 @@ class Quiz(SQLModel, table=True):
     
     user_id: Optional[int] = Field(default=None, foreign_key="user.id")
     user: Optional[User] = Relationship(back_populates="quizzes")
+
+# --- JOB MODEL ---
+# Background work (project builds, ...) persisted so status survives restarts
+# and is visible from every uvicorn worker.
+class Job(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="user.id", index=True)
+    kind: str = Field(index=True) # e.g. "project"
+    status: str = Field(default="queued", index=True) # queued, processing, completed, error, cancelled
+    step: str = Field(default="Queued")
+    progress: int = Field(default=0)
+
+    payload: Dict[str, Any] = Field(default={}, sa_column=Column(JSON))
+    result: Optional[Dict[str, Any]] = Field(default=None, sa_column=Column(JSON))
+    error: Optional[str] = None
+
+    attempts: int = Field(default=0)
+    max_attempts: int = Field(default=2)
+    cancel_requested: bool = Field(default=False)
+    worker_id: Optional[str] = None
+
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+# --- CREW CHECKPOINT MODEL ---
+# Output of each completed stage (task) of a multi-agent crew run, so a retry
+# resumes from the last good stage instead of starting over.
+class CrewCheckpoint(SQLModel, table=True):
+    # One row per stage of a run, so concurrent saves of a stage upsert it
+    __table_args__ = (UniqueConstraint("run_id", "stage", name="uq_crewcheckpoint_run_stage"),)
+    id: Optional[int] = Field(default=None, primary_key=True)
+    run_id: str = Field(index=True)
+    crew_type: str
+    stage: str # Task index ("0", "1", ...) or a named stage like "file:main.py"
+    output: str
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+# --- ARTIFACT MODEL ---
+# Generated documents (chapters, debug reports) kept server-side so PDFs can be
+# requested by ID instead of uploading the whole document again.
+class Artifact(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: Optional[int] = Field(default=None, foreign_key="user.id", index=True)
+    kind: str = Field(index=True) # "chapter", "debug"
+    title: str
+    content_hash: str = Field(index=True)
+    data: Dict[str, Any] = Field(default={}, sa_column=Column(JSON))
+    created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -0,0 +1,81 @@
+import json
+import hashlib
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.db.database import engine, async_engine
+from app.models.user import Artifact
+
+
+def content_hash(kind: str, data: dict) -> str:
+    canonical = json.dumps([kind, data], sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _existing_query(user_id: int, digest: str):
+    return select(Artifact.id).where(Artifact.user_id == user_id, Artifact.content_hash == digest)
+
+
+def _artifact_to_dict(artifact: Artifact, kind: str = None):
+    if artifact is None or (kind and artifact.kind != kind):
+        return None
+    return {
+        "id": artifact.id,
+        "user_id": artifact.user_id,
+        "kind": artifact.kind,
+        "title": artifact.title,
+        "content_hash": artifact.content_hash,
+        "data": artifact.data,
+        "created_at": artifact.created_at.isoformat() if artifact.created_at else None,
+    }
+
+
+def save_artifact(user_id: int, kind: str, title: str, data: dict) -> int:
+    """
+    Stores a generated document and returns its ID. Saving the same document
+    twice for a user returns the existing ID.
+    """
+    digest = content_hash(kind, data)
+    with Session(engine) as session:
+        existing = session.exec(_existing_query(user_id, digest)).first()
+        if existing is not None:
+            return existing
+        artifact = Artifact(user_id=user_id, kind=kind, title=title, content_hash=digest, data=data)
+        session.add(artifact)
+        session.commit()
+        session.refresh(artifact)
+        return artifact.id
+
+
+async def save_artifact_async(user_id: int, kind: str, title: str, data: dict) -> int:
+    """save_artifact() for async routes."""
+    digest = content_hash(kind, data)
+    async with AsyncSession(async_engine) as session:
+        existing = (await session.exec(_existing_query(user_id, digest))).first()
+        if existing is not None:
+            return existing
+        artifact = Artifact(user_id=user_id, kind=kind, title=title, content_hash=digest, data=data)
+        session.add(artifact)
+        await session.commit()
+        await session.refresh(artifact)
+        return artifact.id
+
+
+def get_artifact(artifact_id: int, kind: str = None):
+    with Session(engine) as session:
+        return _artifact_to_dict(session.get(Artifact, artifact_id), kind)
+
+
+async def get_artifact_async(artifact_id: int, kind: str = None):
+    async with AsyncSession(async_engine) as session:
+        return _artifact_to_dict(await session.get(Artifact, artifact_id), kind)
+
+
+def find_artifact(user_id: int, kind: str, title: str):
+    """The user's most recent artifact of this kind and title, if any."""
+    with Session(engine) as session:
+        artifact_id = session.exec(
+            select(Artifact.id)
+            .where(Artifact.user_id == user_id, Artifact.kind == kind, Artifact.title == title)
+            .order_by(Artifact.id.desc())
+        ).first()
+    return get_artifact(artifact_id) if artifact_id is not None else None
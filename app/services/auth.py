@@ -1,10 +1,184 @@
-from passlib.context import CryptContext
+import os
+import uuid
+import secrets
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+import jwt
+import diskcache
+from dotenv import load_dotenv
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from app.core.cache import CACHE_DIR
+# Password hashing lives in app.core.passwords (runs in its own process pool)
+from app.core.passwords import (
+    pwd_context, verify_password, get_password_hash, verify_password_async, get_password_hash_async
+)
 
-# CHANGED: Use 'argon2' instead of 'bcrypt' to fix the 72-byte limit and version errors
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+load_dotenv()
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+# --- SESSION TOKENS ---
+# /login hands out a short-lived access token and a longer-lived refresh
+# token (signed JWTs). The access token carries the user ID, model preference
+# and profile version, so routes authorize and personalize without a DB read.
+# Off = requests without a token are still accepted (old clients); a token
+# that is sent is always verified
+AUTH_REQUIRED = os.getenv("AUTH_REQUIRED", "true").lower() == "true"
+JWT_SECRET = os.getenv("JWT_SECRET")
+if not JWT_SECRET:
+    if AUTH_REQUIRED:
+        # A random secret would differ per worker and per restart, so tokens
+        # would fail at random; refuse to start instead
+        raise RuntimeError("JWT_SECRET is not set. Set it (e.g. to `openssl rand -hex 32`) or turn AUTH_REQUIRED off.")
+    # Local dev with auth off: only tokens that clients choose to send are checked
+    JWT_SECRET = secrets.token_urlsafe(32)
+    print("⚠️ JWT_SECRET not set; using a random per-process secret.")
+JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+ACCESS_TOKEN_MINUTES = int(os.getenv("ACCESS_TOKEN_MINUTES", "15"))
+REFRESH_TOKEN_DAYS = int(os.getenv("REFRESH_TOKEN_DAYS", "7"))
+# How long a user has to approve the GitHub/LinkedIn consent screen
+OAUTH_STATE_MINUTES = int(os.getenv("OAUTH_STATE_MINUTES", "10"))
+# Users allowed to read operational endpoints such as /metrics (comma-separated IDs)
+ADMIN_USER_IDS = {int(uid) for uid in os.getenv("ADMIN_USER_IDS", "").split(",") if uid.strip()}
+
+
+class TokenDenyList:
+    """
+    Revoked token IDs (jti), shared by every worker on the host. Each entry
+    expires together with its token, so the list only ever holds tokens that
+    would otherwise still be valid.
+    """
+
+    def __init__(self, directory=CACHE_DIR):
+        self.directory = os.path.join(directory, "auth_denylist")
+        self._cache = None
+        self._lock = threading.Lock()
+
+    @property
+    def cache(self):
+        # Opened lazily so importing the module doesn't touch the filesystem
+        with self._lock:
+            if self._cache is None:
+                self._cache = diskcache.Cache(self.directory)
+            return self._cache
+
+    def revoke(self, jti: str, expires_at: int):
+        ttl = expires_at - int(datetime.now(timezone.utc).timestamp())
+        if ttl > 0:
+            self.cache.set(jti, 1, expire=ttl)
+
+    def is_revoked(self, jti: str) -> bool:
+        return jti in self.cache
+
+
+deny_list = TokenDenyList()
+
+
+@dataclass(frozen=True)
+class TokenUser:
+    user_id: int
+    preferred_model: Optional[str]
+    profile_version: int
+    jti: str
+    expires_at: int
+
+
+def _encode(user, token_type: str, lifetime: timedelta) -> str:
+    now = datetime.now(timezone.utc)
+    claims = {
+        "sub": str(user.id),
+        "typ": token_type,
+        "jti": uuid.uuid4().hex,
+        "iat": now,
+        "exp": now + lifetime,
+    }
+    if token_type == "access":
+        claims["model"] = user.preferred_model
+        claims["pv"] = user.profile_version or 0
+    return jwt.encode(claims, JWT_SECRET, algorithm=JWT_ALGORITHM)
+
+
+def create_token_pair(user) -> dict:
+    return {
+        "access_token": _encode(user, "access", timedelta(minutes=ACCESS_TOKEN_MINUTES)),
+        "refresh_token": _encode(user, "refresh", timedelta(days=REFRESH_TOKEN_DAYS)),
+        "token_type": "bearer",
+        "expires_in": ACCESS_TOKEN_MINUTES * 60,
+    }
+
+
+def decode_token(token: str, token_type: str) -> dict:
+    """
+    Verified claims of a token of the given type. Raises HTTPException(401)
+    for bad, expired, wrong-type or revoked tokens.
+    """
+    try:
+        claims = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM],
+                            options={"require": ["sub", "typ", "jti", "exp"]})
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Session expired", headers={"WWW-Authenticate": "Bearer"})
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=401, detail="Invalid token", headers={"WWW-Authenticate": "Bearer"})
+    if claims["typ"] != token_type or deny_list.is_revoked(claims["jti"]):
+        raise HTTPException(status_code=401, detail="Invalid token", headers={"WWW-Authenticate": "Bearer"})
+    return claims
+
+
+def create_oauth_state(user_id: int, provider: str) -> str:
+    """
+    The OAuth `state` for linking a provider account: a signed, single-use
+    token naming the user who started the flow, so a callback can't be
+    pointed at someone else's account.
+    """
+    now = datetime.now(timezone.utc)
+    claims = {
+        "sub": str(user_id),
+        "typ": f"oauth_{provider}",
+        "jti": uuid.uuid4().hex,
+        "iat": now,
+        "exp": now + timedelta(minutes=OAUTH_STATE_MINUTES),
+    }
+    return jwt.encode(claims, JWT_SECRET, algorithm=JWT_ALGORITHM)
+
+
+def verify_oauth_state(state: str, provider: str) -> int:
+    """User ID from a state issued by create_oauth_state(). Raises HTTPException(400)."""
+    try:
+        claims = decode_token(state, f"oauth_{provider}")
+    except HTTPException:
+        raise HTTPException(status_code=400, detail="Invalid or expired state parameter")
+    deny_list.revoke(claims["jti"], claims["exp"])
+    return int(claims["sub"])
+
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+
+def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)) -> Optional[TokenUser]:
+    """
+    Dependency: the caller from the Bearer access token. None only when
+    AUTH_REQUIRED is off and no token was sent.
+    """
+    if credentials is None:
+        if AUTH_REQUIRED:
+            raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+        return None
+    claims = decode_token(credentials.credentials, "access")
+    return TokenUser(int(claims["sub"]), claims.get("model"), claims.get("pv", 0), claims["jti"], claims["exp"])
+
+
+def authorize(current: Optional[TokenUser], user_id) -> None:
+    """403 unless the request's user_id is the token's user."""
+    if current is not None and str(current.user_id) != str(user_id):
+        raise HTTPException(status_code=403, detail="Not allowed for this user")
+
+
+def require_admin(current: Optional[TokenUser] = Depends(get_current_user)) -> TokenUser:
+    """Dependency: the caller, who must hold a token for one of ADMIN_USER_IDS (even with AUTH_REQUIRED off)."""
+    if current is None:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    if current.user_id not in ADMIN_USER_IDS:
+        raise HTTPException(status_code=403, detail="Admins only")
+    return current
@@ -0,0 +1,181 @@
+import os
+import json
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dotenv import load_dotenv
+from sqlmodel import Session, select
+from app.db.database import engine
+from app.models.user import Quiz
+from app.core.llm import get_llm
+from app.core.executor import run_cpu_sync
+from app.agents.content_crew import ContentCrew
+from app.agents.assessment_crew import AssessmentCrew
+from app.services.artifacts import save_artifact, find_artifact
+from app.services.roadmap_store import get_roadmap
+from app.services.user_context import user_contexts
+from app.services.pdf_cache import pdf_key, pdf_path, render_cached, tmp_pdf_path
+from app.services.pdf_generator import render_pdf_to_file, merge_pdf_files, count_pdf_pages
+from app.services.task_manager import update_task, register_job_handler, JobFailed
+
+load_dotenv()
+
+# A course book is the roadmap, then each week's chapter and quiz, in one PDF.
+# Every section is an ordinary cached PDF (the same file the single-document
+# download routes serve), so a book export only generates and renders what
+# the user hasn't produced yet, and re-exporting an unchanged course is a
+# cache hit. Sections are concatenated page by page without re-layout.
+BOOK_SECTION_CONCURRENCY = int(os.getenv("BOOK_SECTION_CONCURRENCY", "3"))
+
+
+def _find_quiz(user_id: int, topic: str):
+    with Session(engine) as session:
+        quiz = session.exec(
+            select(Quiz).where(Quiz.user_id == user_id, Quiz.topic == topic).order_by(Quiz.id.desc())
+        ).first()
+        return quiz.questions if quiz else None
+
+
+def _save_quiz(user_id: int, topic: str, quiz_data: dict):
+    with Session(engine) as session:
+        session.add(Quiz(user_id=user_id, topic=topic, difficulty="Adaptive", questions=quiz_data))
+        session.commit()
+
+
+def _chapter_section(llm, user_id, week, level):
+    """Renders the week's chapter, writing it first if the user has none yet."""
+    title = week["title"]
+    artifact = find_artifact(user_id, "chapter", title)
+    if artifact:
+        data = artifact["data"]
+    elif llm is None:
+        raise ValueError("No chapter yet and no LLM configured to write it")
+    else:
+        content = ContentCrew(llm=llm).create_chapter(topic=title, subtopics=week.get("topics") or [title],
+                                                      detail_level=level)
+        data = {"topic": title, "content": content}
+        # Saved like any chapter, so it is reused next time (and by a retried job)
+        save_artifact(user_id, "chapter", title, data)
+    return render_cached("chapter", data, "generate_chapter_pdf", (data["topic"], data["content"]))
+
+
+def _quiz_section(llm, user_id, week, user_context):
+    """Renders the week's quiz (answer key), generating it if the user has none yet."""
+    title = week["title"]
+    quiz_data = _find_quiz(user_id, title)
+    if not quiz_data:
+        if llm is None:
+            raise ValueError("No quiz yet and no LLM configured to generate it")
+        quiz_data = json.loads(AssessmentCrew(llm=llm).create_assessment(
+            topic=title, assessment_type="Quiz", user_context=user_context
+        ))
+        _save_quiz(user_id, title, quiz_data)
+    quiz_title = quiz_data.get('title', f'Quiz on {title}')
+    questions = quiz_data.get('questions', [])
+    params = {"title": quiz_title, "questions": questions, "results": None}
+    return render_cached("assessment", params, "generate_assessment_pdf", (quiz_title, questions, None))
+
+
+def build_book(job_id: int, user_id: int, roadmap_id: int, include_quizzes: bool = True,
+               user_context: str = "General Learner", **legacy):
+    """
+    Job handler for "book" jobs; runs on a job worker thread. The user's
+    key is looked up here rather than stored in the job payload (jobs
+    queued by older versions still carry api_key/model_pref; ignored).
+    """
+    with Session(engine) as session:
+        roadmap = get_roadmap(session, roadmap_id)
+    if not roadmap or roadmap["user_id"] != user_id:
+        raise JobFailed("Roadmap not found")
+    weeks = (roadmap["data"] or {}).get("roadmap", [])
+    if not weeks:
+        raise JobFailed("Roadmap has no weeks")
+
+    user = user_contexts.get(user_id)
+    if not user:
+        raise JobFailed("User not found")
+    try:
+        llm = get_llm(user.preferred_model, user.gemini_api_key)
+    except ValueError as e:
+        # Sections the user already has can still be bound without a key
+        llm, llm_error = None, f"Config Error: {str(e)}"
+
+    level = roadmap["level"] or "Intermediate"
+
+    # 1. Sections, in book order
+    update_task(job_id, "processing", "📖 Collecting roadmap...", 5)
+    sections = [(f"Roadmap: {roadmap['title']}", render_cached(
+        "roadmap",
+        {"topic": roadmap["title"], "duration": roadmap["duration"], "data": roadmap["data"]},
+        "generate_roadmap_pdf",
+        (roadmap["title"], roadmap["duration"], roadmap["data"])
+    ))]
+
+    work = []
+    for week in weeks:
+        work.append((f"Week {week['week']}: {week['title']}", _chapter_section, (week, level)))
+        if include_quizzes:
+            work.append((f"Week {week['week']} Quiz", _quiz_section, (week, user_context)))
+
+    # 2. Missing chapters/quizzes are generated and rendered in parallel
+    # (5% -> 85% as sections complete)
+    paths, failed = {}, {}
+    executor = ThreadPoolExecutor(max_workers=BOOK_SECTION_CONCURRENCY)
+    try:
+        # Sections keep the job's context (fair-share caller on the admin key)
+        futures = {executor.submit(contextvars.copy_context().run, func, llm, user_id, *args): name
+                   for name, func, args in work}
+        for done, future in enumerate(as_completed(futures), start=1):
+            name = futures[future]
+            try:
+                paths[name] = future.result()
+            except Exception as e:
+                failed[name] = str(e)
+            # Also the cancellation checkpoint between sections
+            update_task(job_id, "processing", f"📖 Preparing sections ({done}/{len(work)})...",
+                        5 + int(80 * done / len(work)))
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    sections += [(name, paths[name]) for name, _, _ in work if name in paths]
+    if len(sections) == 1:
+        if llm is None:
+            # Retrying won't fix a missing key
+            raise JobFailed(llm_error)
+        raise Exception(f"Could not prepare any chapter or quiz: {failed}")
+
+    # 3. Assemble: contents page + sections (skipped if this exact book exists)
+    update_task(job_id, "processing", "📚 Binding the book...", 90)
+    key = pdf_key("book", {"title": roadmap["title"], "sections": [[name, os.path.basename(path)] for name, path in sections]})
+    path = pdf_path(key)
+    if not os.path.exists(path):
+        _assemble(path, roadmap, sections)
+
+    return {"pdf_key": key, "roadmap_id": roadmap_id, "sections": len(sections), "failed_sections": failed}
+
+
+def _assemble(path, roadmap, sections):
+    subtitle = " | ".join(v for v in (roadmap["duration"], roadmap["level"]) if v)
+    cover_path = tmp_pdf_path(path)
+    tmp_path = tmp_pdf_path(path)
+    try:
+        # Page numbers depend on the contents' own length; re-render once if it overflows
+        cover_pages = 1
+        for _ in range(2):
+            contents, page = [], cover_pages + 1
+            for name, section_path in sections:
+                contents.append((name, page))
+                page += count_pdf_pages(section_path)
+            run_cpu_sync(render_pdf_to_file, "generate_book_cover", (roadmap["title"], subtitle, contents), cover_path)
+            if count_pdf_pages(cover_path) == cover_pages:
+                break
+            cover_pages = count_pdf_pages(cover_path)
+
+        run_cpu_sync(merge_pdf_files, [cover_path] + [p for _, p in sections], tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        for leftover in (cover_path, tmp_path):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+
+register_job_handler("book", build_book)
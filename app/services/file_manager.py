@@ -5,6 +5,24 @@ import re
 def sanitize_filename(name: str) -> str:
     return re.sub(r'[<>:"/\\|?*]', '', name)
 
+def project_dir(user_id: str, project_name: str) -> str:
+    safe_project_name = sanitize_filename(project_name).replace(" ", "_")
+    return f"generated_projects/user_{user_id}/{safe_project_name}"
+
+def save_project_file(user_id: str, project_name: str, filename: str, content: str):
+    """
+    Writes a single file into the project folder; used when files are generated one by one.
+    """
+    base_path = project_dir(user_id, project_name)
+    file_path = os.path.normpath(os.path.join(base_path, filename.lstrip("/\\")))
+    # Keep agent-provided paths like "../../x" inside the project folder
+    if not file_path.startswith(os.path.normpath(base_path) + os.sep):
+        raise ValueError(f"Invalid file path: {filename}")
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, "w", encoding="utf-8") as f:
+        f.write(content)
+    return file_path
+
 def save_project_files(user_id: str, project_name: str, project_data_str: str):
     """
     Saves files into generated_projects/user_{id}/{project_name}/
@@ -14,8 +32,7 @@ def save_project_files(user_id: str, project_name: str, project_data_str: str):
         files = json.loads(clean_json)
         
         # Create specific project folder
-        safe_project_name = sanitize_filename(project_name).replace(" ", "_")
-        base_path = f"generated_projects/user_{user_id}/{safe_project_name}"
+        base_path = project_dir(user_id, project_name)
         os.makedirs(base_path, exist_ok=True)
         
         saved_paths = []
@@ -0,0 +1,409 @@
+import os
+import textwrap
+from functools import lru_cache
+from xml.sax.saxutils import escape
+from markdown_it import MarkdownIt
+from markdown_it.tree import SyntaxTreeNode
+from pygments import lex
+from pygments.lexers import get_lexer_by_name
+from pygments.styles import get_style_by_name
+from pygments.util import ClassNotFound
+from reportlab.lib import colors
+from reportlab.lib.fonts import tt2ps, ps2tt
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.pdfbase.pdfmetrics import stringWidth, getAscentDescent
+from reportlab.platypus import Flowable, Paragraph, Table, TableStyle, HRFlowable
+
+# Markdown -> ReportLab flowables in one pass over the markdown-it syntax tree.
+# Code blocks become a single highlighted CodeBlock flowable instead of one
+# Paragraph per line.
+CODE_WRAP_COLUMNS = int(os.getenv("PDF_CODE_WRAP_COLUMNS", "95"))
+CODE_HIGHLIGHT_CACHE_SIZE = int(os.getenv("PDF_CODE_HIGHLIGHT_CACHE_SIZE", "512"))
+
+_md = MarkdownIt("commonmark", {"html": False}).enable("table").enable("strikethrough")
+_code_style = get_style_by_name("friendly")
+_inline_code_background = colors.HexColor("#f0f0f0")
+
+
+@lru_cache(maxsize=None)
+def _token_color(token_type):
+    # Nearest ancestor token type with a color in the style (e.g. Name.Function -> Name)
+    while token_type:
+        color = _code_style.style_for_token(token_type).get("color")
+        if color:
+            return color
+        token_type = token_type.parent
+    return None
+
+
+@lru_cache(maxsize=None)
+def _fill(color):
+    return colors.HexColor(f"#{color}") if color else colors.black
+
+
+@lru_cache(maxsize=64)
+def _lexer(language: str):
+    try:
+        return get_lexer_by_name(language)
+    except ClassNotFound:
+        return None
+
+
+@lru_cache(maxsize=CODE_HIGHLIGHT_CACHE_SIZE)
+def highlight_code(code: str, language: str = ""):
+    """
+    Splits a code block into lines of (color, text) runs, long lines wrapped.
+    Cached per (code, language): the same snippet recurs across chapters and
+    book exports. Blocks without a (known) language get no colors.
+    """
+    code = "\n".join(
+        "\n".join(textwrap.wrap(line, CODE_WRAP_COLUMNS, replace_whitespace=False, drop_whitespace=False)) or ""
+        for line in code.expandtabs(4).rstrip("\n").split("\n")
+    )
+    lexer = _lexer(language.lower()) if language else None
+    tokens = lex(code, lexer) if lexer else [(None, code)]
+
+    lines, line = [], []
+    for token_type, value in tokens:
+        color = _token_color(token_type) if token_type is not None and value.strip() else None
+        for k, part in enumerate(value.split("\n")):
+            if k:
+                lines.append(tuple(line))
+                line = []
+            if not part:
+                continue
+            # Merge runs of the same color (whitespace takes any color)
+            if line and (line[-1][0] == color or not part.strip()):
+                line[-1] = (line[-1][0], line[-1][1] + part)
+            else:
+                line.append((color, part))
+    lines.append(tuple(line))
+    while len(lines) > 1 and not lines[-1]:
+        lines.pop()
+    return tuple(lines)
+
+
+class CodeBlock(Flowable):
+    """
+    A code block drawn directly as colored text runs: one flowable per block
+    (no markup parsing), split across pages by whole lines.
+    """
+
+    spaceBefore = 4
+    spaceAfter = 8
+
+    def __init__(self, lines, font="Courier", size=8, leading=10, padding=6, background="#f6f8fa", indent=0):
+        super().__init__()
+        self.lines = lines
+        self.font, self.size, self.leading, self.padding = font, size, leading, padding
+        self.background = colors.HexColor(background) if isinstance(background, str) else background
+        self.indent = indent
+
+    def wrap(self, availWidth, availHeight):
+        self.width = availWidth - self.indent
+        self.height = len(self.lines) * self.leading + 2 * self.padding
+        return availWidth, self.height
+
+    def split(self, availWidth, availHeight):
+        fits = int((availHeight - 2 * self.padding) // self.leading)
+        if fits <= 0 or fits >= len(self.lines):
+            return []
+        style = (self.font, self.size, self.leading, self.padding, self.background, self.indent)
+        return [CodeBlock(self.lines[:fits], *style), CodeBlock(self.lines[fits:], *style)]
+
+    def draw(self):
+        canvas = self.canv
+        canvas.translate(self.indent, 0)
+        canvas.setFillColor(self.background)
+        canvas.rect(0, 0, self.width, self.height, fill=1, stroke=0)
+        text = canvas.beginText(self.padding, self.height - self.padding - self.size)
+        text.setFont(self.font, self.size, self.leading)
+        current = None
+        for line in self.lines:
+            for color, run in line:
+                if color != current:
+                    text.setFillColor(_fill(color))
+                    current = color
+                text.textOut(run)
+            text.textLine("")
+        canvas.drawText(text)
+
+
+@lru_cache(maxsize=None)
+def _font(font_name, bold, italic):
+    # Bold/italic variant of a style's font (Helvetica-Bold + italic -> Helvetica-BoldOblique)
+    family, style_bold, style_italic = ps2tt(font_name)
+    return tt2ps(family, style_bold or int(bold), style_italic or int(italic))
+
+
+@lru_cache(maxsize=65536)
+def _width(text, font_name, font_size):
+    return stringWidth(text, font_name, font_size)
+
+
+class TextBlock(Flowable):
+    """
+    A left-aligned paragraph of plain, bold, italic and inline-code runs,
+    broken into lines with cached word widths and drawn directly. ReportLab's
+    Paragraph lays out and draws any text with inline markup word by word,
+    which made chapters with formatting several times slower to render than
+    plain text.
+    """
+
+    def __init__(self, runs, style, bullet=None, lines=None):
+        super().__init__()
+        self.runs = runs  # [(text, font, code)]
+        self.style = style
+        self.bullet = bullet
+        self.lines = lines
+        self._broken_for = None
+
+    def _words(self):
+        # Each word is a list of (text, font, code) pieces; "**bold**ness" is one word
+        words, word = [], []
+        for text, font, code in self.runs:
+            for k, part in enumerate(text.split(" ")):
+                if k and word:
+                    words.append(word)
+                    word = []
+                if part:
+                    word.append((part, font, code))
+        if word:
+            words.append(word)
+        return words
+
+    def _break(self, width):
+        # Lines of (x, text, font, code, width) segments: consecutive words in
+        # the same font share a segment, so drawing is one text run per segment
+        size = self.style.fontSize
+        limit = width - self.style.leftIndent - self.style.rightIndent
+        lines, line, x = [], [], 0.0
+        for word in self._words():
+            widths = [_width(text, font, size) for text, font, _ in word]
+            gap = _width(" ", line[-1][2], size) if line else 0.0
+            if line and x + gap + sum(widths) > limit:
+                lines.append(line)
+                line, x, gap = [], 0.0, 0.0
+            if gap:
+                # The space goes at the end of the previous segment, in its font,
+                # so the next segment starts where that text leaves off
+                start, joined, font, code, joined_width = line[-1]
+                line[-1] = (start, joined + " ", font, code, joined_width)
+                x += gap
+            for (text, font, code), w in zip(word, widths):
+                if line and line[-1][2] == font and line[-1][3] == code:
+                    start, joined, _, _, _ = line[-1]
+                    line[-1] = (start, joined + text, font, code, x + w - start)
+                else:
+                    line.append((x, text, font, code, w))
+                x += w
+        if line:
+            lines.append(line)
+        return lines
+
+    def wrap(self, availWidth, availHeight):
+        if self.lines is None or (self._broken_for is not None and self._broken_for != availWidth):
+            self.lines = self._break(availWidth)
+            self._broken_for = availWidth
+        self.width = availWidth
+        self.height = len(self.lines) * self.style.leading
+        return self.width, self.height
+
+    def split(self, availWidth, availHeight):
+        self.wrap(availWidth, availHeight)
+        fits = int(availHeight // self.style.leading)
+        if fits <= 0 or fits >= len(self.lines):
+            return []
+        return [TextBlock(self.runs, self.style, self.bullet, self.lines[:fits]),
+                TextBlock(self.runs, self.style, None, self.lines[fits:])]
+
+    def draw(self):
+        canvas, style = self.canv, self.style
+        size, leading = style.fontSize, style.leading
+        ascent, descent = getAscentDescent(style.fontName, size)
+        baseline = self.height - ascent
+        if self.bullet:
+            canvas.setFillColor(style.textColor)
+            canvas.setFont(style.bulletFontName, style.bulletFontSize)
+            canvas.drawString(style.bulletIndent, baseline, self.bullet)
+
+        # Inline code backgrounds first, then all text in one text object
+        filled = False
+        for i, line in enumerate(self.lines):
+            for x, _, _, code, w in line:
+                if code:
+                    if not filled:
+                        canvas.setFillColor(_inline_code_background)
+                        filled = True
+                    canvas.rect(style.leftIndent + x, baseline - i * leading + descent, w, ascent - descent, fill=1, stroke=0)
+
+        text = canvas.beginText(style.leftIndent, baseline)
+        text.setFillColor(style.textColor)
+        current = None
+        for i, line in enumerate(self.lines):
+            if i:
+                text.moveCursor(0, leading)
+            # Segments are contiguous (spaces included), so each one continues
+            # where the previous one ended without repositioning
+            for _, run, font, _, _ in line:
+                if font != current:
+                    text.setFont(font, size, leading)
+                    current = font
+                text.textOut(run)
+        canvas.drawText(text)
+
+
+class MarkdownRenderer:
+    def __init__(self, styles, width: float):
+        self.styles = styles
+        self.width = width
+        self.body = styles['BodyText']
+        self.headings = {
+            "h1": styles['Heading2'],
+            "h2": styles['Heading2'],
+            "h3": styles['Heading3'],
+            "h4": styles['Heading4'],
+            "h5": styles['Heading5'],
+            "h6": styles['Heading6'],
+        }
+        # Block spacing lives in the styles (spaceAfter) rather than in Spacer
+        # flowables, so layout handles half as many flowables
+        self.para = ParagraphStyle('MdBody', parent=self.body, spaceAfter=4)
+        self.quote = ParagraphStyle(
+            'Quote', parent=self.para, leftIndent=14, textColor=colors.HexColor("#555555")
+        )
+        self.cell = ParagraphStyle('Cell', parent=self.body, fontSize=9, leading=11)
+        self._list_styles = {}
+
+    def render(self, text: str):
+        return self._blocks(SyntaxTreeNode(_md.parse(text or "")).children, self.para)
+
+    # --- BLOCKS ---
+
+    def _blocks(self, nodes, style, bullet=None):
+        # bullet: list marker for the first block (the start of a list item)
+        flowables = []
+        for node in nodes:
+            flowables.extend(self._block(node, style, bullet))
+            bullet = None
+        return flowables
+
+    def _block(self, node, style, bullet=None):
+        lead = [Paragraph("", style, bulletText=bullet)] if bullet and node.type != "paragraph" else []
+        if node.type == "heading":
+            return lead + [self._paragraph(node.children[0], self.headings.get(node.tag, self.body))]
+        if node.type == "paragraph":
+            return [self._paragraph(node.children[0], style, bullet)]
+        if node.type in ("bullet_list", "ordered_list"):
+            return lead + self._list(node, style)
+        if node.type in ("fence", "code_block"):
+            language = (node.info or "").split()[0] if node.type == "fence" and node.info else ""
+            return lead + [CodeBlock(highlight_code(node.content, language), indent=style.leftIndent)]
+        if node.type == "blockquote":
+            return lead + self._blocks(node.children, self.quote)
+        if node.type == "table":
+            return lead + [self._table(node, style)]
+        if node.type == "hr":
+            return lead + [HRFlowable(width="100%", color=colors.lightgrey, spaceBefore=6, spaceAfter=6)]
+        return lead
+
+    def _list(self, node, style):
+        # Items are plain Paragraphs with a bullet, indented per nesting level
+        # (a ListFlowable lays every item out as a small table, which is slow)
+        ordered = node.type == "ordered_list"
+        item_style = self._list_style(style)
+        start = int(node.attrs.get("start", 1)) if ordered else 1
+        flowables = []
+        for n, item in enumerate(node.children, start):
+            flowables.extend(self._blocks(item.children, item_style, f"{n}." if ordered else "\u2022"))
+        return flowables
+
+    def _list_style(self, parent):
+        if parent.name not in self._list_styles:
+            indent = parent.leftIndent + 14
+            self._list_styles[parent.name] = ParagraphStyle(
+                f"{parent.name}-li", parent=parent, leftIndent=indent, bulletIndent=indent - 11, spaceAfter=2
+            )
+        return self._list_styles[parent.name]
+
+    def _table(self, node, style):
+        rows = []
+        for section in node.children:  # thead / tbody
+            for tr in section.children:
+                rows.append([
+                    self._paragraph(cell.children[0], self.cell) if cell.children else Paragraph("", self.cell)
+                    for cell in tr.children
+                ])
+        columns = max(len(row) for row in rows) if rows else 1
+        for row in rows:
+            row.extend(Paragraph("", self.cell) for _ in range(columns - len(row)))
+        # Same frame as code blocks: the text width, less the list indent
+        width = self.width - style.leftIndent
+        table = Table(rows, colWidths=[width / columns] * columns, repeatRows=1, spaceBefore=2, spaceAfter=8,
+                      hAlign="RIGHT")
+        table.setStyle(TableStyle([
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#e8eaf6")),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ]))
+        return table
+
+    # --- INLINE ---
+
+    def _paragraph(self, inline, style, bullet=None):
+        runs = self._runs(inline, style)
+        if not runs:
+            # Links, strikethrough and hard breaks go through ReportLab's Paragraph
+            return Paragraph(self._inline(inline), style, bulletText=bullet)
+        return TextBlock(runs, style, bullet)
+
+    def _runs(self, node, style, bold=False, italic=False, runs=None):
+        """(text, font, code) runs of an inline node; None if it needs a Paragraph."""
+        runs = [] if runs is None else runs
+        for child in node.children:
+            if child.type in ("text", "image"):
+                text, code = child.content or "", False
+            elif child.type == "code_inline":
+                text, code = child.content, True
+            elif child.type == "softbreak":
+                text, code = " ", False
+            elif child.type in ("strong", "em"):
+                if self._runs(child, style, bold or child.type == "strong", italic or child.type == "em", runs) is None:
+                    return None
+                continue
+            else:
+                return None
+            if not text:
+                continue
+            font = "Courier" if code else _font(style.fontName, bold, italic)
+            if runs and runs[-1][1:] == (font, code):
+                runs[-1] = (runs[-1][0] + text, font, code)
+            else:
+                runs.append((text, font, code))
+        return runs
+
+    def _inline(self, node):
+        parts = []
+        for child in node.children:
+            if child.type == "text":
+                parts.append(escape(child.content))
+            elif child.type == "strong":
+                parts.append(f"<b>{self._inline(child)}</b>")
+            elif child.type == "em":
+                parts.append(f"<i>{self._inline(child)}</i>")
+            elif child.type == "s":
+                parts.append(f"<strike>{self._inline(child)}</strike>")
+            elif child.type == "code_inline":
+                parts.append(f'<font face="Courier" backColor="#f0f0f0">{escape(child.content)}</font>')
+            elif child.type == "link":
+                href = escape(child.attrs.get("href", ""), {'"': "&quot;"})
+                parts.append(f'<link href="{href}" color="blue">{self._inline(child)}</link>')
+            elif child.type == "image":
+                parts.append(escape(child.content or ""))
+            elif child.type == "softbreak":
+                parts.append(" ")
+            elif child.type == "hardbreak":
+                parts.append("<br/>")
+            else:
+                parts.append(escape(child.content or ""))
+        return "".join(parts)
@@ -0,0 +1,161 @@
+import os
+import json
+import time
+import uuid
+import hashlib
+import threading
+from fastapi import Request, Response
+from fastapi.responses import FileResponse
+from app.core.cache import CACHE_DIR
+from app.core.executor import run_cpu, run_cpu_sync, run_render
+from app.services.pdf_generator import render_pdf_to_file
+
+# Rendered PDFs are files on disk named by hash(kind, template version, inputs).
+# The same hash is the ETag, so an unchanged document is never re-rendered
+# and a client that already has it gets a 304.
+# Bump whenever PDFGenerator's layout changes.
+PDF_TEMPLATE_VERSION = "2"
+PDF_CACHE_DIR = os.path.join(CACHE_DIR, "pdf")
+
+# The cache is bounded: files unused for PDF_CACHE_TTL_SECONDS are deleted,
+# then the least recently used ones until it fits in PDF_CACHE_MAX_BYTES.
+# Each hit refreshes the file's mtime; a sweep runs at most every
+# PDF_CACHE_SWEEP_SECONDS, after a new PDF was written.
+PDF_CACHE_MAX_BYTES = int(os.getenv("PDF_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+PDF_CACHE_TTL_SECONDS = int(os.getenv("PDF_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+PDF_CACHE_SWEEP_SECONDS = int(os.getenv("PDF_CACHE_SWEEP_SECONDS", "60"))
+# Leftovers of renders that died mid-write
+PDF_TMP_MAX_AGE_SECONDS = 3600
+
+_sweep_lock = threading.Lock()
+_last_sweep = 0.0
+
+
+def pdf_key(kind: str, params: dict) -> str:
+    canonical = json.dumps([kind, PDF_TEMPLATE_VERSION, params], sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def pdf_path(key: str) -> str:
+    return os.path.join(PDF_CACHE_DIR, f"{key}.pdf")
+
+
+def tmp_pdf_path(path: str) -> str:
+    os.makedirs(PDF_CACHE_DIR, exist_ok=True)
+    return f"{path}.{uuid.uuid4().hex}.tmp"
+
+
+def sweep_pdf_cache():
+    """Deletes expired PDFs, then the least recently used until under the size limit."""
+    now = time.time()
+    entries = []
+    try:
+        names = os.listdir(PDF_CACHE_DIR)
+    except FileNotFoundError:
+        return
+    for name in names:
+        path = os.path.join(PDF_CACHE_DIR, name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        age = now - stat.st_mtime
+        if name.endswith(".tmp"):
+            if age > PDF_TMP_MAX_AGE_SECONDS:
+                _remove(path)
+        elif age > PDF_CACHE_TTL_SECONDS:
+            _remove(path)
+        else:
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= PDF_CACHE_MAX_BYTES:
+            break
+        _remove(path)
+        total -= size
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _sweep_due() -> bool:
+    global _last_sweep
+    with _sweep_lock:
+        if time.monotonic() - _last_sweep < PDF_CACHE_SWEEP_SECONDS:
+            return False
+        _last_sweep = time.monotonic()
+        return True
+
+
+def _touch(path: str) -> bool:
+    # Marks a hit for the LRU sweep; False if the file is gone
+    try:
+        os.utime(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+async def _render_to_cache(path: str, method: str, args: tuple):
+    # Render in a worker process straight to disk (nothing large crosses the
+    # process boundary), then rename so readers never see a half-written file
+    tmp_path = tmp_pdf_path(path)
+    try:
+        await run_cpu(render_pdf_to_file, method, args, tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    if _sweep_due():
+        await run_render(sweep_pdf_cache)
+
+
+def render_cached(kind: str, params: dict, method: str, args: tuple) -> str:
+    """
+    Blocking version of the cache lookup + render for job workers. Returns the
+    path of the cached PDF; shares entries with pdf_response().
+    """
+    path = pdf_path(pdf_key(kind, params))
+    if not _touch(path):
+        tmp_path = tmp_pdf_path(path)
+        try:
+            run_cpu_sync(render_pdf_to_file, method, args, tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        if _sweep_due():
+            sweep_pdf_cache()
+    return path
+
+
+def cached_file_response(key: str, filename: str):
+    """FileResponse for an already cached PDF, streamed from disk in chunks."""
+    return FileResponse(
+        pdf_path(key),
+        media_type="application/pdf",
+        filename=filename,
+        headers={"ETag": f'"{key}"', "Cache-Control": "private, no-cache"}
+    )
+
+
+async def pdf_response(request: Request, kind: str, params: dict, method: str, args: tuple, filename: str):
+    """
+    Serves PDFGenerator.<method>(*args), rendering it only if this exact
+    document (kind + params + template version) isn't cached yet.
+    """
+    key = pdf_key(kind, params)
+    etag = f'"{key}"'
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    path = pdf_path(key)
+    if not _touch(path):
+        await _render_to_cache(path, method, args)
+
+    return cached_file_response(key, filename)
@@ -3,12 +3,18 @@ from reportlab.pdfgen import canvas
 from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from io import BytesIO
+from tempfile import SpooledTemporaryFile
+from app.services.markdown_pdf import MarkdownRenderer
+import os
+
+# Documents stay in memory up to this size, then spill to a temp file
+PDF_SPOOL_MAX_BYTES = int(os.getenv("PDF_SPOOL_MAX_BYTES", str(1024 * 1024)))
 
 class PDFGenerator:
-    def __init__(self):
+    def __init__(self, output=None):
+        # output: any writable binary file object; defaults to a spooled temp file
         self.styles = getSampleStyleSheet()
-        self.buffer = BytesIO()
+        self.buffer = output if output is not None else SpooledTemporaryFile(max_size=PDF_SPOOL_MAX_BYTES)
         
     def _get_header_style(self):
         return ParagraphStyle(
@@ -58,23 +64,8 @@ class PDFGenerator:
         elements.append(Paragraph(f"Study Chapter: {topic}", self._get_header_style()))
         elements.append(Spacer(1, 20))
         
-        # ReportLab doesn't parse Markdown directly, so we do a simple split
-        # For production, you'd use a markdown-to-pdf parser, but this works for text
-        lines = content.split('\n')
-        for line in lines:
-            if line.startswith('#'):
-                style = self.styles['Heading2']
-                text = line.replace('#', '').strip()
-            elif line.startswith('-') or line.startswith('*'):
-                style = self.styles['Bullet']
-                text = line[1:].strip()
-            else:
-                style = self.styles['Normal']
-                text = line
-            
-            if text.strip():
-                elements.append(Paragraph(text, style))
-                elements.append(Spacer(1, 6))
+        # Markdown -> flowables (headings, lists, tables, highlighted code blocks)
+        elements.extend(MarkdownRenderer(self.styles, doc.width).render(content))
                 
         doc.build(elements)
         self.buffer.seek(0)
@@ -136,3 +127,67 @@ class PDFGenerator:
         doc.build(elements)
         self.buffer.seek(0)
         return self.buffer
+
+    def generate_book_cover(self, title, subtitle, contents):
+        # contents: [(section title, first page number), ...]
+        doc = SimpleDocTemplate(self.buffer, pagesize=LETTER)
+        elements = []
+        
+        elements.append(Spacer(1, 120))
+        elements.append(Paragraph(f"Course Book: {title}", self._get_header_style()))
+        elements.append(Paragraph(f"{subtitle} | Generated by Student GenAI", self.styles['Normal']))
+        elements.append(Spacer(1, 40))
+        
+        # Table of Contents
+        elements.append(Paragraph("Contents", self.styles['Heading2']))
+        rows = [[Paragraph(section, self.styles['Normal']), str(page)] for section, page in contents]
+        if rows:
+            table = Table(rows, colWidths=[doc.width - 60, 60])
+            table.setStyle(TableStyle([
+                ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+                ('LINEBELOW', (0, 0), (-1, -1), 0.25, colors.lightgrey),
+            ]))
+            elements.append(table)
+            
+        doc.build(elements)
+        self.buffer.seek(0)
+        return self.buffer
+
+
+def render_pdf_to_file(method, args, path):
+    """
+    Renders PDFGenerator.<method>(*args) straight into `path`. Top-level so it
+    can run in the worker process pool.
+    """
+    with open(path, "wb") as f:
+        getattr(PDFGenerator(output=f), method)(*args)
+
+
+def merge_pdf_files(paths, path):
+    """
+    Concatenates the PDFs in `paths` into `path` (pdfium copies the pages; no
+    re-layout). Runs in the worker process pool.
+    """
+    # Imported here: only book exports need pdfium, so render-only workers skip loading it
+    import pypdfium2 as pdfium
+    book = pdfium.PdfDocument.new()
+    try:
+        for source_path in paths:
+            source = pdfium.PdfDocument(source_path)
+            try:
+                book.import_pages(source)
+            finally:
+                source.close()
+        book.save(path)
+        return len(book)
+    finally:
+        book.close()
+
+
+def count_pdf_pages(path):
+    import pypdfium2 as pdfium
+    document = pdfium.PdfDocument(path)
+    try:
+        return len(document)
+    finally:
+        document.close()
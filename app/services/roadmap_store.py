@@ -0,0 +1,93 @@
+import json
+import hashlib
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from datetime import datetime
+from sqlalchemy import func
+from app.db.database import insert_ignore
+from app.models.user import Roadmap, RoadmapContent
+
+
+def content_hash(data: dict) -> str:
+    canonical = json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+async def save_roadmap(session: AsyncSession, user_id: int, topic: str, goal_description: str,
+                 duration: str, level: str, data: dict) -> Roadmap:
+    """
+    Stores a generated roadmap for the user. Identical plans share one
+    RoadmapContent row.
+    """
+    digest = content_hash(data)
+    # Coalesced identical requests finish (and save) together, so a
+    # get-then-add would race on the primary key
+    await session.execute(insert_ignore(
+        session.bind.dialect.name, RoadmapContent,
+        {"hash": digest, "data": data, "created_at": datetime.utcnow()}, index_elements=["hash"],
+    ))
+
+    roadmap = Roadmap(
+        title=topic,
+        goal_description=goal_description,
+        duration=duration,
+        level=level,
+        content_hash=digest,
+        user_id=user_id
+    )
+    session.add(roadmap)
+    await session.commit()
+    await session.refresh(roadmap)
+    return roadmap
+
+
+def roadmap_to_dict(roadmap: Roadmap, data: dict = None):
+    result = {
+        "id": roadmap.id,
+        "user_id": roadmap.user_id,
+        "title": roadmap.title,
+        "duration": roadmap.duration,
+        "level": roadmap.level,
+        "status": roadmap.status,
+        "created_at": roadmap.created_at.isoformat() if roadmap.created_at else None,
+    }
+    if data is not None:
+        result["data"] = data
+    return result
+
+
+def list_roadmaps(session: Session, user_id: int, limit: int = 20, offset: int = 0):
+    statement = (
+        select(Roadmap)
+        .where(Roadmap.user_id == user_id)
+        .order_by(Roadmap.id.desc())
+        .offset(offset)
+        .limit(limit)
+    )
+    items = [roadmap_to_dict(r) for r in session.exec(statement).all()]
+    total = session.exec(select(func.count()).select_from(Roadmap).where(Roadmap.user_id == user_id)).one()
+    return {"items": items, "total": total, "limit": limit, "offset": offset}
+
+
+def _roadmap_query(roadmap_id: int):
+    return (
+        select(Roadmap, RoadmapContent)
+        .join(RoadmapContent, Roadmap.content_hash == RoadmapContent.hash, isouter=True)
+        .where(Roadmap.id == roadmap_id)
+    )
+
+
+def _row_to_dict(row):
+    if row is None:
+        return None
+    roadmap, content = row
+    return roadmap_to_dict(roadmap, content.data if content else {})
+
+
+def get_roadmap(session: Session, roadmap_id: int):
+    """Roadmap metadata plus its weeks, in one query."""
+    return _row_to_dict(session.exec(_roadmap_query(roadmap_id)).first())
+
+
+async def get_roadmap_async(session: AsyncSession, roadmap_id: int):
+    return _row_to_dict((await session.exec(_roadmap_query(roadmap_id))).first())
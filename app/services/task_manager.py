@@ -1,13 +1,365 @@
-# Simple in-memory store for task status
-# Format: { "user_id": { "status": "processing", "step": "Architecting...", "progress": 20 } }
-task_status = {}
-
-def update_task(user_id, status, step, progress):
-    task_status[str(user_id)] = {
-        "status": status,
-        "step": step,
-        "progress": progress
+import os
+import time
+import uuid
+import threading
+import traceback
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from sqlalchemy import update
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.db.database import engine, async_engine
+from app.models.user import Job
+from app.core.llm import (
+    begin_llm_caller, current_llm_caller, finish_llm_caller, RequestCancelled, JOB_DEADLINE_SECONDS
+)
+
+load_dotenv()
+
+# Durable job queue backed by the app database.
+# Jobs are rows in the `job` table; a pool of worker threads in every uvicorn
+# process claims queued rows atomically, so any worker can pick up any job and
+# status survives restarts.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "2"))
+# Workers touch the jobs they are running every JOB_HEARTBEAT_SECONDS, and
+# every process sweeps for stale jobs every JOB_SWEEP_SECONDS. A job left
+# "processing" JOB_STALE_SECONDS without an update belonged to a dead worker.
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "30"))
+JOB_SWEEP_SECONDS = float(os.getenv("JOB_SWEEP_SECONDS", "60"))
+JOB_STALE_SECONDS = int(os.getenv("JOB_STALE_SECONDS", "300"))
+
+FINAL_STATES = ("completed", "error", "cancelled")
+
+_handlers = {}
+# Jobs running on this process's workers: job_id -> LLMCaller, so a cancel
+# stops their LLM calls right away instead of at the next update_task()
+_running_callers = {}
+
+
+class JobEventBroker:
+    """
+    In-process fan-out of job state changes to SSE subscribers.
+    Workers publish from their threads; subscribers consume on the event loop.
+    """
+
+    def __init__(self):
+        self._subscribers = {}  # job_id -> set of (loop, asyncio.Queue)
+        self._lock = threading.Lock()
+
+    def subscribe(self, job_id: int, loop, queue):
+        with self._lock:
+            self._subscribers.setdefault(job_id, set()).add((loop, queue))
+
+    def unsubscribe(self, job_id: int, loop, queue):
+        with self._lock:
+            subscribers = self._subscribers.get(job_id)
+            if subscribers:
+                subscribers.discard((loop, queue))
+                if not subscribers:
+                    del self._subscribers[job_id]
+
+    def publish(self, job: dict):
+        with self._lock:
+            subscribers = list(self._subscribers.get(job["id"], ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(queue.put_nowait, job)
+
+
+job_events = JobEventBroker()
+
+
+class JobCancelled(Exception):
+    """Raised inside a handler when the job was cancelled by the user."""
+
+
+class JobFailed(Exception):
+    """Raised by a handler for errors that retrying won't fix."""
+
+
+def register_job_handler(kind: str, handler):
+    """
+    handler(job_id, **payload) runs the job and returns a JSON-able result.
+    """
+    _handlers[kind] = handler
+
+
+def job_to_dict(job: Job):
+    return {
+        "id": job.id,
+        "user_id": job.user_id,
+        "kind": job.kind,
+        "status": job.status,
+        "step": job.step,
+        "progress": job.progress,
+        "result": job.result,
+        "error": job.error,
+        "attempts": job.attempts,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "updated_at": job.updated_at.isoformat() if job.updated_at else None,
     }
 
-def get_task(user_id):
-    return task_status.get(str(user_id), {"status": "idle", "progress": 0})
+
+def create_job(user_id: int, kind: str, payload: dict, max_attempts: int = JOB_MAX_ATTEMPTS):
+    with Session(engine) as session:
+        job = Job(user_id=user_id, kind=kind, payload=payload, max_attempts=max_attempts)
+        session.add(job)
+        session.commit()
+        session.refresh(job)
+        return job_to_dict(job)
+
+
+async def create_job_async(user_id: int, kind: str, payload: dict, max_attempts: int = JOB_MAX_ATTEMPTS):
+    """create_job() for async routes."""
+    async with AsyncSession(async_engine) as session:
+        job = Job(user_id=user_id, kind=kind, payload=payload, max_attempts=max_attempts)
+        session.add(job)
+        await session.commit()
+        await session.refresh(job)
+        return job_to_dict(job)
+
+
+def get_job(job_id: int):
+    with Session(engine) as session:
+        job = session.get(Job, job_id)
+        return job_to_dict(job) if job else None
+
+
+async def get_job_async(job_id: int):
+    async with AsyncSession(async_engine) as session:
+        job = await session.get(Job, job_id)
+        return job_to_dict(job) if job else None
+
+
+def get_job_owner(job_id: int):
+    with Session(engine) as session:
+        job = session.get(Job, job_id)
+        return job.user_id if job else None
+
+
+def list_jobs(user_id: int, limit: int = 20, kind: str = None):
+    with Session(engine) as session:
+        statement = select(Job).where(Job.user_id == user_id)
+        if kind:
+            statement = statement.where(Job.kind == kind)
+        statement = statement.order_by(Job.id.desc()).limit(limit)
+        return [job_to_dict(job) for job in session.exec(statement).all()]
+
+
+def update_task(job_id, status, step, progress):
+    """
+    Records progress for a running job. Raises JobCancelled if the user
+    cancelled it, so handlers stop at their next checkpoint.
+    """
+    with Session(engine) as session:
+        job = session.get(Job, int(job_id))
+        if not job:
+            return
+        if job.cancel_requested:
+            caller = current_llm_caller()
+            if caller:
+                caller.cancel("cancelled")
+            raise JobCancelled()
+        job.status = status
+        job.step = step
+        job.progress = progress
+        job.updated_at = datetime.utcnow()
+        session.add(job)
+        session.commit()
+        session.refresh(job)
+        job_events.publish(job_to_dict(job))
+
+
+def cancel_job(job_id: int):
+    with Session(engine) as session:
+        job = session.get(Job, job_id)
+        if not job:
+            return None
+        if job.status == "queued":
+            # Not started yet: cancel right away
+            job.status = "cancelled"
+            job.step = "Cancelled"
+            job.finished_at = datetime.utcnow()
+        elif job.status == "processing":
+            # Running: the handler stops at its next update_task() or LLM call
+            job.cancel_requested = True
+            caller = _running_callers.get(job_id)
+            if caller:
+                caller.cancel("cancelled")
+        job.updated_at = datetime.utcnow()
+        session.add(job)
+        session.commit()
+        session.refresh(job)
+        job_events.publish(job_to_dict(job))
+        return job_to_dict(job)
+
+
+def _finish(job_id: int, **fields):
+    with Session(engine) as session:
+        job = session.get(Job, job_id)
+        for name, value in fields.items():
+            setattr(job, name, value)
+        job.updated_at = datetime.utcnow()
+        session.add(job)
+        session.commit()
+        session.refresh(job)
+        job_events.publish(job_to_dict(job))
+
+
+def _claim_next(worker_id: str):
+    """
+    Atomically moves the oldest queued job to "processing" for this worker.
+    """
+    with Session(engine) as session:
+        candidates = session.exec(
+            select(Job.id).where(Job.status == "queued").order_by(Job.id).limit(5)
+        ).all()
+        for job_id in candidates:
+            now = datetime.utcnow()
+            claimed = session.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status == "queued")
+                .values(status="processing", worker_id=worker_id, attempts=Job.attempts + 1,
+                        started_at=now, updated_at=now, step="Starting...")
+            )
+            session.commit()
+            # Another worker may have claimed it between the select and the update
+            if claimed.rowcount == 1:
+                return session.get(Job, job_id)
+    return None
+
+
+def _run_job(job: Job):
+    handler = _handlers.get(job.kind)
+    if handler is None:
+        _finish(job.id, status="error", error=f"No handler for job kind '{job.kind}'", finished_at=datetime.utcnow())
+        return
+
+    # Jobs draw on the admin key at background priority, within JOB_DEADLINE_SECONDS
+    caller = begin_llm_caller(job.user_id, "background", budget=JOB_DEADLINE_SECONDS)
+    _running_callers[job.id] = caller
+    try:
+        result = handler(job.id, **job.payload)
+        if isinstance(result, dict):
+            result["llm_queue_wait_ms"] = round(caller.queue_wait * 1000)
+    except JobCancelled:
+        _finish(job.id, status="cancelled", step="Cancelled", finished_at=datetime.utcnow())
+    except Exception as e:
+        traceback.print_exc()
+        if caller.cancelled == "cancelled":
+            # Handlers may wrap the RequestCancelled of a stopped LLM call
+            _finish(job.id, status="cancelled", step="Cancelled", finished_at=datetime.utcnow())
+        elif isinstance(e, (JobFailed, RequestCancelled)) or caller.cancelled or job.attempts >= job.max_attempts:
+            # Not worth retrying: JobFailed, a spent deadline or out of attempts
+            _finish(job.id, status="error", step=f"❌ Error: {str(e)}", progress=0, error=str(e),
+                    finished_at=datetime.utcnow())
+        else:
+            # Put it back for another attempt (possibly on another worker)
+            _finish(job.id, status="queued", step=f"Retrying after error: {str(e)}", progress=0,
+                    error=str(e), worker_id=None)
+    else:
+        _finish(job.id, status="completed", progress=100, result=result, error=None,
+                finished_at=datetime.utcnow())
+    finally:
+        _running_callers.pop(job.id, None)
+        finish_llm_caller(caller)
+
+
+def heartbeat_running_jobs():
+    """Marks the jobs running on this process as alive, so no sweep requeues them."""
+    job_ids = list(_running_callers)
+    if not job_ids:
+        return
+    with Session(engine) as session:
+        session.execute(
+            update(Job)
+            .where(Job.id.in_(job_ids), Job.status == "processing")
+            .values(updated_at=datetime.utcnow())
+        )
+        session.commit()
+
+
+def requeue_stale_jobs():
+    """
+    Jobs stuck in "processing" past JOB_STALE_SECONDS lost their worker
+    (restart/crash); queue them again, or fail them if out of attempts.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=JOB_STALE_SECONDS)
+    stale = (Job.status == "processing", Job.updated_at < cutoff)
+    with Session(engine) as session:
+        session.execute(
+            update(Job)
+            .where(*stale, Job.attempts >= Job.max_attempts)
+            .values(status="error", worker_id=None, step="❌ Error: worker lost", error="Worker lost",
+                    finished_at=datetime.utcnow())
+        )
+        session.execute(
+            update(Job)
+            .where(*stale)
+            .values(status="queued", worker_id=None, step="Re-queued after worker loss")
+        )
+        session.commit()
+
+
+class JobWorkerPool:
+    def __init__(self, size: int = JOB_WORKERS, poll_interval: float = JOB_POLL_INTERVAL,
+                 heartbeat_interval: float = JOB_HEARTBEAT_SECONDS, sweep_interval: float = JOB_SWEEP_SECONDS):
+        self.size = size
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.sweep_interval = sweep_interval
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._threads = []
+
+    def start(self):
+        requeue_stale_jobs()
+        for i in range(self.size):
+            worker_id = f"{os.getpid()}-{i}-{uuid.uuid4().hex[:6]}"
+            thread = threading.Thread(target=self._loop, args=(worker_id,), name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        thread = threading.Thread(target=self._maintain, name="job-heartbeat", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+
+    def notify(self):
+        """Wakes idle workers right away instead of at the next poll."""
+        self._wakeup.set()
+
+    def _loop(self, worker_id: str):
+        while not self._stop.is_set():
+            try:
+                job = _claim_next(worker_id)
+            except Exception:
+                traceback.print_exc()
+                job = None
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            _run_job(job)
+
+    def _maintain(self):
+        # Heartbeats keep this process's long steps (book sections, the
+        # architect stage) from looking stale; sweeps catch other processes' losses
+        next_sweep = time.monotonic() + self.sweep_interval
+        while not self._stop.wait(self.heartbeat_interval):
+            try:
+                heartbeat_running_jobs()
+                if time.monotonic() >= next_sweep:
+                    requeue_stale_jobs()
+                    next_sweep = time.monotonic() + self.sweep_interval
+            except Exception:
+                traceback.print_exc()
+
+
+job_workers = JobWorkerPool()
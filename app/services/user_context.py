@@ -0,0 +1,127 @@
+import os
+import json
+import threading
+from dataclasses import dataclass, field
+from typing import Optional
+from cachetools import TTLCache
+from dotenv import load_dotenv
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.db.database import engine, async_engine
+from app.models.user import User
+from app.core.llm import get_llm, set_llm_caller
+
+load_dotenv()
+
+# Every generation route needs the same few things from the User row: which
+# model/key to call and the profile rendered into prompt snippets. They are
+# built once per user and kept in a per-process TTL LRU. Writes through
+# /save-survey and /user/update-keys invalidate the entry in this process and
+# bump User.profile_version; other workers notice the newer version in the
+# caller's session token (or pick the change up within the TTL).
+USER_CONTEXT_CACHE_SIZE = int(os.getenv("USER_CONTEXT_CACHE_SIZE", "1024"))
+USER_CONTEXT_TTL_SECONDS = int(os.getenv("USER_CONTEXT_TTL_SECONDS", "300"))
+
+
+@dataclass(frozen=True)
+class UserContext:
+    user_id: int
+    preferred_model: str
+    gemini_api_key: Optional[str] = field(default=None, repr=False)
+    profile_version: int = 0
+
+    # Profile rendered for each crew's prompt
+    style_note: str = ""                            # chapter
+    roadmap_context: str = ""                       # roadmap
+    assessment_context: str = "General Learner"     # assessment, book quizzes
+    project_context: str = ""                       # project builder
+    expertise: str = "Intermediate"                 # debugger
+
+    def llm(self, stream: bool = False):
+        """
+        Pooled LLM for this user's model preference and key (ValueError if the
+        key is missing). The request's calls count towards this user's fair
+        share of the admin key, at interactive priority.
+        """
+        set_llm_caller(self.user_id, "interactive")
+        return get_llm(self.preferred_model, self.gemini_api_key, stream=stream)
+
+
+def build_user_context(user: User) -> UserContext:
+    p = user.profile_data
+    if isinstance(p, str):
+        try: p = json.loads(p)
+        except: pass
+    version = user.profile_version or 0
+    if not isinstance(p, dict):
+        return UserContext(user.id, user.preferred_model, user.gemini_api_key, version)
+
+    return UserContext(
+        user.id,
+        user.preferred_model,
+        user.gemini_api_key,
+        version,
+        style_note=f" (User prefers {p.get('learning_style')})",
+        roadmap_context=(
+            f" (Context: User has {p.get('daily_time')} daily. "
+            f"Goal: {p.get('career_goal')}. Style: {p.get('learning_style')})"
+        ),
+        assessment_context=f"Skill Level: {p.get('current_skill')}. Learning Style: {p.get('learning_style')}.",
+        project_context=f"User Skill: {p.get('current_skill')}. Style: {p.get('learning_style')}.",
+        expertise=p.get('current_skill', 'Intermediate'),
+    )
+
+
+class UserContextCache:
+    def __init__(self, maxsize=USER_CONTEXT_CACHE_SIZE, ttl=USER_CONTEXT_TTL_SECONDS):
+        self._items = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def _lookup(self, user_id: int, version: Optional[int]):
+        with self._lock:
+            context = self._items.get(user_id)
+            if context is not None and version is not None and context.profile_version < version:
+                context = None  # Changed through another worker
+            self.stats["hits" if context is not None else "misses"] += 1
+            return context
+
+    def _store(self, user: Optional[User]):
+        # Unknown users aren't cached, so a fresh signup is visible right away
+        if user is None:
+            return None
+        context = build_user_context(user)
+        with self._lock:
+            self._items[user.id] = context
+        return context
+
+    def get(self, user_id: int, version: int = None) -> Optional[UserContext]:
+        """version: the caller's known profile version (session token); newer forces a reload."""
+        context = self._lookup(user_id, version)
+        if context is not None:
+            return context
+        with Session(engine) as session:
+            return self._store(session.get(User, user_id))
+
+    async def get_async(self, user_id: int, version: int = None) -> Optional[UserContext]:
+        context = self._lookup(user_id, version)
+        if context is not None:
+            return context
+        async with AsyncSession(async_engine) as session:
+            return self._store(await session.get(User, user_id))
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._items.pop(user_id, None)
+            self.stats["invalidations"] += 1
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["items"] = len(self._items)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        return stats
+
+
+user_contexts = UserContextCache()
@@ -0,0 +1,90 @@
+"""
+Per-request cost of session-token auth: verifying the access token (JWT
+signature + deny-list lookup) on its own, and GET /api/v1/user-scores/{id}
+end to end with and without a Bearer token (AUTH_REQUIRED off, so the
+anonymous call is the no-auth baseline). An Argon2 password check, what
+every authenticated call would cost if it re-ran /login, is shown for scale.
+
+    python -m benchmarks.auth_overhead --requests 2000
+"""
+import os
+import tempfile
+
+# Before the app modules read them: a throwaway database and deny list
+_scratch = tempfile.mkdtemp(prefix="auth-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_scratch, 'bench.db')}"
+os.environ["CACHE_DIR"] = os.path.join(_scratch, "cache")
+os.environ.setdefault("JWT_SECRET", "benchmark")
+os.environ["AUTH_REQUIRED"] = "false"
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+import jwt
+from sqlmodel import Session
+
+import app.models.user  # registers the tables
+from app.db.database import engine, init_db
+from app.main import app
+from app.models.user import User
+from app.core.passwords import get_password_hash, verify_password
+from app.services.auth import create_token_pair, decode_token, deny_list, JWT_SECRET, JWT_ALGORITHM
+
+
+def per_call_us(func, rounds):
+    func()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+async def route_ms(path, variants, rounds):
+    # Interleaved, so drift (warm-up, GC, the OS) hits every variant alike.
+    # In-process ASGI transport: no lifespan, the tables already exist.
+    timings = {label: [] for label in variants}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        await client.get(path)
+        for _ in range(rounds):
+            for label, headers in variants.items():
+                start = time.perf_counter()
+                resp = await client.get(path, headers=headers)
+                timings[label].append((time.perf_counter() - start) * 1000)
+                resp.raise_for_status()
+    return {label: statistics.median(values) for label, values in timings.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    init_db()
+    with Session(engine) as session:
+        user = User(email="bench@example.com", full_name="Bench", hashed_password=get_password_hash("secret"))
+        session.add(user)
+        session.commit()
+        session.refresh(user)
+    token = create_token_pair(user)["access_token"]
+    claims = decode_token(token, "access")
+
+    print("token verification (per call):")
+    print(f"  jwt.decode (HS256)          {per_call_us(lambda: jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM]), args.requests):8.1f} us")
+    print(f"  deny-list lookup            {per_call_us(lambda: deny_list.is_revoked(claims['jti']), args.requests):8.1f} us")
+    print(f"  decode_token (both)         {per_call_us(lambda: decode_token(token, 'access'), args.requests):8.1f} us")
+    print(f"  Argon2 verify (for scale)   {per_call_us(lambda: verify_password('secret', user.hashed_password), 20):8.1f} us")
+
+    path = f"/api/v1/user-scores/{user.id}"
+    variants = {"anonymous": {}, "bearer": {"Authorization": f"Bearer {token}"}}
+    medians = asyncio.run(route_ms(path, variants, args.requests))
+    anonymous, authenticated = medians["anonymous"], medians["bearer"]
+    print(f"GET {path} (median of {args.requests}):")
+    print(f"  no token                    {anonymous:8.2f} ms")
+    print(f"  Bearer token                {authenticated:8.2f} ms   (+{(authenticated - anonymous) * 1000:.0f} us)")
+
+
+if __name__ == "__main__":
+    main()
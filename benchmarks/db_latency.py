@@ -0,0 +1,131 @@
+"""
+Database latency in async handlers, sync Session (on the event loop, as the
+routes used to do) against AsyncSession, under mixed load: concurrent
+handlers that each read a user, read an artifact and save an artifact, while
+background threads (standing in for job workers and sync routes) keep
+writing. A 1 ms ticker on the loop measures how long the loop stalls; that
+is the latency every other request on the worker sees.
+
+    python -m benchmarks.db_latency --handlers 400 --concurrency 50
+"""
+import os
+import tempfile
+
+# Before the app modules read it: a throwaway file database
+_scratch = tempfile.mkdtemp(prefix="db-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_scratch, 'bench.db')}"
+
+import argparse
+import asyncio
+import statistics
+import threading
+import time
+
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+import app.models.user  # registers the tables
+from app.db.database import engine, async_engine, init_db
+from app.models.user import User
+from app.services.artifacts import save_artifact, save_artifact_async, get_artifact, get_artifact_async
+
+USERS = 50
+
+
+def seed():
+    init_db()
+    with Session(engine) as session:
+        session.add_all(User(email=f"bench{i}@example.com", full_name=f"Bench {i}", hashed_password="x")
+                        for i in range(USERS))
+        session.commit()
+    return save_artifact(1, "chapter", "Seed", {"content": "x" * 2000})
+
+
+async def handler_sync(i, artifact_id):
+    # What the async routes did before: blocking DB calls on the loop thread
+    with Session(engine) as session:
+        session.get(User, i % USERS + 1)
+    get_artifact(artifact_id)
+    save_artifact(i % USERS + 1, "chapter", f"Sync {i}", {"content": f"chapter {i}"})
+
+
+async def handler_async(i, artifact_id):
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        await session.get(User, i % USERS + 1)
+    await get_artifact_async(artifact_id)
+    await save_artifact_async(i % USERS + 1, "chapter", f"Async {i}", {"content": f"chapter {i}"})
+
+
+def background_writer(stop: threading.Event, label: str, counter: list):
+    n = 0
+    while not stop.is_set():
+        save_artifact(n % USERS + 1, "project", f"{label} job {threading.get_ident()} {n}", {"files": n})
+        n += 1
+        time.sleep(0.005)
+    counter.append(n)
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+async def run(handler, label, handlers, concurrency, writers, artifact_id):
+    stop, written = threading.Event(), []
+    threads = [threading.Thread(target=background_writer, args=(stop, label, written)) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+
+    lags, ticking = [], True
+
+    async def ticker():
+        while ticking:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append((time.perf_counter() - start - 0.001) * 1000)
+
+    gate = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i):
+        async with gate:
+            await handler(i, artifact_id)
+        # All requests arrive in one burst; this includes waiting for the loop
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    tick = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(handlers)))
+    total = time.perf_counter() - start
+    ticking = False
+    await tick
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    print(f"  {label:26} total {total:5.2f} s   request p50 {statistics.median(latencies):7.1f} ms  "
+          f"p95 {percentile(latencies, 0.95):7.1f} ms   loop lag p50 {statistics.median(lags):6.1f} ms  "
+          f"p99 {percentile(lags, 0.99):6.1f} ms  max {max(lags):6.1f} ms   background writes {sum(written)}")
+
+
+async def main_async(args, artifact_id):
+    for handler, label in ((handler_sync, "sync Session on the loop"), (handler_async, "AsyncSession")):
+        await run(handler, label, args.handlers, args.concurrency, args.writers, artifact_id)
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--handlers", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--writers", type=int, default=4, help="background writer threads")
+    args = parser.parse_args()
+
+    artifact_id = seed()
+    print(f"{args.handlers} handlers (get user, get artifact, save artifact) at concurrency {args.concurrency}, "
+          f"{args.writers} background writers, file SQLite")
+    asyncio.run(main_async(args, artifact_id))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Fast vs quality generation mode: latency, tokens and parse success of the
+roadmap and assessment crews on a fixed set of topics. Calls the real
+provider with the admin key (GEMINI_API_KEY / PERPLEXITY_API_KEY), with the
+response, semantic and checkpoint caches off so every run is a fresh
+generation.
+
+    python -m benchmarks.generation_modes --rounds 2
+"""
+import os
+
+# Before the app modules read them
+os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+os.environ["SEMANTIC_CACHE_ENABLED"] = "false"
+os.environ["CREW_CHECKPOINTS_ENABLED"] = "false"
+
+import argparse
+import statistics
+import time
+
+from app.agents.assessment_crew import AssessmentCrew
+from app.agents.roadmap_crew import RoadmapCrew
+from app.core.llm import get_llm
+from app.core.structured import get_parse_stats
+
+# (topic, duration, level); the assessments use the topic and level
+TOPICS = [
+    ("Python Lists", "4 weeks", "Beginner"),
+    ("Recursion in C", "2 weeks", "Intermediate"),
+    ("SQL Joins", "3 weeks", "Beginner"),
+    ("React Hooks", "4 weeks", "Intermediate"),
+    ("Linear Regression", "6 weeks", "Advanced"),
+    ("Git Branching", "1 week", "Beginner"),
+    ("Docker Networking", "3 weeks", "Intermediate"),
+    ("Graph Algorithms", "8 weeks", "Advanced"),
+]
+MODES = ("quality", "fast")
+
+
+def _tokens(llm) -> int:
+    try:
+        return int(llm.get_token_usage_summary().total_tokens)
+    except Exception:
+        return 0
+
+
+def _parse_counts(kind: str) -> dict:
+    counts = get_parse_stats().get(kind, {})
+    return {outcome: counts.get(outcome, 0) for outcome in ("ok", "repaired", "failed", "regenerated")}
+
+
+def run(llm, crew: str, mode: str, rounds: int):
+    kind = crew + ("_fast" if mode == "fast" else "")  # cached_kickoff crew_type
+    before = _parse_counts(kind)
+    latencies, tokens, succeeded = [], [], 0
+    for _ in range(rounds):
+        for topic, duration, level in TOPICS:
+            used = _tokens(llm)
+            start = time.perf_counter()
+            try:
+                if crew == "roadmap":
+                    RoadmapCrew(llm).create_roadmap(topic, duration, level, use_semantic_cache=False, mode=mode)
+                else:
+                    AssessmentCrew(llm).create_assessment(topic, "quiz", f"{level} student", use_semantic_cache=False, mode=mode)
+                succeeded += 1
+            except Exception as e:
+                print(f"  ⚠️ {crew}/{mode} '{topic}' failed: {type(e).__name__}: {str(e).splitlines()[0]}")
+            latencies.append(time.perf_counter() - start)
+            tokens.append(_tokens(llm) - used)
+    after = _parse_counts(kind)
+    parsed = {outcome: after[outcome] - before[outcome] for outcome in after}
+    return {
+        "runs": len(latencies),
+        "succeeded": succeeded,
+        "median_s": statistics.median(latencies),
+        "p95_s": sorted(latencies)[max(0, int(len(latencies) * 0.95) - 1)],
+        "tokens": statistics.mean(tokens),
+        **parsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--provider", default="gemini", choices=["gemini", "perplexity"])
+    parser.add_argument("--rounds", type=int, default=1, help="passes over the topic list per mode")
+    parser.add_argument("--crew", choices=["roadmap", "assessment"], action="append",
+                        help="crews to run (default: both)")
+    args = parser.parse_args()
+
+    try:
+        llm = get_llm(args.provider)
+    except ValueError as e:
+        raise SystemExit(f"{e} (set the admin key in the environment or .env)")
+
+    print(f"{len(TOPICS)} topics x {args.rounds} round(s), model {getattr(llm, 'model', '?')}")
+    print(f"{'crew':11} {'mode':8} {'success':>9} {'median s':>9} {'p95 s':>7} {'tokens':>8} "
+          f"{'parsed ok':>10} {'repaired':>9} {'re-run':>7}")
+    for crew in args.crew or ["roadmap", "assessment"]:
+        for mode in MODES:
+            r = run(llm, crew, mode, args.rounds)
+            print(f"{crew:11} {mode:8} {r['succeeded']:>4}/{r['runs']:<4} {r['median_s']:9.1f} {r['p95_s']:7.1f} "
+                  f"{r['tokens']:8.0f} {r['ok']:>10} {r['repaired']:>9} {r['regenerated']:>7}")
+
+
+if __name__ == "__main__":
+    main()
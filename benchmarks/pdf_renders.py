@@ -0,0 +1,126 @@
+"""
+Throughput and peak memory of concurrent chapter PDF renders: N distinct
+~30-page chapters requested at once from POST /api/v1/chapter/download-pdf
+(worker process pool, spooled to the PDF cache on disk), against rendering
+into a BytesIO on the render threads as the route did before.
+
+Peak RSS is sampled from /proc for this process plus its worker processes
+(Linux only).
+
+    python -m benchmarks.pdf_renders --renders 50
+"""
+import os
+import tempfile
+
+# Before the app modules read them: no auth, a throwaway PDF cache, and
+# queues long enough that every render waits for a worker instead of a 503
+os.environ.setdefault("JWT_SECRET", "benchmark")
+os.environ["AUTH_REQUIRED"] = "false"
+os.environ["CACHE_DIR"] = tempfile.mkdtemp(prefix="pdf-bench-")
+os.environ.setdefault("RENDER_QUEUE_LIMIT", "1000")
+os.environ.setdefault("CPU_QUEUE_LIMIT", "1000")
+
+import argparse
+import asyncio
+import io
+import threading
+import time
+
+import httpx
+
+from app.core.executor import run_render, warm_up_process_pool, shutdown_process_pool, CPU_PROCESSES, RENDER_WORKERS
+from app.main import app
+from app.services.pdf_generator import PDFGenerator
+from benchmarks.chapter_pdf import make_chapter
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+def _rss(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (FileNotFoundError, ProcessLookupError):
+        return 0
+
+
+def _children(pid: int):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            pids = [int(p) for p in f.read().split()]
+    except FileNotFoundError:
+        return []
+    return pids + [grandchild for child in pids for grandchild in _children(child)]
+
+
+class PeakRSS:
+    """Samples the RSS of this process tree in a background thread."""
+
+    def __init__(self, interval: float = 0.02):
+        self.interval = interval
+        self.peak = 0
+        self._done = threading.Event()
+
+    def _run(self):
+        pid = os.getpid()
+        while not self._done.is_set():
+            self.peak = max(self.peak, _rss(pid) + sum(_rss(child) for child in _children(pid)))
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._done.set()
+        self._thread.join()
+
+
+async def render_via_route(chapters):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def one(topic, content):
+            resp = await client.post("/api/v1/chapter/download-pdf", json={"topic": topic, "content": content})
+            resp.raise_for_status()
+            return len(resp.content)
+        return await asyncio.gather(*(one(topic, content) for topic, content in chapters))
+
+
+async def render_in_threads(chapters):
+    def one(topic, content):
+        return len(PDFGenerator(output=io.BytesIO()).generate_chapter_pdf(topic, content).getvalue())
+    return await asyncio.gather(*(run_render(one, topic, content) for topic, content in chapters))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--renders", type=int, default=50)
+    parser.add_argument("--words", type=int, default=14000, help="~30 pages")
+    args = parser.parse_args()
+
+    content = make_chapter(args.words)
+    pages = PDFGenerator(output=io.BytesIO()).generate_chapter_pdf("Sample", content).getvalue().count(b"/Type /Page\n")
+    # Distinct topics, so no request is served from the PDF cache
+    chapters = [(f"Chapter {i}", content) for i in range(args.renders)]
+    print(f"{args.renders} concurrent renders of a {pages}-page chapter "
+          f"({CPU_PROCESSES} worker processes, {RENDER_WORKERS} render threads)")
+
+    warm_up_process_pool()
+    idle = _rss(os.getpid()) + sum(_rss(child) for child in _children(os.getpid()))
+    print(f"  idle (app + worker processes)   RSS {idle / 2**20:7.0f} MiB")
+    try:
+        for label, render in (("render threads, BytesIO", render_in_threads),
+                              ("process pool, spooled", render_via_route)):
+            with PeakRSS() as rss:
+                start = time.perf_counter()
+                sizes = asyncio.run(render(chapters))
+                elapsed = time.perf_counter() - start
+            print(f"  {label:24} {elapsed:6.1f} s   {len(sizes) / elapsed:5.2f} renders/s   "
+                  f"peak RSS {rss.peak / 2**20:7.0f} MiB")
+    finally:
+        shutdown_process_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Semantic cache lookup latency at a large index size.
+
+Fills a throwaway index with N entries (random unit vectors spread over
+1,000 user contexts, so filling 100k entries doesn't mean embedding 100k
+texts) plus a few real requests, then times SemanticCache.lookup(), which
+embeds the query with the ONNX model, searches the HNSW index and checks
+the same filters the crews use.
+
+    python -m benchmarks.semantic_cache_lookup --entries 100000
+"""
+import argparse
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from app.core.semantic_cache import SemanticCache
+
+DIMENSIONS = 384  # all-MiniLM-L6-v2
+BATCH = 5000      # below chromadb's max batch size
+
+TOPICS = ["Python Lists", "Recursion in C", "SQL Joins", "React Hooks", "Linear Regression"]
+QUERIES = ["python lists basics", "Lists in Python", "recursive functions in C",
+           "joining tables in SQL", "Kubernetes networking"]
+FILTERS = {"duration": "4 weeks", "level": "Beginner", "user_context": "", "model": "bench", "prompt_version": "bench"}
+
+
+def fill(cache: SemanticCache, entries: int):
+    collection = cache._get_collection("roadmap")
+    rng = np.random.default_rng(0)
+    start = time.perf_counter()
+    for offset in range(0, entries, BATCH):
+        size = min(BATCH, entries - offset)
+        vectors = rng.standard_normal((size, DIMENSIONS)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        collection.add(
+            ids=[f"filler-{offset + i}" for i in range(size)],
+            embeddings=vectors,
+            metadatas=[dict(FILTERS, user_context=f"user-{(offset + i) % 1000}", response_key=f"filler-{offset + i}")
+                       for i in range(size)],
+        )
+    for topic in TOPICS:
+        cache.add("roadmap", topic, f"key-{topic}", FILTERS)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--rounds", type=int, default=20, help="lookups per query")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache = SemanticCache(directory=directory)
+        cache.warm_up()
+        if cache.stats["errors"]:
+            raise SystemExit("embedding model unavailable (set SEMANTIC_MODEL_DIR or allow the download)")
+        fill_seconds = fill(cache, args.entries)
+        print(f"indexed {args.entries + len(TOPICS):,} entries in {fill_seconds:.1f}s")
+
+        cache.lookup("roadmap", "warm-up", FILTERS)
+        timings = []
+        for query in QUERIES:
+            for _ in range(args.rounds):
+                start = time.perf_counter()
+                hit = cache.lookup("roadmap", query, FILTERS)
+                timings.append((time.perf_counter() - start) * 1000)
+            print(f"  {query!r:32} -> {hit}")
+
+        timings.sort()
+        print(f"lookup latency over {len(timings)} lookups: "
+              f"median {statistics.median(timings):.2f} ms, "
+              f"p95 {timings[int(len(timings) * 0.95) - 1]:.2f} ms, max {timings[-1]:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
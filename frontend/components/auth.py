@@ -159,7 +159,10 @@ def render_auth_page():
                                         "id": user_data["user_id"],
                                         "name": user_data["name"],
                                         "email": user_data["email"],
-                                        "profile_data": user_data.get("profile_data") 
+                                        "profile_data": user_data.get("profile_data"),
+                                        # Sent as "Authorization: Bearer" by frontend.utils.api
+                                        "access_token": user_data.get("access_token"),
+                                        "refresh_token": user_data.get("refresh_token")
                                     }
                                     
                                     st.toast(f"Welcome back, {user_data['name']}!", icon="🚀")
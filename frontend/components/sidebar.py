@@ -1,5 +1,6 @@
 import streamlit as st
 from streamlit_option_menu import option_menu
+from frontend.utils.api import logout_api
 
 def render_sidebar():
     # --- SAFETY CHECK ---
@@ -127,6 +128,8 @@ def render_sidebar():
         st.markdown("<div style='margin-top: 50px;'></div>", unsafe_allow_html=True)
         
         if st.button("Logout", key="logout_btn", type="secondary"): 
+            # Revoke the session tokens server-side
+            logout_api()
             st.session_state['user'] = None
             # Clear all session data
             st.session_state.clear() 
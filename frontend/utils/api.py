@@ -1,9 +1,15 @@
 import requests
+import json
+import streamlit as st
 
 # Base URL for the FastAPI Backend
 # If running via Docker, this might need to be the container name
 API_BASE_URL = "http://127.0.0.1:8000/api/v1" 
 
+# How long to wait for a synchronous generation (assessments, ...). Matches
+# the backend's REQUEST_DEADLINE_SECONDS: quality mode can take minutes.
+GENERATION_TIMEOUT = 180
+
 # Separate base for OAuth, as it might not be under /api/v1 depending on main.py
 API_ROOT_URL = "http://127.0.0.1:8000"
 
@@ -34,3 +40,89 @@ def signup_api(email, password, fullname):
         return False
     except: 
         return False
+
+# --- SESSION TOKENS ---
+
+def save_tokens(data):
+    """
+    Stores the access/refresh tokens from a /login, /token/refresh,
+    /save-survey or /user/update-keys response in the session.
+    """
+    user = st.session_state.get('user')
+    if user is not None and data.get("access_token"):
+        user["access_token"] = data["access_token"]
+        user["refresh_token"] = data.get("refresh_token", user.get("refresh_token"))
+
+def auth_headers():
+    user = st.session_state.get('user') or {}
+    token = user.get("access_token")
+    return {"Authorization": f"Bearer {token}"} if token else {}
+
+def refresh_session():
+    """
+    Swaps the refresh token for a new pair. False if the session is over.
+    """
+    user = st.session_state.get('user') or {}
+    if not user.get("refresh_token"):
+        return False
+    try:
+        resp = requests.post(f"{API_BASE_URL}/token/refresh", json={"refresh_token": user["refresh_token"]}, timeout=5)
+    except requests.exceptions.RequestException:
+        return False
+    if resp.status_code != 200:
+        return False
+    save_tokens(resp.json())
+    return True
+
+def logout_api():
+    user = st.session_state.get('user') or {}
+    if not user.get("refresh_token"):
+        return
+    try:
+        requests.post(f"{API_BASE_URL}/logout", json={"refresh_token": user["refresh_token"]},
+                      headers=auth_headers(), timeout=5)
+    except requests.exceptions.RequestException:
+        pass
+
+def api_request(method, path, base_url=API_BASE_URL, **kwargs):
+    """
+    requests.request() against the backend as the logged-in user. An expired
+    access token is refreshed and the call retried once. If we stop waiting
+    (timeout), the backend sees the disconnect and stops generating.
+    """
+    resp = requests.request(method, f"{base_url}{path}", headers=auth_headers(), **kwargs)
+    if resp.status_code == 401 and refresh_session():
+        resp.close()
+        resp = requests.request(method, f"{base_url}{path}", headers=auth_headers(), **kwargs)
+    return resp
+
+def api_get(path, **kwargs):
+    return api_request("GET", path, **kwargs)
+
+def api_post(path, **kwargs):
+    return api_request("POST", path, **kwargs)
+
+def stream_events(path, payload=None, timeout=120, method="POST"):
+    """
+    Calls a Server-Sent Events endpoint and yields (event, data) pairs as they arrive.
+    """
+    resp = api_request(method, path, json=payload, stream=True, timeout=timeout)
+    with resp:
+        if resp.status_code != 200:
+            yield "error", {"detail": resp.text, "status_code": resp.status_code}
+            return
+
+        event, data_lines = "message", []
+        for line in resp.iter_lines(decode_unicode=True):
+            if line is None:
+                continue
+            if line == "":
+                # Blank line terminates an event
+                if data_lines:
+                    yield event, json.loads("\n".join(data_lines))
+                event, data_lines = "message", []
+            elif line.startswith("event:"):
+                event = line[len("event:"):].strip()
+            elif line.startswith("data:"):
+                data_lines.append(line[len("data:"):].lstrip())
+            # Lines starting with ":" are keep-alive pings
@@ -1,5 +1,6 @@
 import json
 import re
+import json_repair
 import os
 
 def extract_json(text_response):
@@ -9,8 +10,8 @@ def extract_json(text_response):
     if not text_response:
         return None
 
-    # 1. Try to find JSON inside markdown code blocks ``````
-    code_block_pattern = r"``````"
+    # 1. Try to find JSON inside markdown code blocks (```json ... ```)
+    code_block_pattern = r"```(?:json)?\s*(.*?)```"
     match = re.search(code_block_pattern, text_response, re.DOTALL)
     
     if match:
@@ -32,8 +33,15 @@ def extract_json(text_response):
             # simple cleanup for trailing commas before closing braces
             cleaned = re.sub(r",\s*([\]}])", r"\1", json_str)
             return json.loads(cleaned)
-        except:
-            return None
+        except json.JSONDecodeError:
+            pass
+
+    # 4. Repair pass (unescaped quotes, missing brackets, truncated output)
+    try:
+        repaired = json_repair.loads(json_str)
+        return repaired if isinstance(repaired, (dict, list)) and repaired else None
+    except Exception:
+        return None
 
 def get_projects(projects_dir, user_id):
     """
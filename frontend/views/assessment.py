@@ -1,7 +1,18 @@
 import streamlit as st
-import requests
 import pandas as pd
-from frontend.utils.api import API_BASE_URL
+from frontend.utils.api import api_get, api_post, GENERATION_TIMEOUT
+
+def _download_assessment_pdf(assessment, payload):
+    """
+    Renders the PDF from the stored quiz when it has an ID; otherwise uploads the questions.
+    """
+    quiz_id = assessment.get('id')
+    if quiz_id:
+        params = {"include_results": payload.get("include_results", False)}
+        if payload.get("include_results"):
+            params["score"] = payload.get("score", 0)
+        return api_get(f"/assessment/{quiz_id}/pdf", params=params)
+    return api_post("/assessment/download-pdf", json=payload)
 
 def render_assessment_page():
     # --- HEADER ---
@@ -42,7 +53,7 @@ def render_assessment_page():
     # --- PAST RESULTS (Collapsible) ---
     with st.expander("📊 View Past Performance", expanded=False):
         try:
-            resp = requests.get(f"{API_BASE_URL}/user-scores/{user['id']}")
+            resp = api_get(f"/user-scores/{user['id']}")
             if resp.status_code == 200:
                 scores = resp.json()
                 if scores:
@@ -78,7 +89,7 @@ def render_assessment_page():
                     with st.spinner("Creating questions..."):
                         payload = {"user_id": user['id'], "topic": topic, "type": "quiz"}
                         try:
-                            resp = requests.post(f"{API_BASE_URL}/generate-assessment", json=payload, timeout=20)
+                            resp = api_post("/generate-assessment", json=payload, timeout=GENERATION_TIMEOUT)
                             if resp.status_code == 200:
                                 st.session_state['data_quiz'] = resp.json()
                                 st.rerun()
@@ -118,7 +129,7 @@ def render_assessment_page():
                         quiz_id = quiz.get('id')
                         if quiz_id:
                             try:
-                                requests.post(f"{API_BASE_URL}/submit-score", json={"quiz_id": quiz_id, "score": current_score}, timeout=5)
+                                api_post("/submit-score", json={"quiz_id": quiz_id, "score": current_score}, timeout=5)
                                 st.toast("Score saved successfully!")
                             except:
                                 pass
@@ -151,7 +162,7 @@ def render_assessment_page():
                         "include_results": True
                     }
                     try:
-                        resp = requests.post(f"{API_BASE_URL}/assessment/download-pdf", json=payload)
+                        resp = _download_assessment_pdf(quiz, payload)
                         if resp.status_code == 200:
                             st.download_button("📄 Save Result PDF", resp.content, "quiz_results.pdf", "application/pdf")
                     except Exception as e:
@@ -170,7 +181,7 @@ def render_assessment_page():
             with st.spinner("Designing task..."):
                 payload = {"user_id": user['id'], "topic": topic, "type": "assignment"}
                 try:
-                    resp = requests.post(f"{API_BASE_URL}/generate-assessment", json=payload, timeout=20)
+                    resp = api_post("/generate-assessment", json=payload, timeout=GENERATION_TIMEOUT)
                     if resp.status_code == 200:
                         st.session_state['data_assignment'] = resp.json()
                         st.rerun()
@@ -200,7 +211,7 @@ def render_assessment_page():
                     "include_results": False
                 }
                 try:
-                    resp = requests.post(f"{API_BASE_URL}/assessment/download-pdf", json=payload)
+                    resp = _download_assessment_pdf(data, payload)
                     if resp.status_code == 200:
                         st.download_button("📄 Save PDF", resp.content, "assignment.pdf", "application/pdf")
                 except:
@@ -213,7 +224,7 @@ def render_assessment_page():
             with st.spinner("Preparing exam..."):
                 payload = {"user_id": user['id'], "topic": topic, "type": "test"}
                 try:
-                    resp = requests.post(f"{API_BASE_URL}/generate-assessment", json=payload, timeout=20)
+                    resp = api_post("/generate-assessment", json=payload, timeout=GENERATION_TIMEOUT)
                     if resp.status_code == 200:
                         st.session_state['data_test'] = resp.json()
                         # Reset test state
@@ -254,7 +265,7 @@ def render_assessment_page():
                         test_id = test.get('id')
                         if test_id:
                             try:
-                                requests.post(f"{API_BASE_URL}/submit-score", json={"quiz_id": test_id, "score": score}, timeout=5)
+                                api_post("/submit-score", json={"quiz_id": test_id, "score": score}, timeout=5)
                             except: pass
                         st.rerun()
 
@@ -276,7 +287,7 @@ def render_assessment_page():
                     "include_results": True
                 }
                 try:
-                    resp = requests.post(f"{API_BASE_URL}/assessment/download-pdf", json=payload)
+                    resp = _download_assessment_pdf(test, payload)
                     if resp.status_code == 200:
                         st.download_button("📄 Save Report", resp.content, "test_results.pdf", "application/pdf")
                 except: pass
@@ -1,7 +1,7 @@
 import streamlit as st
 import requests
 import time
-from frontend.utils.api import API_BASE_URL
+from frontend.utils.api import api_get, api_post, stream_events
 
 def render_builder_page():
     # --- HEADER ---
@@ -69,58 +69,80 @@ def render_builder_page():
                 
                 # 1. Trigger Build
                 with st.spinner("🤖 Waking up the dev team..."):
-                    resp = requests.post(f"{API_BASE_URL}/generate-project", json=payload)
+                    resp = api_post("/generate-project", json=payload)
                 
                 if resp.status_code == 200:
-                    # 2. Polling Loop
+                    job_id = resp.json().get("job_id")
+                    st.session_state['build_job_id'] = job_id
+
+                    # 2. Live Progress
                     st.success("Agents are working! Watch the progress below.")
                     
                     progress_bar = st.progress(0)
                     status_area = st.empty()
-                    log_area = st.empty()
                     
-                    # Poll for up to 90 seconds
-                    for _ in range(90):
-                        try:
-                            status_resp = requests.get(f"{API_BASE_URL}/project-status/{user['id']}")
-                            if status_resp.status_code == 200:
-                                data = status_resp.json()
-                                
-                                # Update UI
-                                progress = data.get('progress', 0)
-                                step_name = data.get('step', 'Processing...')
-                                status = data.get('status', 'processing')
-                                
-                                progress_bar.progress(progress)
-                                status_area.info(f"⚙️ {step_name}")
-                                
-                                if status == 'completed':
-                                    progress_bar.progress(100)
-                                    status_area.success(f"✅ Project '{project_name}' Built Successfully!")
-                                    st.balloons()
-                                    st.session_state['build_completed'] = True
-                                    
-                                    # Show link to projects page
-                                    st.markdown(f"""
-                                    <div style='background: rgba(0,255,0,0.1); padding: 15px; border-radius: 10px; border: 1px solid #00ff00;'>
-                                        <h4>🚀 Ready to Deploy!</h4>
-                                        <p>Your project files have been generated.</p>
-                                    </div>
-                                    """, unsafe_allow_html=True)
-                                    
-                                    if st.button("📂 Go to My Projects"):
-                                        st.session_state['navigate_to'] = "My Projects"
-                                        st.rerun()
-                                    break
-                                
-                                elif status == 'error':
-                                    status_area.error(f"❌ Build Failed: {step_name}")
-                                    break
+                    def show_status(data):
+                        """Updates the UI; returns True once the job is finished."""
+                        progress = data.get('progress', 0)
+                        step_name = data.get('step', 'Processing...')
+                        status = data.get('status', 'processing')
+                        
+                        progress_bar.progress(progress)
+                        status_area.info(f"⚙️ {step_name}")
+                        
+                        if status == 'completed':
+                            progress_bar.progress(100)
+                            status_area.success(f"✅ Project '{project_name}' Built Successfully!")
+                            st.balloons()
+                            st.session_state['build_completed'] = True
+                            
+                            failed_files = (data.get('result') or {}).get('failed_files') or {}
+                            if failed_files:
+                                st.warning(f"Some files could not be generated: {', '.join(failed_files)}")
                             
-                        except requests.exceptions.ConnectionError:
-                            pass # Retry silently
+                            # Show link to projects page
+                            st.markdown(f"""
+                            <div style='background: rgba(0,255,0,0.1); padding: 15px; border-radius: 10px; border: 1px solid #00ff00;'>
+                                <h4>🚀 Ready to Deploy!</h4>
+                                <p>Your project files have been generated.</p>
+                            </div>
+                            """, unsafe_allow_html=True)
                             
-                        time.sleep(1.5) # Wait before next poll
+                            if st.button("📂 Go to My Projects"):
+                                st.session_state['navigate_to'] = "My Projects"
+                                st.rerun()
+                            return True
+                        
+                        elif status == 'error':
+                            status_area.error(f"❌ Build Failed: {data.get('error') or step_name}")
+                            return True
+
+                        elif status == 'cancelled':
+                            status_area.warning("Build cancelled.")
+                            return True
+                        return False
+                    
+                    # Server pushes an event on every progress change
+                    finished = False
+                    try:
+                        for event, data in stream_events(f"/jobs/{job_id}/events", method="GET", timeout=60):
+                            if event == "progress" and show_status(data):
+                                finished = True
+                                break
+                    except requests.exceptions.RequestException:
+                        pass # Fall back to polling below
+                    
+                    # Fallback: poll for up to 90 seconds
+                    if not finished:
+                        for _ in range(90):
+                            try:
+                                status_resp = api_get(f"/jobs/{job_id}")
+                                if status_resp.status_code == 200 and show_status(status_resp.json()):
+                                    break
+                            except requests.exceptions.ConnectionError:
+                                pass # Retry silently
+                                
+                            time.sleep(1.5) # Wait before next poll
                         
                 else:
                     st.error(f"Failed to start build: {resp.text}")
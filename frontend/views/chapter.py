@@ -1,6 +1,5 @@
 import streamlit as st
-import requests
-from frontend.utils.api import API_BASE_URL
+from frontend.utils.api import api_get, api_post, stream_events
 
 def render_chapter_page():
     # --- HEADER STYLE ---
@@ -49,32 +48,41 @@ def render_chapter_page():
     
     # --- GENERATE BUTTON ---
     if st.button("🎓 Generate Lesson", type="primary", use_container_width=True):
-        with st.spinner("🤖 The Professor is writing your study material..."):
-            try:
-                # Prepare subtopics list
-                subtopics_list = [s.strip() for s in subtopics_str.split(',') if s.strip()]
-                
-                payload = {
-                    "user_id": user['id'],
-                    "topic": topic,
-                    "subtopics": subtopics_list,
-                    "detail_level": detail_level
-                }
-                
-                # API Call
-                resp = requests.post(f"{API_BASE_URL}/generate-chapter", json=payload)
-                
-                if resp.status_code == 200:
-                    data = resp.json()
+        status_area = st.empty()
+        live_area = st.empty()
+        status_area.info("🤖 The Professor is writing your study material...")
+        try:
+            # Prepare subtopics list
+            subtopics_list = [s.strip() for s in subtopics_str.split(',') if s.strip()]
+            
+            payload = {
+                "user_id": user['id'],
+                "topic": topic,
+                "subtopics": subtopics_list,
+                "detail_level": detail_level
+            }
+            
+            # API Call (streamed: render the chapter as it is written)
+            live_text = ""
+            for event, data in stream_events("/generate-chapter/stream", payload):
+                if event == "token":
+                    live_text += data
+                    live_area.markdown(live_text + "▌")
+                elif event == "done":
                     st.session_state['generated_chapter'] = data.get('content', '')
+                    st.session_state['chapter_artifact_id'] = data.get('artifact_id')
                     st.session_state['chapter_topic'] = topic
-                elif resp.status_code == 429:
-                    st.error("⏳ Rate Limit Reached. Please wait a minute.")
-                else:
-                    st.error(f"Error: {resp.text}")
-                    
-            except Exception as e:
-                st.error(f"Connection Error: {e}")
+                elif event == "error":
+                    if data.get("status_code") == 429 or "Limit" in data.get("detail", ""):
+                        st.error("⏳ Rate Limit Reached. Please wait a minute.")
+                    else:
+                        st.error(f"Error: {data.get('detail')}")
+                
+        except Exception as e:
+            st.error(f"Connection Error: {e}")
+        finally:
+            status_area.empty()
+            live_area.empty()
 
     # --- DISPLAY CONTENT ---
     if st.session_state['generated_chapter']:
@@ -94,8 +102,12 @@ def render_chapter_page():
                         "topic": st.session_state['chapter_topic'],
                         "content": st.session_state['generated_chapter']
                     }
-                    # Note: Using /chapter/download-pdf based on your API router prefix
-                    pdf_resp = requests.post(f"{API_BASE_URL}/chapter/download-pdf", json=pdf_payload)
+                    artifact_id = st.session_state.get('chapter_artifact_id')
+                    if artifact_id:
+                        # Server already has the chapter; no need to upload it again
+                        pdf_resp = api_get(f"/chapter/{artifact_id}/pdf")
+                    else:
+                        pdf_resp = api_post("/chapter/download-pdf", json=pdf_payload)
                     
                     if pdf_resp.status_code == 200:
                          st.download_button(
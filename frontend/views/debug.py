@@ -1,6 +1,5 @@
 import streamlit as st
-import requests
-from frontend.utils.api import API_BASE_URL
+from frontend.utils.api import api_get, api_post, stream_events
 
 def render_debug_page():
     # --- HEADER ---
@@ -41,26 +40,34 @@ def render_debug_page():
             if not code:
                  st.warning("Please enter some code.")
             else:
-                with st.spinner("🕵️ Agents are analyzing the stack trace..."):
-                    try:
-                        user_id = st.session_state['user']['id']
-                        payload = {
-                            "user_id": user_id,
-                            "code_snippet": code, 
-                            "error_message": err or "Find the bug and fix it."
-                        }
-                        
-                        # API Call
-                        response = requests.post(f"{API_BASE_URL}/debug", json=payload, timeout=30)
+                status_area = st.empty()
+                live_area = st.empty()
+                status_area.info("🕵️ Agents are analyzing the stack trace...")
+                try:
+                    user_id = st.session_state['user']['id']
+                    payload = {
+                        "user_id": user_id,
+                        "code_snippet": code, 
+                        "error_message": err or "Find the bug and fix it."
+                    }
+                    
+                    # API Call (streamed: render the report as it is written)
+                    live_text = ""
+                    for event, data in stream_events("/debug/stream", payload, timeout=30):
+                        if event == "token":
+                            live_text += data
+                            live_area.markdown(live_text + "▌")
+                        elif event == "done":
+                            st.session_state['debug_solution'] = data.get("solution") or "No solution returned."
+                            st.session_state['debug_artifact_id'] = data.get("artifact_id")
+                        elif event == "error":
+                            st.error(f"Error: {data.get('detail')}")
                         
-                        if response.status_code == 200:
-                            st.session_state['debug_solution'] = response.json().get("solution", "No solution returned.")
-                            # Removed rerun to avoid clearing inputs if not needed, but can add if desired
-                        else:
-                            st.error(f"Error: {response.text}")
-                            
-                    except Exception as e:
-                        st.error(f"Connection Error: {e}")
+                except Exception as e:
+                    st.error(f"Connection Error: {e}")
+                finally:
+                    status_area.empty()
+                    live_area.empty()
 
     # --- RESULTS SECTION ---
     if st.session_state['debug_solution']:
@@ -83,7 +90,11 @@ def render_debug_page():
                         "solution": st.session_state['debug_solution']
                     }
                     try:
-                        resp = requests.post(f"{API_BASE_URL}/debug/download-pdf", json=pdf_payload)
+                        artifact_id = st.session_state.get('debug_artifact_id')
+                        if artifact_id:
+                            resp = api_get(f"/debug/{artifact_id}/pdf")
+                        else:
+                            resp = api_post("/debug/download-pdf", json=pdf_payload)
                         
                         if resp.status_code == 200:
                             st.download_button(
@@ -1,7 +1,7 @@
 import streamlit as st
 import requests
 from frontend.utils.helpers import extract_json
-from frontend.utils.api import API_BASE_URL
+from frontend.utils.api import api_get, api_post, stream_events
 
 # --- Callbacks ---
 def go_to_study(topic, subtopics_list):
@@ -42,6 +42,31 @@ def render_roadmap_page():
     st.markdown("<p style='color: #a0a0a0;'>Generate a custom curriculum tailored to your goals and skill level.</p>", unsafe_allow_html=True)
     st.markdown("<br>", unsafe_allow_html=True)
     
+    # --- SAVED ROADMAPS ---
+    user = st.session_state.get('user')
+    if user:
+        with st.expander("📂 My Saved Roadmaps"):
+            try:
+                resp = api_get("/roadmaps", params={"user_id": user['id'], "limit": 20})
+                saved = resp.json().get("items", []) if resp.status_code == 200 else []
+            except requests.exceptions.RequestException:
+                saved = []
+            
+            if not saved:
+                st.caption("No saved roadmaps yet.")
+            else:
+                labels = {f"{r['title']} ({r.get('duration') or '?'}, {r.get('level') or '?'}) - {(r.get('created_at') or '')[:10]}": r['id'] for r in saved}
+                choice = st.selectbox("Roadmap", list(labels.keys()), key="saved_roadmap_choice", label_visibility="collapsed")
+                if st.button("Open", key="btn_open_saved_roadmap"):
+                    resp = api_get(f"/roadmaps/{labels[choice]}")
+                    if resp.status_code == 200:
+                        st.session_state['roadmap_data'] = resp.json().get("data")
+                        st.session_state['roadmap_id'] = labels[choice]
+                        st.session_state['generated_roadmap'] = True
+                        st.rerun()
+                    else:
+                        st.error(f"Could not load roadmap: {resp.text}")
+    
     # --- INPUT SECTION (Glass Card) ---
     with st.container(border=True): 
         col1, col2, col3 = st.columns([2, 1, 1])
@@ -64,7 +89,7 @@ def render_roadmap_page():
                         payload = {"user_id": user_id, "topic": topic, "duration": duration, "level": level}
                         
                         # API Call
-                        response = requests.post(f"{API_BASE_URL}/generate-roadmap", json=payload)
+                        response = api_post("/generate-roadmap", json=payload)
                         
                         if response.status_code == 200:
                             data = response.json()
@@ -81,6 +106,7 @@ def render_roadmap_page():
 
                             if roadmap_json:
                                 st.session_state['roadmap_data'] = roadmap_json 
+                                st.session_state['roadmap_id'] = data.get("roadmap_id") if isinstance(data, dict) else None
                                 st.session_state['generated_roadmap'] = True
                                 st.rerun() 
                             else:
@@ -150,11 +176,16 @@ def render_roadmap_page():
                             "data": st.session_state['roadmap_data']
                         }
                         try:
-                            # Try specific route first, then generic
-                            resp = requests.post(f"{API_BASE_URL}/roadmap/download-pdf", json=payload)
-                            
-                            if resp.status_code == 404:
-                                 resp = requests.post(f"{API_BASE_URL}/download-pdf", json=payload)
+                            roadmap_id = st.session_state.get('roadmap_id')
+                            if roadmap_id:
+                                # Saved roadmap: render server-side by ID
+                                resp = api_get(f"/roadmaps/{roadmap_id}/pdf")
+                            else:
+                                # Try specific route first, then generic
+                                resp = api_post("/roadmap/download-pdf", json=payload)
+                                
+                                if resp.status_code == 404:
+                                     resp = api_post("/download-pdf", json=payload)
 
                             if resp.status_code == 200:
                                 st.download_button(
@@ -169,3 +200,52 @@ def render_roadmap_page():
                                 st.error(f"Failed to generate PDF: {resp.text}")
                         except Exception as e:
                             st.error(f"Error: {e}")
+
+            with col_sp:
+                roadmap_id = st.session_state.get('roadmap_id')
+                if roadmap_id and st.button("📚 Export Course Book", help="Roadmap + every week's chapter and quiz in one PDF. Missing chapters and quizzes are generated."):
+                    _export_book(roadmap_id, topic)
+
+
+def _export_book(roadmap_id, topic):
+    user = st.session_state.get('user') or {}
+    try:
+        resp = api_post(f"/roadmaps/{roadmap_id}/book", json={"user_id": user.get('id')})
+        if resp.status_code != 200:
+            st.error(f"Failed to start export: {resp.text}")
+            return
+        job_id = resp.json().get("job_id")
+
+        progress_bar = st.progress(0)
+        status_area = st.empty()
+        job = {}
+        for event, data in stream_events(f"/jobs/{job_id}/events", method="GET", timeout=600):
+            if event != "progress":
+                continue
+            job = data
+            progress_bar.progress(job.get('progress', 0))
+            status_area.info(f"⚙️ {job.get('step', 'Processing...')}")
+            if job.get('status') in ("completed", "error", "cancelled"):
+                break
+
+        if job.get('status') != "completed":
+            status_area.error(f"❌ Export failed: {job.get('error') or job.get('step')}")
+            return
+
+        status_area.success("✅ Course book ready!")
+        failed = (job.get('result') or {}).get('failed_sections') or {}
+        if failed:
+            st.warning(f"Some sections were left out: {', '.join(failed)}")
+        pdf = api_get(f"/books/{job_id}/pdf")
+        if pdf.status_code == 200:
+            st.download_button(
+                label="📄 Click to Save Course Book",
+                data=pdf.content,
+                file_name=f"Course_{topic}.pdf",
+                mime="application/pdf",
+                type="primary"
+            )
+        else:
+            st.error(f"Failed to download book: {pdf.text}")
+    except Exception as e:
+        st.error(f"Error: {e}")
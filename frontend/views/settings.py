@@ -1,6 +1,5 @@
 import streamlit as st
-import requests
-from frontend.utils.api import API_BASE_URL
+from frontend.utils.api import API_BASE_URL, api_get, api_post, save_tokens
 
 def render_settings_page():
     # --- HEADER ---
@@ -29,7 +28,7 @@ def render_settings_page():
     li_connected = False
 
     try:
-        resp = requests.get(f"{API_BASE_URL}/user/{user['id']}/keys")
+        resp = api_get(f"/user/{user['id']}/keys")
         if resp.status_code == 200:
             data = resp.json()
             current_gemini_key = data.get("gemini_api_key") or ""
@@ -75,9 +74,11 @@ def render_settings_page():
                 payload["gemini_api_key"] = api_key_input
             
             try:
-                resp = requests.post(f"{API_BASE_URL}/user/update-keys", json=payload)
+                resp = api_post("/user/update-keys", json=payload)
                 if resp.status_code == 200:
                     st.toast("AI Configuration Saved!", icon="✅")
+                    # Tokens now carry the new model preference
+                    save_tokens(resp.json())
                     # Update local state slightly to reflect change immediately if needed
                 else:
                     st.error(f"Failed to save: {resp.text}")
@@ -99,6 +100,25 @@ def render_settings_page():
         # Clear params logic if desired
 
     OAUTH_BASE_URL = API_BASE_URL.replace("/api/v1", "/api/oauth")
+
+    def connect_url(provider):
+        # The backend signs a short-lived state for this user into the URL
+        try:
+            resp = api_get(f"/{provider}/authorize-url", base_url=OAUTH_BASE_URL,
+                           params={"user_id": user['id']}, timeout=5)
+            if resp.status_code == 200:
+                return resp.json()["url"]
+        except Exception:
+            pass
+        return None
+
+    def connect_button(provider, label):
+        login_url = connect_url(provider)
+        if login_url:
+            st.link_button(label, login_url, use_container_width=True)
+        else:
+            st.button(label, disabled=True, use_container_width=True, key=f"connect_{provider}",
+                      help="Couldn't reach the backend")
     
     col1, col2 = st.columns(2)
 
@@ -108,12 +128,10 @@ def render_settings_page():
             st.markdown("##### 🐙 GitHub")
             if gh_connected:
                 st.markdown("<p style='color:#00ff00; font-size: 0.9em;'>✅ Connected</p>", unsafe_allow_html=True)
-                login_url = f"{OAUTH_BASE_URL}/github/login?user_id={user['id']}"
-                st.link_button("🔄 Reconnect", login_url, use_container_width=True)
+                connect_button("github", "🔄 Reconnect")
             else:
                 st.markdown("<p style='color:#ff4b4b; font-size: 0.9em;'>❌ Not Connected</p>", unsafe_allow_html=True)
-                login_url = f"{OAUTH_BASE_URL}/github/login?user_id={user['id']}"
-                st.link_button("🔗 Connect", login_url, use_container_width=True)
+                connect_button("github", "🔗 Connect")
 
     # LINKEDIN CARD
     with col2:
@@ -121,9 +139,7 @@ def render_settings_page():
             st.markdown("##### 🔵 LinkedIn")
             if li_connected:
                 st.markdown("<p style='color:#00ff00; font-size: 0.9em;'>✅ Connected</p>", unsafe_allow_html=True)
-                login_url = f"{OAUTH_BASE_URL}/linkedin/login?user_id={user['id']}"
-                st.link_button("🔄 Reconnect", login_url, use_container_width=True)
+                connect_button("linkedin", "🔄 Reconnect")
             else:
                 st.markdown("<p style='color:#ff4b4b; font-size: 0.9em;'>❌ Not Connected</p>", unsafe_allow_html=True)
-                login_url = f"{OAUTH_BASE_URL}/linkedin/login?user_id={user['id']}"
-                st.link_button("🔗 Connect", login_url, use_container_width=True)
+                connect_button("linkedin", "🔗 Connect")
@@ -1,7 +1,6 @@
 import streamlit as st
-import requests
 import os
-from frontend.utils.api import API_BASE_URL
+from frontend.utils.api import api_post
 from frontend.utils.helpers import get_projects
 
 # --- HELPER: READ README ---
@@ -151,7 +150,7 @@ def render_social_page():
                         "tone": st.session_state['social_li_tone']
                     }
                     try:
-                        resp = requests.post(f"{API_BASE_URL}/generate-social", json=payload)
+                        resp = api_post("/generate-social", json=payload)
                         if resp.status_code == 200:
                             st.session_state['li_draft'] = resp.json().get('content', '')
                             # No rerun needed, just show it below
@@ -175,7 +174,7 @@ def render_social_page():
                         st.error("Please connect LinkedIn in Settings first.")
                     else:
                         with st.spinner("Posting to LinkedIn..."):
-                            resp = requests.post(f"{API_BASE_URL}/linkedin/post", json={"token": saved_li_key, "content": final_content})
+                            resp = api_post("/linkedin/post", json={"token": saved_li_key, "content": final_content})
                             if resp.status_code == 200:
                                 st.balloons()
                                 st.success("✅ Published successfully!")
@@ -270,7 +269,7 @@ def render_social_page():
                             }
                             # Note: The Backend endpoint is /github/push
                             try:
-                                resp = requests.post(f"{API_BASE_URL}/github/push", json=payload, timeout=30)
+                                resp = api_post("/github/push", json=payload, timeout=30)
                                 result = resp.json()
                                 
                                 if result.get("status") == "success":
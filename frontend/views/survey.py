@@ -1,6 +1,5 @@
 import streamlit as st
-import requests
-from frontend.utils.api import API_BASE_URL
+from frontend.utils.api import api_post, save_tokens
 
 def render_survey_page():
     # --- HEADER STYLE ---
@@ -68,7 +67,7 @@ def render_survey_page():
                         
                         try:
                             with st.spinner("Calibrating AI..."):
-                                resp = requests.post(f"{API_BASE_URL}/save-survey", json=payload)
+                                resp = api_post("/save-survey", json=payload)
                             
                             if resp.status_code == 200:
                                 st.balloons()
@@ -76,6 +75,7 @@ def render_survey_page():
                                 
                                 # --- CRITICAL FIX: Update Local Session State ---
                                 st.session_state['user']['profile_data'] = payload
+                                save_tokens(resp.json())
                                 st.session_state['survey_completed_flag'] = True
                                 st.session_state['navigate_to'] = "Roadmap Generator"
                                 
@@ -0,0 +1,26 @@
+import asyncio
+import os
+import tempfile
+
+import pytest
+
+# Configure the app before anything imports it: a throwaway database and
+# cache directory, no model downloads or client warm-up, and a fixed secret
+_scratch = tempfile.mkdtemp(prefix="student-ai-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_scratch, 'test.db')}")
+os.environ.setdefault("CACHE_DIR", os.path.join(_scratch, "cache"))
+os.environ.setdefault("JWT_SECRET", "test-secret")
+os.environ.setdefault("AUTH_REQUIRED", "false")
+os.environ.setdefault("SEMANTIC_CACHE_ENABLED", "false")
+os.environ.setdefault("LLM_WARMUP", "false")
+
+
+@pytest.fixture(scope="session")
+def database():
+    """Creates the tables in the test database; yields the sync engine."""
+    import app.models.user  # registers the tables
+    from app.db.database import init_db, engine, async_engine
+    init_db()
+    yield engine
+    # aiosqlite connections run on their own (non-daemon) threads
+    asyncio.run(async_engine.dispose())
@@ -0,0 +1,95 @@
+"""
+Session tokens: who may call what. The suite runs with AUTH_REQUIRED off,
+but a token that is sent is always verified.
+"""
+import asyncio
+from datetime import timedelta
+
+import httpx
+from sqlmodel import Session
+
+from app.main import app
+from app.models.user import User
+from app.services import auth
+
+
+def _request(method, path, token=None, **kwargs):
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+
+    async def send():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.request(method, path, headers=headers, **kwargs)
+    return asyncio.run(send())
+
+
+def _user(database, email):
+    with Session(database) as session:
+        user = User(email=email, full_name="Auth Test", hashed_password="x")
+        session.add(user)
+        session.commit()
+        session.refresh(user)
+        return user
+
+
+def test_metrics_is_admin_only(database, monkeypatch):
+    admin, other = _user(database, "admin@example.com"), _user(database, "member@example.com")
+    monkeypatch.setattr(auth, "ADMIN_USER_IDS", {admin.id})
+
+    assert _request("GET", "/metrics").status_code == 401
+    assert _request("GET", "/metrics", auth.create_token_pair(other)["access_token"]).status_code == 403
+    resp = _request("GET", "/metrics", auth.create_token_pair(admin)["access_token"])
+    assert resp.status_code == 200
+    assert "llm_limiters" in resp.json()
+
+
+def test_expired_access_token_is_rejected(database):
+    user = _user(database, "expired@example.com")
+    token = auth._encode(user, "access", timedelta(seconds=-1))
+
+    resp = _request("GET", f"/api/v1/user-scores/{user.id}", token)
+    assert resp.status_code == 401
+    assert resp.json()["detail"] == "Session expired"
+
+
+def test_token_types_are_not_interchangeable(database):
+    user = _user(database, "types@example.com")
+    tokens = auth.create_token_pair(user)
+
+    assert _request("GET", f"/api/v1/user-scores/{user.id}", tokens["refresh_token"]).status_code == 401
+    assert _request("POST", "/api/v1/token/refresh", json={"refresh_token": tokens["access_token"]}).status_code == 401
+
+
+def test_refresh_token_works_once(database):
+    user = _user(database, "refresh@example.com")
+    refresh = auth.create_token_pair(user)["refresh_token"]
+
+    resp = _request("POST", "/api/v1/token/refresh", json={"refresh_token": refresh})
+    assert resp.status_code == 200
+    assert _request("GET", f"/api/v1/user-scores/{user.id}", resp.json()["access_token"]).status_code == 200
+    assert _request("POST", "/api/v1/token/refresh", json={"refresh_token": refresh}).status_code == 401
+
+
+def test_logout_revokes_both_tokens(database):
+    user = _user(database, "logout@example.com")
+    tokens = auth.create_token_pair(user)
+
+    resp = _request("POST", "/api/v1/logout", tokens["access_token"], json={"refresh_token": tokens["refresh_token"]})
+    assert resp.status_code == 200
+    assert _request("GET", f"/api/v1/user-scores/{user.id}", tokens["access_token"]).status_code == 401
+    assert _request("POST", "/api/v1/token/refresh", json={"refresh_token": tokens["refresh_token"]}).status_code == 401
+
+
+def test_other_users_data_is_forbidden(database):
+    owner, intruder = _user(database, "owner@example.com"), _user(database, "intruder@example.com")
+    token = auth.create_token_pair(intruder)["access_token"]
+
+    assert _request("GET", f"/api/v1/user-scores/{owner.id}", token).status_code == 403
+    assert _request("GET", f"/api/v1/jobs?user_id={owner.id}", token).status_code == 403
+
+
+def test_missing_token_when_auth_required(database, monkeypatch):
+    user = _user(database, "required@example.com")
+    monkeypatch.setattr(auth, "AUTH_REQUIRED", True)
+
+    assert _request("GET", f"/api/v1/user-scores/{user.id}").status_code == 401
+    assert _request("GET", f"/api/v1/user-scores/{user.id}", "not-a-jwt").status_code == 401
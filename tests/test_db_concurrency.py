@@ -0,0 +1,49 @@
+"""
+200 writers hit the database at the same moment through the submit-score
+and save-survey handlers; WAL + busy timeout + the pool must queue them
+up without a single "database is locked".
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlmodel import Session, select
+
+from app.api.assessment import submit_score, save_survey, ScoreUpdate, SurveyData
+from app.models.user import User, Quiz
+
+WRITERS = 200
+USERS = 10
+
+
+def test_concurrent_writers_do_not_lock(database):
+    with Session(database) as session:
+        users = [User(email=f"writer{i}@example.com", full_name=f"Writer {i}", hashed_password="x") for i in range(USERS)]
+        session.add_all(users)
+        session.commit()
+        user_ids = [user.id for user in users]
+        quizzes = [Quiz(topic="SQL", difficulty="quiz", user_id=user_ids[i % USERS]) for i in range(WRITERS // 2)]
+        session.add_all(quizzes)
+        session.commit()
+        quiz_ids = [quiz.id for quiz in quizzes]
+
+    start = threading.Barrier(WRITERS)
+
+    def writer(i):
+        start.wait()
+        with Session(database) as session:
+            if i % 2:
+                return submit_score(ScoreUpdate(quiz_id=quiz_ids[i // 2], score=i), session=session, current_user=None)
+            survey = SurveyData(user_id=user_ids[i % USERS], learning_style="Visual", daily_time="1h",
+                                career_goal="Backend", current_skill="Beginner")
+            return save_survey(survey, session=session, current_user=None)
+
+    with ThreadPoolExecutor(max_workers=WRITERS) as pool:
+        results = list(pool.map(writer, range(WRITERS)))  # re-raises any OperationalError
+
+    assert all(result["status"] == "success" for result in results)
+    with Session(database) as session:
+        scores = session.exec(select(Quiz.score).where(Quiz.id.in_(quiz_ids))).all()
+        versions = session.exec(select(User.profile_version).where(User.id.in_(user_ids))).all()
+    assert sorted(scores) == list(range(1, WRITERS, 2))
+    # Every save-survey write landed: none lost to a lock error or a race
+    assert sum(v or 0 for v in versions) == WRITERS // 2
@@ -0,0 +1,38 @@
+"""
+Request budgets: every request's LLM work gets REQUEST_DEADLINE_SECONDS (or
+less, if the client asks), except the long-lived job event streams.
+"""
+import asyncio
+
+import httpx
+import pytest
+
+from app.core.deadlines import RequestDeadlineMiddleware
+from app.core.llm import current_llm_caller, REQUEST_DEADLINE_SECONDS
+
+
+async def _budget_app(scope, receive, send):
+    # Reports the remaining budget of the request's LLMCaller
+    remaining = current_llm_caller().remaining()
+    body = b"none" if remaining is None else str(round(remaining)).encode()
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+    await send({"type": "http.response.body", "body": body})
+
+
+def _remaining(path, headers=None):
+    async def get():
+        transport = httpx.ASGITransport(app=RequestDeadlineMiddleware(_budget_app))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return (await client.get(path, headers=headers)).text
+    return asyncio.run(get())
+
+
+@pytest.mark.parametrize("path, headers, expected", [
+    ("/api/v1/generate-chapter", None, str(round(REQUEST_DEADLINE_SECONDS))),
+    ("/api/v1/generate-chapter", {"X-Request-Timeout": "30"}, "30"),
+    ("/api/v1/generate-chapter", {"X-Request-Timeout": "99999"}, str(round(REQUEST_DEADLINE_SECONDS))),
+    ("/api/v1/jobs/42/events", None, "none"),
+    ("/api/v1/jobs/42", None, str(round(REQUEST_DEADLINE_SECONDS))),
+])
+def test_request_budget(path, headers, expected):
+    assert _remaining(path, headers) == expected
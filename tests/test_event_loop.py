@@ -0,0 +1,64 @@
+"""
+Slow generations run in the LLM pool, not on the event loop: while several
+are in flight, a cheap endpoint still answers right away.
+"""
+import asyncio
+import time
+from types import SimpleNamespace
+
+import httpx
+
+from app.main import app
+from app.api import content
+
+GENERATIONS = 8
+GENERATION_SECONDS = 1.0
+
+
+class SlowCrew:
+    # Stands in for ContentCrew: blocks its thread like a real kickoff does
+    def __init__(self, llm=None):
+        pass
+
+    def create_chapter(self, **kwargs):
+        time.sleep(GENERATION_SECONDS)
+        return "# Chapter"
+
+
+async def _fake_user(user_id, version=None):
+    return SimpleNamespace(llm=lambda stream=False: None, style_note="")
+
+
+async def _fake_save(*args, **kwargs):
+    return 1
+
+
+def test_slow_generations_do_not_block_cheap_endpoint(monkeypatch):
+    monkeypatch.setattr(content, "ContentCrew", SlowCrew)
+    monkeypatch.setattr(content.user_contexts, "get_async", _fake_user)
+    monkeypatch.setattr(content, "save_artifact_async", _fake_save)
+    payload = {"user_id": 1, "topic": "Python Lists", "subtopics": ["slicing"], "detail_level": "Beginner"}
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            start = time.perf_counter()
+            generations = [
+                asyncio.create_task(client.post("/api/v1/generate-chapter", json=payload))
+                for _ in range(GENERATIONS)
+            ]
+            # Let every generation reach its kickoff before probing
+            await asyncio.sleep(0.2)
+            probe = await client.get("/")
+            answered_at = time.perf_counter() - start
+            responses = await asyncio.gather(*generations)
+            return probe, answered_at, responses, time.perf_counter() - start
+
+    probe, answered_at, responses, total_seconds = asyncio.run(scenario())
+
+    assert probe.status_code == 200
+    assert [r.status_code for r in responses] == [200] * GENERATIONS
+    # Answered while the generations were still running...
+    assert answered_at < GENERATION_SECONDS / 2
+    # ...and ran side by side, not one after another
+    assert total_seconds < GENERATION_SECONDS * 2
@@ -0,0 +1,66 @@
+"""
+Fair sharing of the admin keys: waiting calls are served in weighted fair
+order per user rather than first come first served, and each user's hourly
+token share is enforced.
+"""
+import threading
+import time
+
+import pytest
+
+from app.core import llm
+from app.core.llm import AdaptiveLimiter, AdminKeyQuotaExceeded
+
+
+def _serve_in_order(limiter, callers):
+    """Queues callers [(user_id, priority)] behind a held slot; returns the order they get it."""
+    served, lock = [], threading.Lock()
+    limiter.acquire(time.monotonic() + 1, user_id="holder")
+
+    def call(user_id, priority):
+        limiter.acquire(time.monotonic() + 5, user_id, priority, tokens=100)
+        with lock:
+            served.append(user_id)
+        limiter.release(True, user_id, priority, tokens=100)
+
+    threads = []
+    for user_id, priority in callers:
+        threads.append(threading.Thread(target=call, args=(user_id, priority)))
+        threads[-1].start()
+        # Queue one at a time so arrival order is known
+        give_up_at = time.monotonic() + 5
+        while limiter.waiting < len(threads):
+            assert time.monotonic() < give_up_at, "caller never queued"
+            time.sleep(0.01)
+
+    limiter.release(True, user_id="holder")
+    for thread in threads:
+        thread.join(5)
+    return served
+
+
+def test_second_user_is_not_stuck_behind_the_first():
+    # One slot, so the queue order is the service order
+    limiter = AdaptiveLimiter(initial=1, minimum=1, maximum=1, fair=True)
+    served = _serve_in_order(limiter, [("alice", "interactive")] * 3 + [("bob", "interactive")])
+    # First come first served would be alice, alice, alice, bob
+    assert served == ["alice", "bob", "alice", "alice"]
+
+
+def test_interactive_calls_outweigh_background_ones():
+    limiter = AdaptiveLimiter(initial=1, minimum=1, maximum=1, fair=True)
+    served = _serve_in_order(limiter, [("builder", "background")] * 3 + [("reader", "interactive")] * 3)
+    # A background call costs four times as much fair share as an interactive one
+    assert served == ["builder", "reader", "reader", "reader", "builder", "builder"]
+
+
+def test_hourly_share_is_enforced(monkeypatch):
+    monkeypatch.setattr(llm, "LLM_USER_TOKENS_PER_HOUR", 150)
+    limiter = AdaptiveLimiter(initial=4, minimum=1, maximum=4, fair=True)
+    limiter.acquire(time.monotonic() + 1, "alice", tokens=100)
+    limiter.release(True, "alice", tokens=100)
+
+    with pytest.raises(AdminKeyQuotaExceeded):
+        limiter.acquire(time.monotonic() + 1, "alice", tokens=100)
+    limiter.acquire(time.monotonic() + 1, "bob", tokens=100)
+    assert limiter.get_stats()["quota_rejected"] == 1
@@ -0,0 +1,124 @@
+"""
+The durable job queue: each queued job is claimed by exactly one worker,
+failures are retried up to max_attempts, cancellation stops a job, and
+stale jobs are requeued unless their worker is still heartbeating.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+from sqlmodel import Session, select
+
+from app.models.user import Job
+from app.services import task_manager
+from app.services.task_manager import (
+    create_job, get_job, cancel_job, update_task, register_job_handler, requeue_stale_jobs,
+    heartbeat_running_jobs, JobFailed, JOB_STALE_SECONDS, _claim_next, _run_job
+)
+
+
+@pytest.fixture
+def queue(database):
+    # Each test starts and ends with no queued jobs, since claims take the oldest
+    yield
+    with Session(database) as session:
+        for job in session.exec(select(Job).where(Job.status.in_(["queued", "processing"]))).all():
+            job.status = "cancelled"
+            session.add(job)
+        session.commit()
+
+
+def _run_next():
+    job = _claim_next("test-worker")
+    assert job is not None
+    _run_job(job)
+    return get_job(job.id)
+
+
+def test_each_job_is_claimed_once(queue):
+    job_ids = {create_job(1, "noop", {})["id"] for _ in range(20)}
+    start = threading.Barrier(8)
+
+    def worker(i):
+        start.wait()
+        claimed = []
+        while (job := _claim_next(f"worker-{i}")) is not None:
+            claimed.append(job.id)
+        return claimed
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        claims = [job_id for claimed in pool.map(worker, range(8)) for job_id in claimed]
+    assert sorted(claims) == sorted(job_ids)
+    assert all(get_job(job_id)["attempts"] == 1 for job_id in job_ids)
+
+
+def test_failed_job_is_retried_then_gives_up(queue):
+    calls = []
+
+    def flaky(job_id, fail_times):
+        calls.append(job_id)
+        if len(calls) <= fail_times:
+            raise RuntimeError("provider hiccup")
+        return {"ok": True}
+
+    register_job_handler("flaky", flaky)
+    create_job(1, "flaky", {"fail_times": 1}, max_attempts=2)
+    retried = _run_next()
+    assert (retried["status"], retried["attempts"]) == ("queued", 1)
+    done = _run_next()
+    assert (done["status"], done["attempts"], done["result"]["ok"]) == ("completed", 2, True)
+
+    calls.clear()
+    job_id = create_job(1, "flaky", {"fail_times": 5}, max_attempts=2)["id"]
+    _run_next()
+    assert _run_next()["status"] == "error"
+    assert get_job(job_id)["error"] == "provider hiccup"
+
+
+def test_job_failed_is_not_retried(queue):
+    def broken(job_id):
+        raise JobFailed("bad input")
+
+    register_job_handler("broken", broken)
+    create_job(1, "broken", {}, max_attempts=3)
+    job = _run_next()
+    assert (job["status"], job["attempts"]) == ("error", 1)
+
+
+def test_cancel_queued_and_running_jobs(queue):
+    queued = create_job(1, "noop", {})["id"]
+    assert cancel_job(queued)["status"] == "cancelled"
+
+    def long_running(job_id):
+        update_task(job_id, "processing", "Step 1", 10)
+        cancel_job(job_id)  # the user hits cancel mid-run
+        update_task(job_id, "processing", "Step 2", 50)
+        return {"ok": True}
+
+    register_job_handler("long", long_running)
+    create_job(1, "long", {})
+    job = _run_next()
+    assert (job["status"], job["step"]) == ("cancelled", "Cancelled")
+
+
+def test_stale_jobs_requeued_unless_heartbeating(queue, database, monkeypatch):
+    lost, alive, spent = (create_job(1, "noop", {}, max_attempts=2)["id"] for _ in range(3))
+    for job_id in (lost, alive, spent):
+        assert _claim_next("dead-worker").id == job_id
+    long_ago = datetime.utcnow() - timedelta(seconds=JOB_STALE_SECONDS + 60)
+    with Session(database) as session:
+        for job_id in (lost, alive, spent):
+            job = session.get(Job, job_id)
+            job.updated_at = long_ago
+            job.attempts = 2 if job_id == spent else 1
+            session.add(job)
+        session.commit()
+
+    monkeypatch.setitem(task_manager._running_callers, alive, None)
+    heartbeat_running_jobs()
+    requeue_stale_jobs()
+
+    assert get_job(lost)["status"] == "queued"
+    assert get_job(alive)["status"] == "processing"
+    assert get_job(spent)["status"] == "error"
@@ -0,0 +1,87 @@
+"""
+The per-key AIMD limiter: it caps concurrent calls, halves the limit and
+pauses the key on a 429, then climbs back one slot per window of successes.
+"""
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.llm import AdaptiveLimiter, ManagedLLM, RateLimitTimeout, begin_llm_caller
+
+
+def test_limit_caps_concurrent_calls():
+    limiter = AdaptiveLimiter(initial=2, minimum=1, maximum=4)
+    limiter.acquire(time.monotonic() + 1)
+    limiter.acquire(time.monotonic() + 1)
+    with pytest.raises(RateLimitTimeout):
+        limiter.acquire(time.monotonic() + 0.1)
+    assert limiter.get_stats()["timeouts"] == 1
+
+    limiter.release(success=False)
+    limiter.acquire(time.monotonic() + 1)
+    assert limiter.in_flight == 2
+
+
+def test_backoff_on_429_and_recovery():
+    limiter = AdaptiveLimiter(initial=8, minimum=1, maximum=8)
+    limiter.throttle(retry_after=0.3)
+    assert limiter.limit == 4
+
+    # The key is paused until Retry-After has passed
+    start = time.monotonic()
+    limiter.acquire(start + 2)
+    assert time.monotonic() - start >= 0.25
+
+    for _ in range(5):
+        limiter.throttle(retry_after=0)
+    assert limiter.limit == 1  # never below the minimum
+
+    # Additive increase: +1 slot per `limit` successful calls, capped at the maximum
+    limiter.release(success=True)
+    assert limiter.limit == 2
+    for _ in range(40):
+        limiter.acquire(time.monotonic() + 1)
+        limiter.release(success=True)
+    assert limiter.limit == 8
+    assert limiter.get_stats()["throttled"] == 6
+
+
+class FlakyProvider:
+    # Stands in for a provider LLM: the first call is rate limited
+    model, temperature, api_key, provider, stop = "gemini/gemini-2.0-flash", 0.7, "test-key", "gemini", None
+
+    def __init__(self):
+        self.calls = 0
+
+    def call(self, messages, **kwargs):
+        self.calls += 1
+        if self.calls == 1:
+            raise Exception("429 RESOURCE_EXHAUSTED: retry_delay 0.2s")
+        return "Week 1: lists"
+
+
+def test_managed_llm_retries_after_429():
+    provider = FlakyProvider()
+    llm = ManagedLLM(provider, "gemini", "limiter-test-key")
+    llm.limiter.limit = 4.0
+    caller = begin_llm_caller(user_id=1)
+
+    start = time.monotonic()
+    assert llm.call([{"role": "user", "content": "Plan week 1"}]) == "Week 1: lists"
+    assert time.monotonic() - start >= 0.15
+    assert provider.calls == 2
+    assert caller.calls == 2
+    stats = llm.limiter.get_stats()
+    assert (stats["throttled"], stats["in_flight"], stats["limit"]) == (1, 0, 2.5)
+
+
+def test_non_rate_limit_errors_are_not_retried():
+    provider = SimpleNamespace(model="gemini/gemini-2.0-flash", temperature=0.7, api_key="k", provider="gemini",
+                               stop=None, call=lambda messages, **kwargs: 1 / 0)
+    llm = ManagedLLM(provider, "gemini", "limiter-test-key-2")
+    begin_llm_caller(user_id=1)
+    with pytest.raises(ZeroDivisionError):
+        llm.call([{"role": "user", "content": "Plan week 1"}])
+    assert llm.limiter.get_stats()["throttled"] == 0
+    assert llm.limiter.in_flight == 0
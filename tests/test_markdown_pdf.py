@@ -0,0 +1,82 @@
+"""
+Chapter PDFs from Markdown: every block type ends up on the page, and
+tables share the frame of the text, code blocks and rules around them.
+"""
+import io
+
+import pypdfium2 as pdfium
+from reportlab.lib.pagesizes import LETTER
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import SimpleDocTemplate, Table
+
+from app.services.markdown_pdf import MarkdownRenderer, CodeBlock
+from app.services.pdf_generator import PDFGenerator
+
+CHAPTER = """# Python Lists
+
+Lists are **mutable** sequences; use `append()` to grow one.
+
+## Slicing
+
+1. Start with the basics
+   - `items[1:3]` takes a range
+   - negative steps reverse
+2. Then *copies* versus views
+
+```python
+squares = [n * n for n in range(5)]
+print(squares)
+```
+
+| Operation | Cost |
+|-----------|------|
+| `append`  | O(1) |
+| `insert`  | O(n) |
+
+---
+
+- Nested table:
+
+  | Key | Value |
+  |-----|-------|
+  | a   | 1     |
+
+  ```
+  indented code
+  ```
+"""
+
+
+def _pdf_text(data: bytes):
+    pdf = pdfium.PdfDocument(data)
+    try:
+        return len(pdf), "\n".join(pdf[i].get_textpage().get_text_range() for i in range(len(pdf)))
+    finally:
+        pdf.close()
+
+
+def test_chapter_pdf_contains_every_block():
+    data = PDFGenerator(output=io.BytesIO()).generate_chapter_pdf("Python Lists", CHAPTER).getvalue()
+    pages, text = _pdf_text(data)
+
+    assert pages >= 1
+    for expected in ("Python Lists", "Slicing", "mutable", "append()", "items[1:3]", "negative steps reverse",
+                     "copies", "squares = [n * n for n in range(5)]", "Operation", "O(n)", "indented code"):
+        assert expected in text, expected
+    # Markdown syntax doesn't leak into the page
+    assert "**" not in text and "```" not in text and "|---" not in text
+
+
+def test_tables_fit_the_text_frame():
+    doc = SimpleDocTemplate(io.BytesIO(), pagesize=LETTER)
+    flowables = MarkdownRenderer(getSampleStyleSheet(), doc.width).render(CHAPTER)
+    tables = [f for f in flowables if isinstance(f, Table)]
+    code_blocks = [f for f in flowables if isinstance(f, CodeBlock)]
+    for flowable in flowables:
+        flowable.wrap(doc.width, doc.height)
+
+    top_level, nested = tables
+    assert top_level._width == code_blocks[0].width == doc.width
+    # Inside a list item, as wide as the item's code block and right-aligned with it
+    assert nested._width == code_blocks[1].width < doc.width
+    assert nested.hAlign == "RIGHT"
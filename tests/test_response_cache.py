@@ -0,0 +1,69 @@
+"""
+The two-tier response cache: memory hits, disk hits that are promoted to
+memory, misses, per-tier TTLs, and cached_kickoff() skipping the crew.
+"""
+import time
+import uuid
+from types import SimpleNamespace
+
+from app.core import cache
+from app.core.cache import ResponseCache, cached_kickoff
+
+
+def test_memory_then_disk_then_miss(tmp_path):
+    first = ResponseCache(directory=str(tmp_path))
+    key = ResponseCache.make_key("roadmap", [["Plan SQL", "JSON"]], "gemini")
+    assert first.get(key) is None
+    first.set(key, "cached plan")
+    assert first.get(key) == "cached plan"
+
+    # Another worker on the host: empty memory tier, shared disk tier
+    second = ResponseCache(directory=str(tmp_path))
+    assert second.get(key) == "cached plan"
+    assert second.get(key) == "cached plan"
+    stats = second.get_stats()
+    assert (stats["disk_hits"], stats["memory_hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0, 1.0)
+    assert first.get_stats()["misses"] == 1
+
+
+def test_keys_depend_on_prompts_and_model():
+    key = ResponseCache.make_key("roadmap", [["Plan SQL", "JSON"]], "gemini")
+    assert key != ResponseCache.make_key("roadmap", [["Plan SQL joins", "JSON"]], "gemini")
+    assert key != ResponseCache.make_key("roadmap", [["Plan SQL", "JSON"]], "perplexity")
+    assert key != ResponseCache.make_key("chapter", [["Plan SQL", "JSON"]], "gemini")
+
+
+def test_each_tier_expires(tmp_path):
+    responses = ResponseCache(directory=str(tmp_path), memory_ttl=0.1, disk_ttl=0.5)
+    responses.set("key", "value")
+    time.sleep(0.2)
+    # Gone from memory, still on disk
+    assert responses.get("key") == "value"
+    assert responses.get_stats()["disk_hits"] == 1
+    time.sleep(0.5)
+    assert responses.get("key") is None
+
+
+class CountingCrew:
+    # Stands in for a one-task crew; counts kickoffs
+    def __init__(self, prompt):
+        self.tasks = [SimpleNamespace(description=prompt, expected_output="Markdown")]
+        self.kickoffs = 0
+
+    def kickoff(self):
+        self.kickoffs += 1
+        return SimpleNamespace(raw=f"output {self.kickoffs}")
+
+
+def test_cached_kickoff_runs_each_crew_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "response_cache", ResponseCache(directory=str(tmp_path)))
+    llm = SimpleNamespace(model="gemini/gemini-2.0-flash")
+    prompt = f"Write a chapter {uuid.uuid4().hex}"
+
+    crew = CountingCrew(prompt)
+    assert cached_kickoff("chapter", crew, llm) == "output 1"
+    assert cached_kickoff("chapter", CountingCrew(prompt), llm) == "output 1"
+    assert crew.kickoffs == 1
+    # Another model is another output
+    assert cached_kickoff("chapter", CountingCrew(prompt), SimpleNamespace(model="perplexity/sonar")) == "output 1"
+    assert cache.response_cache.get_stats()["writes"] == 2
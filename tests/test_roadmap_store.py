@@ -0,0 +1,48 @@
+"""
+Identical roadmaps share one RoadmapContent row, whatever the database.
+"""
+import asyncio
+
+import pytest
+from sqlalchemy import func
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.db.database import async_engine, insert_ignore
+from app.models.user import User, Roadmap, RoadmapContent
+from app.services.roadmap_store import save_roadmap, content_hash
+
+PLAN = {"weeks": [{"week": 1, "topic": "Lists"}]}
+
+
+def test_identical_roadmaps_share_content(database):
+    with Session(database) as session:
+        user = User(email="roadmaps@example.com", full_name="Roadmaps", hashed_password="x")
+        session.add(user)
+        session.commit()
+        user_id = user.id
+
+    async def save_twice():
+        async def one(title):
+            async with AsyncSession(async_engine, expire_on_commit=False) as session:
+                return await save_roadmap(session, user_id, title, "", "4 weeks", "Beginner", PLAN)
+        return await asyncio.gather(one("Python"), one("Python again"))
+
+    first, second = asyncio.run(save_twice())
+    assert first.id != second.id
+    assert first.content_hash == second.content_hash == content_hash(PLAN)
+    with Session(database) as session:
+        shared = select(func.count()).select_from(RoadmapContent).where(RoadmapContent.hash == first.content_hash)
+        assert session.exec(shared).one() == 1
+        assert len(session.exec(select(Roadmap).where(Roadmap.user_id == user_id)).all()) == 2
+
+
+@pytest.mark.parametrize("dialect, expected", [
+    (sqlite.dialect(), "ON CONFLICT (hash) DO NOTHING"),
+    (postgresql.dialect(), "ON CONFLICT (hash) DO NOTHING"),
+    (mysql.dialect(), "INSERT IGNORE INTO"),
+])
+def test_insert_ignore_per_dialect(dialect, expected):
+    statement = insert_ignore(dialect.name, RoadmapContent, {"hash": "abc", "data": PLAN}, index_elements=["hash"])
+    assert expected in str(statement.compile(dialect=dialect))
@@ -0,0 +1,105 @@
+"""
+Single-flight: identical calls share the leader's execution, including its
+failure, and a waiter that gives up doesn't stop the leader.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.core.llm import begin_llm_caller, RequestCancelled
+from app.core.singleflight import SingleFlight, SingleFlightTimeout
+
+
+def _wait_for(condition, timeout=5.0):
+    give_up_at = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < give_up_at, "timed out"
+        time.sleep(0.01)
+
+
+def test_waiters_share_the_leaders_result():
+    flights, release, runs = SingleFlight(), threading.Event(), []
+
+    def generate():
+        runs.append(1)
+        release.wait()
+        return "roadmap"
+
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        futures = [pool.submit(flights.do, "week-3", generate) for _ in range(5)]
+        _wait_for(lambda: flights.get_stats()["coalesced"] == 4)
+        release.set()
+        assert [f.result() for f in futures] == ["roadmap"] * 5
+    assert len(runs) == 1
+    assert flights.get_stats()["in_flight"] == 0
+
+
+def test_leader_failure_reaches_every_waiter():
+    flights, release = SingleFlight(), threading.Event()
+
+    def generate():
+        release.wait()
+        raise ValueError("provider down")
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(flights.do, "week-3", generate) for _ in range(4)]
+        _wait_for(lambda: flights.get_stats()["coalesced"] == 3)
+        release.set()
+        for future in futures:
+            with pytest.raises(ValueError, match="provider down"):
+                future.result()
+
+    # Failures aren't remembered: the next call runs again
+    assert flights.do("week-3", lambda: "roadmap") == "roadmap"
+
+
+def test_cancelled_waiter_detaches_and_leader_finishes():
+    flights, started, release = SingleFlight(), threading.Event(), threading.Event()
+    callers = {}
+
+    def generate():
+        started.set()
+        release.wait()
+        # The leader's own client left too, but a waiter still wants the result
+        callers["leader"].check()
+        return "roadmap"
+
+    def call(name):
+        callers[name] = begin_llm_caller(user_id=len(callers) + 1)
+        return flights.do("week-3", generate)
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        leader = pool.submit(call, "leader")
+        started.wait(5)
+        gone, staying = pool.submit(call, "gone"), pool.submit(call, "staying")
+        _wait_for(lambda: flights.get_stats()["coalesced"] == 2)
+
+        callers["gone"].cancel("disconnected")
+        with pytest.raises(RequestCancelled):
+            gone.result(timeout=2)
+        assert not leader.done()
+
+        callers["leader"].cancel("disconnected")
+        release.set()
+        assert leader.result(timeout=5) == "roadmap"
+        assert staying.result(timeout=5) == "roadmap"
+
+
+def test_waiter_times_out_without_stopping_the_leader():
+    flights, release = SingleFlight(timeout=0.2), threading.Event()
+
+    def generate():
+        release.wait()
+        return "roadmap"
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(flights.do, "week-3", generate)
+        _wait_for(lambda: flights.get_stats()["in_flight"] == 1)
+        waiter = pool.submit(flights.do, "week-3", generate)
+        with pytest.raises(SingleFlightTimeout):
+            waiter.result(timeout=5)
+        release.set()
+        assert leader.result(timeout=5) == "roadmap"
+    assert flights.get_stats()["waiter_timeouts"] == 1
@@ -0,0 +1,75 @@
+"""
+Structured crew outputs: strict JSON, then json_repair, then a regenerated
+crew run; anything still off-schema raises StructuredOutputError.
+"""
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from app.core import cache
+from app.core.cache import ResponseCache, cached_kickoff
+from app.core.structured import parse_model, get_parse_stats, StructuredOutputError
+from app.models.schemas import RoadmapPlan, ProjectFiles
+
+WEEK = '{"week": 1, "title": "Lists", "topics": ["slicing", "comprehensions"]}'
+
+
+@pytest.mark.parametrize("text, outcome", [
+    ('{"roadmap": [%s]}' % WEEK, "ok"),
+    ('```json\n{"roadmap": [%s]}\n```' % WEEK, "ok"),
+    ('Here is your plan:\n{"roadmap": [%s]}\nGood luck!' % WEEK, "ok"),
+    ('{"roadmap": [%s,],}' % WEEK, "repaired"),
+    ("{'roadmap': [{'week': 1, 'title': 'Lists'}]}", "repaired"),
+    ('```json\n{"roadmap": [{"week": 1, "title": "Lists", "topics": ["slicing", "compre', "repaired"),
+])
+def test_parse_ladder(text, outcome):
+    kind = f"roadmap-{uuid.uuid4().hex[:8]}"
+    plan = parse_model(text, RoadmapPlan, kind)
+    assert (plan.roadmap[0].week, plan.roadmap[0].title) == (1, "Lists")
+    assert get_parse_stats()[kind][outcome] == 1
+
+
+@pytest.mark.parametrize("text", [
+    '{"weeks": [%s]}' % WEEK,                    # wrong key
+    '{"roadmap": [{"week": "first"}]}',          # wrong types, missing fields
+    "Sorry, I can't help with that.",            # no JSON at all
+    "",
+])
+def test_schema_mismatch_raises(text):
+    kind = f"roadmap-{uuid.uuid4().hex[:8]}"
+    with pytest.raises(StructuredOutputError):
+        parse_model(text, RoadmapPlan, kind)
+    stats = get_parse_stats()[kind]
+    assert (stats["failed"], stats["failure_rate"]) == (1, 1.0)
+
+
+def test_root_models_parse_too():
+    files = parse_model('```json\n{"main.py": "print(1)",}\n```', ProjectFiles, "project-test")
+    assert files.root == {"main.py": "print(1)"}
+
+
+class ScriptedCrew:
+    # Stands in for a one-task crew whose kickoffs return the given outputs in turn
+    def __init__(self, *outputs):
+        self.tasks = [SimpleNamespace(description=f"Plan {uuid.uuid4().hex}", expected_output="JSON")]
+        self.outputs = list(outputs)
+
+    def kickoff(self):
+        return SimpleNamespace(raw=self.outputs.pop(0))
+
+
+def test_unparseable_output_is_regenerated(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "response_cache", ResponseCache(directory=str(tmp_path)))
+    llm = SimpleNamespace(model="gemini/gemini-2.0-flash")
+    kind = f"roadmap-{uuid.uuid4().hex[:8]}"
+
+    crew = ScriptedCrew("I could not produce JSON.", '{"roadmap": [%s]}' % WEEK)
+    output = cached_kickoff(kind, crew, llm, output_model=RoadmapPlan)
+    assert RoadmapPlan.model_validate_json(output).roadmap[0].title == "Lists"
+    assert get_parse_stats()[kind]["regenerated"] == 1
+
+    with pytest.raises(StructuredOutputError):
+        cached_kickoff(kind, ScriptedCrew("no", "still no"), llm, output_model=RoadmapPlan)
+    # Failures are never cached
+    assert cache.response_cache.get_stats()["writes"] == 1